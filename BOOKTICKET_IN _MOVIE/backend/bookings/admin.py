@@ -1,6 +1,10 @@
-from django.contrib import admin
+import io
+from django import forms
+from django.contrib import admin, messages
+from django.template.response import TemplateResponse
 from django.utils.html import format_html
-from .models import Booking, BookedSeat, Payment, Coupon, CouponUsage
+from .coupon_codes import DEFAULT_LENGTH, generate_coupons, import_coupons
+from .models import Booking, BookedSeat, ShowSeat, Payment, Coupon, CouponUsage, CouponUserCount, OutboxEmail, TicketCheckIn
 
 class BookedSeatInline(admin.TabularInline):
     """
@@ -48,6 +52,19 @@ class BookingAdmin(admin.ModelAdmin):
             'user', 'show', 'show__movie', 'show__screen', 'show__screen__theater'
         )
 
+@admin.register(ShowSeat)
+class ShowSeatAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for ShowSeat model
+    """
+    list_display = ('show', 'seat', 'status', 'booking', 'holder', 'held_until', 'updated_at')
+    list_filter = ('status', 'show__show_date')
+    search_fields = ('holder', 'seat__seat_number', 'booking__booking_id')
+    readonly_fields = ('updated_at',)
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('show', 'show__movie', 'seat', 'booking')
+
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
     """
@@ -64,6 +81,25 @@ class PaymentAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('booking', 'booking__user')
 
+class CouponGenerationForm(forms.Form):
+    """
+    Options for creating coupons in bulk from the admin
+    """
+    # Larger runs belong in the generate_coupons command
+    MAX_CODES = 100000
+    
+    count = forms.IntegerField(min_value=1, max_value=MAX_CODES, required=False)
+    length = forms.IntegerField(min_value=4, max_value=40, initial=DEFAULT_LENGTH)
+    prefix = forms.CharField(max_length=10, required=False)
+    usage_limit = forms.IntegerField(min_value=1, initial=1)
+    csv_file = forms.FileField(required=False, label='CSV file')
+    
+    def clean(self):
+        data = super().clean()
+        if bool(data.get('count')) == bool(data.get('csv_file')):
+            raise forms.ValidationError('Enter a count or upload a CSV file, not both')
+        return data
+
 @admin.register(Coupon)
 class CouponAdmin(admin.ModelAdmin):
     """
@@ -76,6 +112,40 @@ class CouponAdmin(admin.ModelAdmin):
     list_filter = ('coupon_type', 'is_active', 'valid_from', 'valid_until')
     search_fields = ('code', 'description')
     readonly_fields = ('used_count', 'is_valid')
+    actions = ['generate_codes']
+    
+    @admin.action(description='Create coupons in bulk on the terms of the selected coupon')
+    def generate_codes(self, request, queryset):
+        if queryset.count() != 1:
+            self.message_user(request, 'Select exactly one coupon to copy terms from', messages.ERROR)
+            return None
+        template = queryset.get()
+        
+        form = CouponGenerationForm()
+        if 'apply' in request.POST:
+            form = CouponGenerationForm(request.POST, request.FILES)
+        if form.is_bound and form.is_valid():
+            data = form.cleaned_data
+            if data['csv_file']:
+                file = io.TextIOWrapper(data['csv_file'].file, encoding='utf-8', newline='')
+                created, skipped = import_coupons(template, file, usage_limit=data['usage_limit'])
+            else:
+                created = generate_coupons(
+                    template, data['count'],
+                    length=data['length'],
+                    prefix=data['prefix'],
+                    usage_limit=data['usage_limit']
+                )
+                skipped = 0
+            self.message_user(request, f'Created {created} coupons' + (f', skipped {skipped} existing codes' if skipped else ''))
+            return None
+        
+        return TemplateResponse(request, 'admin/bookings/coupon/generate_codes.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Create coupons in bulk',
+            'template': template,
+            'form': form,
+        })
     
     def is_valid_display(self, obj):
         if obj.is_valid:
@@ -95,4 +165,42 @@ class CouponUsageAdmin(admin.ModelAdmin):
     readonly_fields = ('used_at',)
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('coupon', 'user', 'booking')
\ No newline at end of file
+        return super().get_queryset(request).select_related('coupon', 'user', 'booking')
+
+@admin.register(CouponUserCount)
+class CouponUserCountAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for CouponUserCount model
+    """
+    list_display = ('coupon', 'user', 'used_count')
+    search_fields = ('coupon__code', 'user__email')
+    readonly_fields = ('used_count',)
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('coupon', 'user')
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for OutboxEmail model
+    """
+    list_display = ('template', 'recipient', 'booking', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status', 'template', 'created_at')
+    search_fields = ('recipient', 'booking__booking_id')
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('booking')
+
+@admin.register(TicketCheckIn)
+class TicketCheckInAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for TicketCheckIn model
+    """
+    list_display = ('booking', 'show', 'gate', 'scanned_at')
+    list_filter = ('gate', 'scanned_at')
+    search_fields = ('booking__booking_id',)
+    readonly_fields = ('scanned_at',)
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('booking', 'show')
@@ -0,0 +1,126 @@
+"""
+Bulk creation of coupon codes.
+
+Campaign codes copy their terms (discount, validity, limits) from a
+template coupon and are written in bulk_create batches. Only one batch is
+held in memory at a time: candidates are checked for collisions against
+the unique code index with one query per batch, so runs of millions of
+codes stay flat in memory.
+"""
+import csv
+import secrets
+from django.db import IntegrityError, transaction
+from .models import Coupon
+
+DEFAULT_ALPHABET = 'ABCDEFGHJKLMNPQRSTUVWXYZ23456789'
+DEFAULT_LENGTH = 10
+DEFAULT_BATCH_SIZE = 5000
+
+TEMPLATE_FIELDS = (
+    'description', 'coupon_type', 'value', 'minimum_amount', 'maximum_discount',
+    'user_limit', 'valid_from', 'valid_until', 'is_active'
+)
+
+def random_codes(count, length=DEFAULT_LENGTH, alphabet=DEFAULT_ALPHABET, prefix=''):
+    """Return count random codes drawn uniformly from the alphabet"""
+    if not alphabet.isascii() or not 1 < len(alphabet) <= 256:
+        raise ValueError('Alphabet must have between 2 and 256 ASCII characters')
+
+    # Bytes map onto the alphabet by value; the top 256 % len values are
+    # dropped so every character is equally likely
+    size = len(alphabet)
+    limit = 256 - 256 % size
+    table = bytes(ord(alphabet[value % size]) for value in range(256))
+    rejected = bytes(range(limit, 256))
+
+    chars = b''
+    needed = count * length
+    while len(chars) < needed:
+        chars += secrets.token_bytes(needed - len(chars) + 64).translate(table, rejected)
+    chars = chars[:needed].decode()
+    return [prefix + chars[start:start + length] for start in range(0, needed, length)]
+
+def _create(coupons):
+    with transaction.atomic():
+        Coupon.objects.bulk_create(coupons)
+
+def _insert(template, codes, usage_limit):
+    """Insert the codes not taken yet, returning how many were created"""
+    codes = set(codes)
+    codes -= set(Coupon.objects.filter(code__in=codes).values_list('code', flat=True))
+    if not codes:
+        return 0
+    terms = {field: getattr(template, field) for field in TEMPLATE_FIELDS}
+    coupons = [Coupon(code=code, usage_limit=usage_limit, **terms) for code in codes]
+    # A code inserted concurrently since the check fails the whole batch, so
+    # a batch that goes in was created entirely by this call. After such a
+    # conflict the codes are inserted one by one, counting only those that
+    # go in, as a re-check could still miss the other writer's rows inside
+    # a surrounding transaction.
+    try:
+        _create(coupons)
+    except IntegrityError:
+        created = 0
+        for coupon in coupons:
+            try:
+                _create([coupon])
+            except IntegrityError:
+                continue
+            created += 1
+        return created
+    return len(coupons)
+
+def generate_coupons(template, count, length=DEFAULT_LENGTH, alphabet=DEFAULT_ALPHABET, prefix='',
+                     usage_limit=1, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Create count new coupons with unique random codes on the template's terms.
+
+    Batches that come up short on collisions are topped up until count
+    coupons exist. progress, if given, is called with the number created so
+    far after each batch. Returns the number of coupons created.
+    """
+    created = 0
+    attempts = 0
+    while created < count:
+        batch = min(batch_size, count - created)
+        inserted = _insert(template, random_codes(batch, length, alphabet, prefix), usage_limit)
+        created += inserted
+
+        # A nearly exhausted code space would otherwise loop forever
+        attempts = attempts + 1 if inserted < batch / 2 else 0
+        if attempts > 10:
+            raise ValueError('Too many collisions; use a longer code or a larger alphabet')
+        if progress is not None:
+            progress(created)
+    return created
+
+def import_coupons(template, file, usage_limit=1, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Create coupons on the template's terms for codes read from a CSV file.
+
+    The file needs a code column and is read one batch at a time. Codes that
+    already exist are skipped, as are blank or overlong ones (those are not
+    counted). Returns (created, skipped).
+    """
+    created = read = 0
+    batch = []
+    max_length = Coupon._meta.get_field('code').max_length
+
+    def flush():
+        nonlocal created
+        created += _insert(template, batch, usage_limit)
+        batch.clear()
+        if progress is not None:
+            progress(created)
+
+    for row in csv.DictReader(file):
+        code = (row.get('code') or '').strip()
+        if not code or len(code) > max_length:
+            continue
+        read += 1
+        batch.append(code)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return created, read - created
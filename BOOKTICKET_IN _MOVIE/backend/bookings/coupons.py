@@ -0,0 +1,60 @@
+"""
+In-process coupon catalog.
+
+Coupons are looked up by code on every checkout keystroke, so each worker
+keeps the coupons it has seen in memory. Every code has a version token in
+the shared cache that is replaced whenever the coupon is saved, deleted or
+redeemed; a cached coupon is served only while its token is current, so a
+lookup costs one cache read and no query. Unknown codes are remembered
+for MISS_TTL seconds, so probing invalid codes rarely reaches the database
+while codes created in bulk (which sends no signals) still show up.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from django.core.cache import cache
+from django.db import transaction
+
+MAX_ENTRIES = 10000
+
+MISS_TTL = 60
+
+_lock = threading.Lock()
+_entries = OrderedDict()
+
+def _version_key(code):
+    return f'coupon-catalog:{code}'
+
+def _version(code):
+    key = _version_key(code)
+    version = cache.get(key)
+    if version is None:
+        # A fresh token can't match anything cached before the key was lost
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+def get_coupon(code):
+    """Return the Coupon with the code, or None if there is none"""
+    from .models import Coupon
+    
+    version = _version(code)
+    with _lock:
+        entry = _entries.get(code)
+        if entry is not None and entry[0] == version and (entry[1] is not None or entry[2] > time.monotonic()):
+            _entries.move_to_end(code)
+            return entry[1]
+    
+    coupon = Coupon.objects.filter(code=code).first()
+    with _lock:
+        _entries[code] = (version, coupon, time.monotonic() + MISS_TTL)
+        _entries.move_to_end(code)
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+    return coupon
+
+def invalidate_coupon(*codes):
+    """Give the codes new version tokens once the current transaction commits"""
+    keys = [_version_key(code) for code in codes if code]
+    transaction.on_commit(lambda: cache.set_many({key: uuid.uuid4().hex for key in keys}, None))
@@ -0,0 +1,69 @@
+"""
+Expiry of abandoned pending bookings.
+
+Due bookings are found through the (status, expiry_time) index and expired
+in chunks with set-based UPDATEs. Each chunk is locked with SKIP LOCKED so
+several sweepers can run side by side without expiring the same rows.
+Bookings whose payment is with the gateway are left for it to settle.
+"""
+import time
+from django.db import transaction
+from django.utils import timezone
+from theaters.realtime import DELTA_AVAILABLE, publish_seat_delta
+from .holds import holder_for_user_id, release_backend_holds
+from .transitions import transition_many
+
+DEFAULT_CHUNK_SIZE = 500
+
+def _release_seats(booking_ids):
+    from .models import BookedSeat, ShowSeat
+    
+    ShowSeat.objects.filter(booking_id__in=booking_ids).update(
+        status='available', holder=None, held_until=None, booking=None, updated_at=timezone.now()
+    )
+    
+    seats = {}
+    for show_id, user_id, seat_id in BookedSeat.objects.filter(
+        booking_id__in=booking_ids
+    ).values_list('booking__show_id', 'booking__user_id', 'seat_id'):
+        seats.setdefault((show_id, user_id), []).append(seat_id)
+    return seats
+
+def expire_chunk(now, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Expire up to chunk_size due bookings, returning how many were expired"""
+    from .models import Booking
+    
+    with transaction.atomic():
+        booking_ids = list(Booking.objects.select_for_update(skip_locked=True).filter(
+            status='pending',
+            expiry_time__lte=now
+        ).exclude(
+            payment__status='processing'
+        ).order_by('expiry_time').values_list('id', flat=True)[:chunk_size])
+        if not booking_ids:
+            return 0
+        
+        expired = transition_many(Booking, booking_ids, {'status': ('pending', 'expired')})
+        released = _release_seats(booking_ids)
+    
+    # Holds kept outside the database are released once the chunk commits
+    for (show_id, user_id), seat_ids in released.items():
+        release_backend_holds(show_id, seat_ids, holder_for_user_id(user_id))
+        publish_seat_delta(show_id, seat_ids, DELTA_AVAILABLE)
+    return expired
+
+def expire_due_bookings(now=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Expire every pending booking past its expiry time.
+    
+    Returns a (rows, seconds) tuple for the run.
+    """
+    now = now or timezone.now()
+    started = time.perf_counter()
+    total = 0
+    while True:
+        expired = expire_chunk(now, chunk_size)
+        total += expired
+        if expired < chunk_size:
+            break
+    return total, time.perf_counter() - started
\ No newline at end of file
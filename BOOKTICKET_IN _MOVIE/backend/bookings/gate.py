@@ -0,0 +1,103 @@
+"""
+Entrance scanning.
+
+Scanners verify the signed ticket payload offline (see
+tickets.sign_ticket) and talk to the server in bulk only: the attendee
+manifest streams every confirmed seat assignment of a show in one
+response, and scans are posted in batches. A batch costs one read to find
+the bookings still valid and not yet scanned, one INSERT for all new
+check-ins, and one read to confirm no other gate got there first.
+"""
+import itertools
+import json
+import uuid
+from django.utils import timezone
+from .tickets import verify_ticket
+
+MAX_BATCH_SIZE = 1000
+
+SCAN_ADMITTED = 'admitted'
+SCAN_DUPLICATE = 'duplicate'
+SCAN_INVALID = 'invalid'
+SCAN_WRONG_SHOW = 'wrong_show'
+SCAN_NOT_CONFIRMED = 'not_confirmed'
+
+def manifest_lines(show_id):
+    """Yield one JSON line per confirmed booking of the show with its seats"""
+    from .models import BookedSeat
+    
+    rows = BookedSeat.objects.filter(
+        booking__show_id=show_id,
+        booking__status='confirmed'
+    ).order_by('booking_id', 'seat__row', 'seat__column').values_list(
+        'booking_id', 'booking__booking_id', 'seat_id', 'seat__seat_number', 'booking__check_in__scanned_at'
+    ).iterator(chunk_size=2000)
+    
+    for _, seats in itertools.groupby(rows, key=lambda row: row[0]):
+        seats = list(seats)
+        scanned_at = seats[0][4]
+        yield json.dumps({
+            'booking_id': str(seats[0][1]),
+            'seat_ids': [seat[2] for seat in seats],
+            'seats': [seat[3] for seat in seats],
+            'checked_in_at': scanned_at.isoformat() if scanned_at else None,
+        }) + '\n'
+
+def check_in(show_id, tokens, gate='', now=None):
+    """
+    Check in a batch of scanned tickets for a show.
+    
+    Returns one result dict per token, in order, with a status of
+    admitted, duplicate, invalid, wrong_show or not_confirmed.
+    """
+    from .models import Booking, TicketCheckIn
+    
+    now = now or timezone.now()
+    results = []
+    for token in tokens:
+        ticket = verify_ticket(token) if isinstance(token, str) else None
+        if ticket is None:
+            results.append({'status': SCAN_INVALID})
+            continue
+        booking_hex, ticket_show_id, seat_ids = ticket
+        result = {'booking_id': str(uuid.UUID(booking_hex)), 'seat_ids': seat_ids, 'status': None}
+        if ticket_show_id != show_id:
+            result['status'] = SCAN_WRONG_SHOW
+        results.append(result)
+    
+    scanned = {result['booking_id'] for result in results if result.get('status') is None}
+    bookings = {
+        str(booking_id): (pk, status, scanned_at)
+        for pk, booking_id, status, scanned_at in Booking.objects.filter(
+            booking_id__in=scanned, show_id=show_id
+        ).values_list('id', 'booking_id', 'status', 'check_in__scanned_at')
+    }
+    
+    admitted = {}
+    for result in results:
+        if result.get('status') is not None:
+            continue
+        pk, status, scanned_at = bookings.get(result['booking_id'], (None, None, None))
+        if status != 'confirmed':
+            result['status'] = SCAN_NOT_CONFIRMED
+        elif scanned_at is not None or pk in admitted:
+            result['status'] = SCAN_DUPLICATE
+            result['checked_in_at'] = (scanned_at or now).isoformat()
+        else:
+            result['status'] = SCAN_ADMITTED
+            admitted[pk] = result
+    
+    if admitted:
+        TicketCheckIn.objects.bulk_create([
+            TicketCheckIn(booking_id=pk, show_id=show_id, gate=gate, scanned_at=now)
+            for pk in admitted
+        ], ignore_conflicts=True)
+        
+        # Another gate may have checked the same booking in meanwhile
+        for pk, scanned_at, other_gate in TicketCheckIn.objects.filter(
+            booking_id__in=list(admitted)
+        ).values_list('booking_id', 'scanned_at', 'gate'):
+            if scanned_at != now or other_gate != gate:
+                admitted[pk]['status'] = SCAN_DUPLICATE
+                admitted[pk]['checked_in_at'] = scanned_at.isoformat()
+    return results
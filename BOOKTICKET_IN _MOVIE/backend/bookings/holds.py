@@ -0,0 +1,154 @@
+"""
+Seat holds for checkout.
+
+A hold reserves a set of seats of a show for a holder until it expires.
+Holds are all-or-nothing: either every requested seat is held for the
+holder or none is. The backend is chosen with the SEAT_HOLD_BACKEND
+setting; the database backend is the default and the local backend keeps
+holds in process memory for high-contention, single-worker deployments.
+Seats claimed by pending bookings always live in the inventory table,
+whichever backend is configured.
+"""
+import threading
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from theaters.realtime import DELTA_AVAILABLE, DELTA_HELD, publish_seat_delta
+from . import inventory
+
+DEFAULT_BACKEND = 'bookings.holds.DatabaseHoldBackend'
+
+def holder_for_user(user):
+    """Hold token for seats picked by a user during checkout"""
+    return holder_for_user_id(user.pk)
+
+def holder_for_user_id(user_id):
+    return f'user:{user_id}'
+
+class BaseHoldBackend:
+    """
+    Interface for seat hold storage
+    """
+    def hold(self, show_id, seat_ids, holder, expires_at):
+        """Hold all seats for the holder, returning False if any is taken"""
+        raise NotImplementedError
+    
+    def extend(self, show_id, seat_ids, holder, expires_at):
+        """Push back the expiry of the holder's holds, returning how many moved"""
+        raise NotImplementedError
+    
+    def release(self, show_id, seat_ids, holder):
+        """Drop the holder's holds on the given seats"""
+        raise NotImplementedError
+    
+    def held_seat_ids(self, show_id, exclude_holder=None):
+        """Seat ids of the show currently held by anyone but exclude_holder"""
+        raise NotImplementedError
+
+class DatabaseHoldBackend(BaseHoldBackend):
+    """
+    Seat holds stored as claims on the show_seats inventory table
+    """
+    def hold(self, show_id, seat_ids, holder, expires_at):
+        return inventory.claim_seats(show_id, seat_ids, holder, expires_at)
+    
+    def extend(self, show_id, seat_ids, holder, expires_at):
+        return inventory.extend_claim(show_id, seat_ids, holder, expires_at)
+    
+    def release(self, show_id, seat_ids, holder):
+        return inventory.release_claim(show_id, seat_ids, holder)
+    
+    def held_seat_ids(self, show_id, exclude_holder=None):
+        return inventory.held_seat_ids(show_id, exclude_holder)
+
+class LocalHoldBackend(BaseHoldBackend):
+    """
+    Seat holds kept in process memory, keyed by show then seat
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._holds = {}
+    
+    def _live(self, show_id, now):
+        holds = self._holds.setdefault(show_id, {})
+        expired = [seat_id for seat_id, (_, expires_at) in holds.items() if expires_at <= now]
+        for seat_id in expired:
+            del holds[seat_id]
+        return holds
+    
+    def hold(self, show_id, seat_ids, holder, expires_at):
+        now = timezone.now()
+        with self._lock:
+            holds = self._live(show_id, now)
+            for seat_id in seat_ids:
+                current = holds.get(seat_id)
+                if current is not None and current[0] != holder:
+                    return False
+            for seat_id in seat_ids:
+                holds[seat_id] = (holder, expires_at)
+        publish_seat_delta(show_id, sorted(seat_ids), DELTA_HELD)
+        return True
+    
+    def extend(self, show_id, seat_ids, holder, expires_at):
+        now = timezone.now()
+        extended = 0
+        with self._lock:
+            holds = self._live(show_id, now)
+            for seat_id in seat_ids:
+                current = holds.get(seat_id)
+                if current is not None and current[0] == holder:
+                    holds[seat_id] = (holder, expires_at)
+                    extended += 1
+        return extended
+    
+    def release(self, show_id, seat_ids, holder):
+        released = []
+        with self._lock:
+            holds = self._holds.get(show_id, {})
+            for seat_id in seat_ids:
+                current = holds.get(seat_id)
+                if current is not None and current[0] == holder:
+                    del holds[seat_id]
+                    released.append(seat_id)
+        publish_seat_delta(show_id, released, DELTA_AVAILABLE)
+        return len(released)
+    
+    def held_seat_ids(self, show_id, exclude_holder=None):
+        now = timezone.now()
+        with self._lock:
+            holds = self._live(show_id, now)
+            return {
+                seat_id for seat_id, (holder, _) in holds.items()
+                if holder != exclude_holder
+            }
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_hold_backend():
+    """Return the configured seat hold backend instance"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                path = getattr(settings, 'SEAT_HOLD_BACKEND', DEFAULT_BACKEND)
+                _backend = import_string(path)()
+    return _backend
+
+def backend_held_seat_ids(show_id, exclude_holder=None):
+    """Seat ids held in a backend that keeps holds outside the inventory table"""
+    backend = get_hold_backend()
+    if isinstance(backend, DatabaseHoldBackend):
+        return set()
+    return backend.held_seat_ids(show_id, exclude_holder)
+
+def release_backend_holds(show_id, seat_ids, holder):
+    """Drop holds kept outside the inventory table once a booking settles"""
+    backend = get_hold_backend()
+    if isinstance(backend, DatabaseHoldBackend):
+        return 0
+    return backend.release(show_id, seat_ids, holder)
+
+def held_seat_ids(show_id, exclude_holder=None):
+    """Seat ids held by pending bookings or by the hold backend"""
+    return inventory.held_seat_ids(show_id, exclude_holder) | backend_held_seat_ids(show_id, exclude_holder)
\ No newline at end of file
@@ -0,0 +1,240 @@
+"""
+Idempotency keys for booking and payment endpoints.
+
+Clients may send an Idempotency-Key header with a POST. The first request
+with a key runs the view and its response is stored as rendered JSON;
+retries with the same key get that response back without running the view
+again. A retry arriving while the first request is still running waits for
+it to finish. Keys are scoped to the view and the user, and expire after
+RESPONSE_TTL. Responses live in the store chosen with IDEMPOTENCY_STORE.
+"""
+import functools
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+DEFAULT_STORE = 'bookings.idempotency.LocalResponseStore'
+
+HEADER = 'Idempotency-Key'
+
+MAX_KEY_LENGTH = 255
+
+RESPONSE_TTL = 60 * 60 * 24
+
+MAX_ENTRIES = 10000
+
+# How long a retry waits for the original request before giving up
+WAIT_TIMEOUT = 30
+
+# Refusals that happen before any work is done; a retry should run again
+UNSTORED_STATUSES = {
+    status.HTTP_401_UNAUTHORIZED,
+    status.HTTP_403_FORBIDDEN,
+    status.HTTP_409_CONFLICT,
+    status.HTTP_429_TOO_MANY_REQUESTS,
+}
+
+class StoredResponse:
+    """
+    Rendered response kept for replays
+    """
+    __slots__ = ('fingerprint', 'status_code', 'body')
+    
+    def __init__(self, fingerprint, status_code, body):
+        self.fingerprint = fingerprint
+        self.status_code = status_code
+        self.body = body
+
+class BaseResponseStore:
+    """
+    Interface for idempotent response storage
+    """
+    def get(self, key):
+        """Return the StoredResponse for the key, if any"""
+        raise NotImplementedError
+    
+    def start(self, key):
+        """Mark the key in flight, returning False if another request holds it"""
+        raise NotImplementedError
+    
+    def wait(self, key, timeout):
+        """Block until the key is no longer in flight or the timeout passes"""
+        raise NotImplementedError
+    
+    def finish(self, key, response):
+        """Store the response and release the key"""
+        raise NotImplementedError
+    
+    def abandon(self, key):
+        """Release the key without storing anything so a retry can run"""
+        raise NotImplementedError
+
+class LocalResponseStore(BaseResponseStore):
+    """
+    Responses kept in process memory, evicting the oldest beyond MAX_ENTRIES
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._responses = OrderedDict()
+        self._in_flight = {}
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._responses.get(key)
+            if entry is None:
+                return None
+            expires_at, response = entry
+            if expires_at <= time.monotonic():
+                del self._responses[key]
+                return None
+            return response
+    
+    def start(self, key):
+        with self._lock:
+            if key in self._in_flight:
+                return False
+            self._in_flight[key] = threading.Event()
+            return True
+    
+    def wait(self, key, timeout):
+        with self._lock:
+            event = self._in_flight.get(key)
+        if event is not None:
+            event.wait(timeout)
+    
+    def finish(self, key, response):
+        with self._lock:
+            self._responses[key] = (time.monotonic() + RESPONSE_TTL, response)
+            self._responses.move_to_end(key)
+            while len(self._responses) > MAX_ENTRIES:
+                self._responses.popitem(last=False)
+        self.abandon(key)
+    
+    def abandon(self, key):
+        with self._lock:
+            event = self._in_flight.pop(key, None)
+        if event is not None:
+            event.set()
+
+class CacheResponseStore(BaseResponseStore):
+    """
+    Responses kept in the cache, shared by every worker using it
+    """
+    def _key(self, key):
+        return f'idempotency:{hashlib.sha256(key.encode()).hexdigest()}'
+    
+    def get(self, key):
+        return cache.get(self._key(key))
+    
+    def start(self, key):
+        return cache.add(f'{self._key(key)}:lock', True, WAIT_TIMEOUT * 2)
+    
+    def wait(self, key, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and cache.get(f'{self._key(key)}:lock'):
+            time.sleep(0.05)
+    
+    def finish(self, key, response):
+        cache.set(self._key(key), response, RESPONSE_TTL)
+        self.abandon(key)
+    
+    def abandon(self, key):
+        cache.delete(f'{self._key(key)}:lock')
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_response_store():
+    """Return the configured idempotency store instance"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                path = getattr(settings, 'IDEMPOTENCY_STORE', DEFAULT_STORE)
+                _store = import_string(path)()
+    return _store
+
+def _fingerprint(request):
+    payload = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.path}\n{payload}'.encode()).hexdigest()
+
+def _replay(response, fingerprint):
+    if response.fingerprint != fingerprint:
+        return Response(
+            {'error': f'{HEADER} was already used for a different request'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    replay = HttpResponse(response.body, status=response.status_code, content_type='application/json')
+    replay['Idempotent-Replayed'] = 'true'
+    return replay
+
+def idempotent(view):
+    """
+    Make a view (or view method) honour the Idempotency-Key header.
+    
+    Only responses returned by the view are stored; exceptions, server
+    errors and UNSTORED_STATUSES release the key so the client can retry.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        request = args[0] if isinstance(args[0], Request) else args[1]
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        store = get_response_store()
+        scoped = f'{view.__qualname__}:{request.user.pk}:{key}'
+        fingerprint = _fingerprint(request)
+        
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        while True:
+            stored = store.get(scoped)
+            if stored is not None:
+                return _replay(stored, fingerprint)
+            if store.start(scoped):
+                # The original may have finished between the two calls
+                stored = store.get(scoped)
+                if stored is None:
+                    break
+                store.abandon(scoped)
+                return _replay(stored, fingerprint)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return Response(
+                    {'error': f'A request with this {HEADER} is still being processed'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            store.wait(scoped, remaining)
+        
+        try:
+            response = view(*args, **kwargs)
+        except Exception:
+            store.abandon(scoped)
+            raise
+        
+        if (
+            response.status_code >= 500 or
+            response.status_code in UNSTORED_STATUSES or
+            not isinstance(response, Response)
+        ):
+            store.abandon(scoped)
+        else:
+            body = JSONRenderer().render(response.data)
+            store.finish(scoped, StoredResponse(fingerprint, response.status_code, body))
+        return response
+    return wrapper
\ No newline at end of file
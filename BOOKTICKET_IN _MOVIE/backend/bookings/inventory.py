@@ -0,0 +1,181 @@
+"""
+Per-show seat inventory.
+
+Every seat of a show has one ShowSeat row. Seats are claimed with a single
+conditional UPDATE over the requested rows, so concurrent checkouts only
+contend on the seats they actually share and a seat can never be claimed
+by two holders at once. Rows are created lazily the first time a seat is
+claimed, or up front with the seed_show_inventory command.
+"""
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from theaters.realtime import DELTA_AVAILABLE, DELTA_HELD, publish_seat_delta
+
+class SeatsNotHeld(Exception):
+    """
+    The booking no longer holds every one of its seats
+    """
+    def __init__(self, booking, held):
+        self.booking = booking
+        self.held = held
+        super().__init__(f'Booking {booking.booking_id} holds {held} of its {booking.quantity} seats')
+
+def seed_inventory(show_id, seat_ids=None):
+    """Create missing inventory rows, marking seats of confirmed bookings as booked"""
+    from theaters.models import Seat, Show
+    from .models import BookedSeat, ShowSeat
+    
+    if seat_ids is None:
+        screen_id = Show.objects.filter(id=show_id).values_list('screen_id', flat=True).first()
+        seat_ids = Seat.objects.filter(screen_id=screen_id, is_active=True).values_list('id', flat=True)
+    seat_ids = list(seat_ids)
+    
+    booked = dict(BookedSeat.objects.filter(
+        booking__show_id=show_id,
+        booking__status='confirmed',
+        seat_id__in=seat_ids
+    ).values_list('seat_id', 'booking_id'))
+    
+    ShowSeat.objects.bulk_create([
+        ShowSeat(
+            show_id=show_id,
+            seat_id=seat_id,
+            status='booked' if seat_id in booked else 'available',
+            booking_id=booked.get(seat_id)
+        )
+        for seat_id in seat_ids
+    ], ignore_conflicts=True)
+
+def _claimable(show_id, seat_ids, holder, now):
+    from .models import ShowSeat
+    
+    return ShowSeat.objects.filter(show_id=show_id, seat_id__in=seat_ids).filter(
+        Q(status='available') |
+        Q(status='held', held_until__lte=now) |
+        Q(status='held', holder=holder, booking__isnull=True)
+    )
+
+def _claim(show_id, seat_ids, values, holder, now):
+    with transaction.atomic():
+        claimed = _claimable(show_id, seat_ids, holder, now).update(**values)
+        if claimed != len(seat_ids):
+            transaction.set_rollback(True)
+            return False
+    return True
+
+def claim_seats(show_id, seat_ids, holder, held_until, booking=None):
+    """
+    Hold every seat for the holder (and booking), or none of them.
+    
+    Returns True when all seats were claimed. Runs in its own savepoint so a
+    partial claim is rolled back without touching the caller's transaction.
+    """
+    from .models import ShowSeat
+    
+    seat_ids = set(seat_ids)
+    now = timezone.now()
+    values = {
+        'status': 'held',
+        'holder': holder,
+        'held_until': held_until,
+        'booking': booking,
+        'updated_at': now,
+    }
+    
+    claimed = _claim(show_id, seat_ids, values, holder, now)
+    
+    # Rows for seats never claimed before may not exist yet
+    if not claimed and ShowSeat.objects.filter(show_id=show_id, seat_id__in=seat_ids).count() != len(seat_ids):
+        seed_inventory(show_id, seat_ids)
+        claimed = _claim(show_id, seat_ids, values, holder, now)
+    
+    if claimed:
+        publish_seat_delta(show_id, sorted(seat_ids), DELTA_HELD)
+    return claimed
+
+def extend_claim(show_id, seat_ids, holder, held_until):
+    """Push back the expiry of the holder's live claims"""
+    from .models import ShowSeat
+    
+    return ShowSeat.objects.filter(
+        show_id=show_id,
+        seat_id__in=seat_ids,
+        status='held',
+        holder=holder,
+        held_until__gt=timezone.now()
+    ).update(held_until=held_until, updated_at=timezone.now())
+
+def extend_booking_hold(booking, held_until):
+    """Push back the expiry of the booking's live claims, returning how many it still holds"""
+    from .models import ShowSeat
+    
+    now = timezone.now()
+    return ShowSeat.objects.filter(
+        booking=booking,
+        status='held',
+        held_until__gt=now
+    ).update(held_until=held_until, updated_at=now)
+
+def release_claim(show_id, seat_ids, holder):
+    """Return the holder's unbooked claims to the available pool"""
+    from .models import ShowSeat
+    
+    rows = ShowSeat.objects.filter(show_id=show_id, seat_id__in=seat_ids, status='held', holder=holder)
+    released = list(rows.values_list('seat_id', flat=True))
+    if not released:
+        return 0
+    
+    count = rows.filter(seat_id__in=released).update(
+        status='available', holder=None, held_until=None, booking=None, updated_at=timezone.now()
+    )
+    publish_seat_delta(show_id, released, DELTA_AVAILABLE)
+    return count
+
+def held_seat_ids(show_id, exclude_holder=None):
+    """Seat ids of the show with a live claim by anyone but exclude_holder"""
+    from .models import ShowSeat
+    
+    rows = ShowSeat.objects.filter(show_id=show_id, status='held', held_until__gt=timezone.now())
+    if exclude_holder is not None:
+        rows = rows.exclude(holder=exclude_holder)
+    return set(rows.values_list('seat_id', flat=True))
+
+def unavailable_seat_ids(show_id, seat_ids, holder=None):
+    """Subset of seat_ids that is booked or held by someone other than holder"""
+    from .models import ShowSeat
+    
+    rows = ShowSeat.objects.filter(show_id=show_id, seat_id__in=seat_ids).filter(
+        Q(status='booked') |
+        (Q(status='held', held_until__gt=timezone.now()) & ~Q(holder=holder))
+    )
+    return set(rows.values_list('seat_id', flat=True))
+
+def mark_booked(booking):
+    """Turn the booking's claims into sold seats, returning how many were still held"""
+    from .models import ShowSeat
+    
+    return ShowSeat.objects.filter(booking=booking, status='held').update(
+        status='booked', held_until=None, updated_at=timezone.now()
+    )
+
+def booked_seat_count(booking):
+    """How many seats the booking has sold"""
+    from .models import ShowSeat
+    
+    return ShowSeat.objects.filter(booking=booking, status='booked').count()
+
+def mark_available(booking):
+    """Release every seat claimed or sold by the booking, returning how many had been sold"""
+    from .models import ShowSeat
+    
+    released = {
+        'status': 'available',
+        'holder': None,
+        'held_until': None,
+        'booking': None,
+        'updated_at': timezone.now(),
+    }
+    sold = ShowSeat.objects.filter(booking=booking, status='booked').update(**released)
+    ShowSeat.objects.filter(booking=booking).update(**released)
+    return sold
\ No newline at end of file
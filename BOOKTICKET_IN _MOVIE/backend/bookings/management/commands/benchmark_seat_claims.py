@@ -0,0 +1,111 @@
+import random
+import statistics
+import threading
+import time
+import uuid
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from bookings.inventory import claim_seats, seed_inventory
+from bookings.models import ShowSeat
+from theaters.models import Show
+
+class Command(BaseCommand):
+    """
+    Measure seat claims per second with many concurrent clients on one show.
+    
+    Every client repeatedly claims a random set of still-available seats
+    until the show sells out or the duration runs out. Claims made by the
+    benchmark are released again afterwards unless --keep is given.
+    """
+    help = 'Benchmark concurrent seat claims on a single show'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('show_id', type=int)
+        parser.add_argument('--clients', type=int, default=50)
+        parser.add_argument('--seats', type=int, default=2, help='Seats per booking')
+        parser.add_argument('--duration', type=float, default=30.0, help='Maximum run time in seconds')
+        parser.add_argument('--keep', action='store_true', help='Leave the claimed seats held')
+    
+    def handle(self, *args, **options):
+        try:
+            show = Show.objects.get(id=options['show_id'])
+        except Show.DoesNotExist:
+            raise CommandError('Show not found')
+        
+        seed_inventory(show.id)
+        free = set(ShowSeat.objects.filter(
+            show=show, status='available'
+        ).values_list('seat_id', flat=True))
+        if len(free) < options['seats']:
+            raise CommandError('Show has too few available seats to benchmark')
+        
+        run = uuid.uuid4().hex[:8]
+        prefix = f'bench:{run}:'
+        held_until = timezone.now() + timezone.timedelta(minutes=10)
+        lock = threading.Lock()
+        barrier = threading.Barrier(options['clients'])
+        deadline = [0.0]
+        latencies = []
+        results = {'claimed': 0, 'conflicts': 0, 'seats': 0}
+        
+        def client(number):
+            holder = f'{prefix}{number}'
+            try:
+                barrier.wait()
+                while time.monotonic() < deadline[0]:
+                    with lock:
+                        if len(free) < options['seats']:
+                            return
+                        picks = random.sample(sorted(free), options['seats'])
+                    
+                    started = time.perf_counter()
+                    ok = claim_seats(show.id, picks, holder, held_until)
+                    elapsed = time.perf_counter() - started
+                    
+                    with lock:
+                        latencies.append(elapsed)
+                        if ok:
+                            results['claimed'] += 1
+                            results['seats'] += len(picks)
+                            free.difference_update(picks)
+                        else:
+                            results['conflicts'] += 1
+            finally:
+                connection.close()
+        
+        threads = [
+            threading.Thread(target=client, args=(number,))
+            for number in range(options['clients'])
+        ]
+        deadline[0] = time.monotonic() + options['duration']
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        
+        held = ShowSeat.objects.filter(show=show, holder__startswith=prefix).count()
+        
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] if latencies else 0
+        self.stdout.write(f"Clients:          {options['clients']}")
+        self.stdout.write(f"Bookings claimed: {results['claimed']} ({results['seats']} seats)")
+        self.stdout.write(f"Conflicts:        {results['conflicts']}")
+        self.stdout.write(f"Elapsed:          {elapsed:.2f}s")
+        self.stdout.write(f"Bookings/sec:     {results['claimed'] / elapsed:.1f}")
+        if latencies:
+            self.stdout.write(f"Latency p50/p99:  {statistics.median(latencies) * 1000:.1f}ms / {p99 * 1000:.1f}ms")
+        
+        if held != results['seats']:
+            self.stdout.write(self.style.ERROR(
+                f"Inventory holds {held} benchmark seats but {results['seats']} were claimed"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('No seat was claimed twice'))
+        
+        if not options['keep']:
+            ShowSeat.objects.filter(show=show, holder__startswith=prefix).update(
+                status='available', holder=None, held_until=None, booking=None
+            )
\ No newline at end of file
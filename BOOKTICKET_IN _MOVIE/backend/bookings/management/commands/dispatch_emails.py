@@ -0,0 +1,33 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from bookings.outbox import DEFAULT_BATCH_SIZE, dispatch_pending
+
+class Command(BaseCommand):
+    """
+    Long-running dispatcher that delivers emails queued in the outbox
+    """
+    help = 'Deliver pending outbox emails in batches over one SMTP connection'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds to sleep once the outbox is drained')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Emails claimed per batch')
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the outbox once and exit')
+    
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            sent, seconds = dispatch_pending(batch_size=options['batch_size'])
+            if sent or options['once']:
+                rate = sent / seconds if seconds else 0
+                self.stdout.write(f'Sent {sent} emails in {seconds:.2f}s ({rate:.0f}/s)')
+            
+            if options['once']:
+                break
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                break
@@ -0,0 +1,31 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from bookings.expiry import DEFAULT_CHUNK_SIZE, expire_due_bookings
+
+class Command(BaseCommand):
+    """
+    Long-running sweeper that expires abandoned pending bookings
+    """
+    help = 'Expire pending bookings past their expiry time'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=30.0,
+                            help='Seconds to sleep between sweeps')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Bookings expired per UPDATE')
+        parser.add_argument('--once', action='store_true',
+                            help='Run a single sweep and exit')
+    
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            rows, seconds = expire_due_bookings(chunk_size=options['chunk_size'])
+            self.stdout.write(f'Expired {rows} bookings in {seconds * 1000:.1f}ms')
+            
+            if options['once']:
+                break
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                break
\ No newline at end of file
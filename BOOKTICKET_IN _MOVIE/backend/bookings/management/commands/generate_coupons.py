@@ -0,0 +1,73 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from bookings.coupon_codes import (
+    DEFAULT_ALPHABET, DEFAULT_BATCH_SIZE, DEFAULT_LENGTH, generate_coupons, import_coupons
+)
+from bookings.models import Coupon
+
+class Command(BaseCommand):
+    """
+    Create campaign coupons in bulk on the terms of an existing coupon.
+    
+    Codes are either generated at random (--count) or streamed from a CSV
+    file with a code column (--import).
+    """
+    help = 'Generate or import coupon codes in bulk, copying terms from a template coupon'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('template', help='Code of the coupon whose terms the new codes copy')
+        parser.add_argument('--count', type=int, help='Number of random codes to generate')
+        parser.add_argument('--import', dest='csv_path', help='CSV file with a code column to import')
+        parser.add_argument('--length', type=int, default=DEFAULT_LENGTH)
+        parser.add_argument('--alphabet', default=DEFAULT_ALPHABET)
+        parser.add_argument('--prefix', default='')
+        parser.add_argument('--usage-limit', type=int, default=1, help='Redemptions allowed per code')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    
+    def handle(self, *args, **options):
+        try:
+            template = Coupon.objects.get(code=options['template'])
+        except Coupon.DoesNotExist:
+            raise CommandError('Template coupon not found')
+        if bool(options['count']) == bool(options['csv_path']):
+            raise CommandError('Pass exactly one of --count or --import')
+        
+        started = time.perf_counter()
+        
+        def progress(created):
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'{created} codes created ({created / max(elapsed, 0.001):.0f}/s)')
+        
+        if options['count']:
+            if len(options['prefix']) + options['length'] > Coupon._meta.get_field('code').max_length:
+                raise CommandError('Prefix and length exceed the maximum code length')
+            try:
+                created = generate_coupons(
+                    template, options['count'],
+                    length=options['length'],
+                    alphabet=options['alphabet'],
+                    prefix=options['prefix'],
+                    usage_limit=options['usage_limit'],
+                    batch_size=options['batch_size'],
+                    progress=progress
+                )
+            except ValueError as e:
+                raise CommandError(str(e))
+            skipped = 0
+        else:
+            try:
+                with open(options['csv_path'], newline='') as file:
+                    created, skipped = import_coupons(
+                        template, file,
+                        usage_limit=options['usage_limit'],
+                        batch_size=options['batch_size'],
+                        progress=progress
+                    )
+            except OSError as e:
+                raise CommandError(str(e))
+        
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {created} coupons in {elapsed:.1f}s'
+            + (f', skipped {skipped} existing codes' if skipped else '')
+        ))
@@ -0,0 +1,145 @@
+import statistics
+import threading
+import time
+import uuid
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.test import APIClient
+from bookings.inventory import seed_inventory
+from bookings.models import Booking, ShowSeat
+from bookings.waiting_room import invalidate_admission_rate, queue_metrics
+from theaters.models import Show
+
+def p99(values):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * 0.99))] if values else 0
+
+class Command(BaseCommand):
+    """
+    Load test booking creation behind the waiting room.
+    
+    Temporary users arrive at --overload times the show's admission rate,
+    join the queue, poll until admitted and then book seats through the
+    real views. Create latency is reported per quarter of the run to show
+    it stays flat while the queue absorbs the overload. The users and their
+    bookings are removed afterwards.
+    """
+    help = 'Load test the booking waiting room on a single show'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('show_id', type=int)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--rate', type=int, help='Admission rate to use instead of the show\'s own')
+        parser.add_argument('--overload', type=float, default=10.0, help='Arrival rate as a multiple of the admission rate')
+        parser.add_argument('--seats', type=int, default=1, help='Seats per booking')
+    
+    def handle(self, *args, **options):
+        try:
+            show = Show.objects.get(id=options['show_id'])
+        except Show.DoesNotExist:
+            raise CommandError('Show not found')
+        
+        original_rate = show.queue_admission_rate
+        rate = options['rate'] or original_rate
+        if not rate:
+            raise CommandError('Show has no waiting room; pass --rate')
+        if rate != original_rate:
+            Show.objects.filter(id=show.id).update(queue_admission_rate=rate)
+            invalidate_admission_rate(show.id)
+        
+        seed_inventory(show.id)
+        free = list(ShowSeat.objects.filter(show=show, status='available').values_list('seat_id', flat=True))
+        if len(free) < options['users'] * options['seats']:
+            raise CommandError('Show has too few available seats for this many users')
+        
+        run = uuid.uuid4().hex[:8]
+        User = get_user_model()
+        User.objects.bulk_create([
+            User(
+                email=f'loadtest-{run}-{number}@example.invalid',
+                username=f'loadtest-{run}-{number}',
+                first_name='Load',
+                last_name='Test'
+            )
+            for number in range(options['users'])
+        ])
+        users = list(User.objects.filter(username__startswith=f'loadtest-{run}-'))
+        
+        arrival_rate = rate * options['overload']
+        lock = threading.Lock()
+        results = []
+        started = time.perf_counter()
+        
+        def client(number, user):
+            client = APIClient()
+            client.force_authenticate(user)
+            try:
+                time.sleep(max(number / arrival_rate - (time.perf_counter() - started), 0))
+                arrived = time.perf_counter()
+                
+                ticket = client.post(f'/api/bookings/queue/{show.id}/join/').data
+                while not ticket['admitted']:
+                    time.sleep(min(ticket['retry_after'], 1))
+                    ticket = client.get(
+                        f'/api/bookings/queue/{show.id}/status/', HTTP_X_QUEUE_TOKEN=ticket['token']
+                    ).data
+                admitted = time.perf_counter()
+                
+                with lock:
+                    seat_ids = [free.pop() for _ in range(options['seats'])]
+                response = client.post('/api/bookings/create/', {
+                    'show': show.id,
+                    'seat_ids': seat_ids,
+                    'phone_number': '9999999999',
+                    'email': user.email
+                }, format='json', HTTP_X_QUEUE_TOKEN=ticket['token'])
+                finished = time.perf_counter()
+                
+                with lock:
+                    results.append((arrived - started, admitted - arrived, finished - admitted, response.status_code))
+            finally:
+                connection.close()
+        
+        threads = [
+            threading.Thread(target=client, args=(number, user))
+            for number, user in enumerate(users)
+        ]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            metrics = queue_metrics(show.id, rate)
+        finally:
+            for booking in Booking.objects.filter(user__in=users, status='pending'):
+                booking.cancel_booking()
+            User.objects.filter(id__in=[user.id for user in users]).delete()
+            if rate != original_rate:
+                Show.objects.filter(id=show.id).update(queue_admission_rate=original_rate)
+                invalidate_admission_rate(show.id)
+        
+        created = [result for result in results if result[3] == 201]
+        waits = [result[1] for result in results]
+        latencies = [result[2] for result in created]
+        
+        self.stdout.write(f"Users:            {options['users']} arriving at {arrival_rate:.0f}/s")
+        self.stdout.write(f"Admission rate:   {rate}/s (measured {len(results) / elapsed:.1f}/s)")
+        self.stdout.write(f"Bookings created: {len(created)} of {len(results)}")
+        if waits:
+            self.stdout.write(f"Queue wait p50/max: {statistics.median(waits):.1f}s / {max(waits):.1f}s")
+        if latencies:
+            self.stdout.write(
+                f"Create p50/p99:   {statistics.median(latencies) * 1000:.1f}ms / {p99(latencies) * 1000:.1f}ms"
+            )
+        
+        # Arrivals split into quarters of the run
+        results.sort()
+        quarter = max(len(results) // 4, 1)
+        for number in range(4):
+            chunk = [result[2] for result in results[number * quarter:(number + 1) * quarter] if result[3] == 201]
+            if chunk:
+                self.stdout.write(f"  Quarter {number + 1} create p99: {p99(chunk) * 1000:.1f}ms")
+        if metrics:
+            self.stdout.write(f"Queue: {metrics['joined']} joined, {metrics['waiting']} waiting, {metrics['bookings']} booked")
\ No newline at end of file
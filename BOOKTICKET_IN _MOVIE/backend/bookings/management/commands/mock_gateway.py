@@ -0,0 +1,36 @@
+import time
+from django.core.management.base import BaseCommand
+from bookings.mock_gateway import serve
+
+class Command(BaseCommand):
+    """
+    Run the local HTTP payment gateway used with HttpGatewayClient
+    """
+    help = 'Serve a mock payment gateway that reports outcomes through the payment webhook'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--delay', type=float, default=1.0,
+                            help='Seconds before a charge is settled')
+        parser.add_argument('--failure-rate', type=float, default=0.0,
+                            help='Share of charges that fail, between 0 and 1')
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Results per webhook delivery')
+    
+    def handle(self, *args, **options):
+        server, gateway = serve(
+            options['host'], options['port'],
+            delay=options['delay'],
+            failure_rate=options['failure_rate'],
+            batch_size=options['batch_size']
+        )
+        self.stdout.write(f"Mock gateway listening on http://{options['host']}:{options['port']}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            gateway.stop()
+            server.shutdown()
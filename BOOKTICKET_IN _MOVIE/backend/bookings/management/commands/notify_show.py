@@ -0,0 +1,48 @@
+import time
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand, CommandError
+from bookings.models import Booking
+from bookings.notifications import DEFAULT_BATCH_SIZE, SUBJECTS, render_bulk, to_message
+
+class Command(BaseCommand):
+    """
+    Send a notification to every ticket holder of a show
+    """
+    help = 'Render a notification for each confirmed booking of a show and send it'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('show_id', type=int)
+        parser.add_argument('--template', choices=sorted(SUBJECTS), default='booking_confirmation')
+        parser.add_argument('--workers', type=int, help='Render processes (defaults to one per CPU)')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Bookings loaded and rendered per batch')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Render without sending, to measure rendering throughput')
+    
+    def handle(self, *args, **options):
+        booking_ids = Booking.objects.filter(
+            show_id=options['show_id'], status='confirmed'
+        ).order_by('id').values_list('id', flat=True)
+        if not booking_ids.exists():
+            raise CommandError('No confirmed bookings for this show')
+        
+        started = time.perf_counter()
+        rendered = sent = 0
+        connection = None if options['dry_run'] else get_connection()
+        try:
+            for batch in render_bulk(
+                options['template'], booking_ids.iterator(),
+                batch_size=options['batch_size'],
+                workers=options['workers']
+            ):
+                rendered += len(batch)
+                if connection is not None:
+                    sent += connection.send_messages([to_message(email, connection) for email in batch]) or 0
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'{rendered} rendered, {sent} sent ({rendered / elapsed * 60:.0f}/min)')
+        finally:
+            if connection is not None:
+                connection.close()
+        
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Rendered {rendered} and sent {sent} emails in {elapsed:.1f}s'))
@@ -0,0 +1,68 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from bookings.models import Coupon, CouponUsage, CouponUserCount
+
+class Command(BaseCommand):
+    """
+    Detect and repair drift in the coupon redemption counters
+    """
+    help = 'Recompute Coupon.used_count and per-user coupon counters from coupon usages'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--coupon', action='append', dest='codes',
+                            help='Coupon code to reconcile (repeatable)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drift without fixing it')
+    
+    def handle(self, *args, **options):
+        coupons = Coupon.objects.all()
+        if options['codes']:
+            coupons = coupons.filter(code__in=options['codes'])
+        usages = CouponUsage.objects.filter(coupon__in=coupons)
+        
+        totals = dict(usages.values('coupon_id').annotate(total=Count('id')).values_list('coupon_id', 'total'))
+        checked = drifted = 0
+        for coupon_id, code, used_count in coupons.values_list('id', 'code', 'used_count').iterator():
+            checked += 1
+            total = totals.get(coupon_id, 0)
+            if used_count == total:
+                continue
+            drifted += 1
+            self.stdout.write(f'Coupon {code}: used {used_count} -> {total}')
+            if not options['dry_run']:
+                Coupon.objects.filter(id=coupon_id).update(used_count=total)
+        
+        counters = {
+            (coupon_id, user_id): (counter_id, used_count)
+            for counter_id, coupon_id, user_id, used_count in CouponUserCount.objects.filter(
+                coupon__in=coupons
+            ).values_list('id', 'coupon_id', 'user_id', 'used_count').iterator()
+        }
+        missing = []
+        changed = []
+        for coupon_id, user_id, total in usages.values('coupon_id', 'user').annotate(
+            total=Count('id')
+        ).values_list('coupon_id', 'user', 'total').iterator():
+            counter_id, used_count = counters.pop((coupon_id, user_id), (None, 0))
+            if counter_id is None:
+                missing.append(CouponUserCount(coupon_id=coupon_id, user_id=user_id, used_count=total))
+            elif used_count != total:
+                changed.append(CouponUserCount(id=counter_id, used_count=total))
+        # Counters left over have no usages behind them
+        changed += [CouponUserCount(id=counter_id, used_count=0) for counter_id, used_count in counters.values() if used_count]
+        
+        self.stdout.write(f'Per-user counters: {len(missing)} missing, {len(changed)} drifted')
+        if not options['dry_run']:
+            CouponUserCount.objects.bulk_create(missing, batch_size=1000)
+            CouponUserCount.objects.bulk_update(changed, ['used_count'], batch_size=1000)
+            # Cached per-user counts may predate the repair
+            cache.delete_many([
+                CouponUserCount.cache_key(counter.coupon_id, counter.user_id) for counter in missing
+            ] + [
+                CouponUserCount.cache_key(counter.coupon_id, counter.user_id)
+                for counter in CouponUserCount.objects.filter(id__in=[counter.id for counter in changed])
+            ])
+        
+        action = 'found' if options['dry_run'] else 'repaired'
+        self.stdout.write(self.style.SUCCESS(f'Checked {checked} coupons, {action} drift in {drifted}'))
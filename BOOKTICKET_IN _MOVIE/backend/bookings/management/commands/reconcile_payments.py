@@ -0,0 +1,49 @@
+import csv
+import sys
+import time
+from collections import Counter
+from django.core.management.base import BaseCommand, CommandError
+from bookings.reconciliation import (
+    DEFAULT_CHUNK_SIZE, REPORT_FIELDS, SettlementFileError, read_settlement, reconcile, stream_payments
+)
+
+class Command(BaseCommand):
+    """
+    Compare payments against a gateway settlement file in a single pass
+    """
+    help = 'Reconcile payments with a settlement file sorted by payment_id and report mismatches'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('settlement', help='Settlement file (CSV or JSON lines)')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='File format; guessed from the extension by default')
+        parser.add_argument('--output', help='Mismatch report CSV (defaults to stdout)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Payments read per query')
+    
+    def handle(self, *args, **options):
+        path = options['settlement']
+        format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.json')) else 'csv')
+        started = time.perf_counter()
+        issues = Counter()
+        
+        try:
+            with open(path, newline='') as file:
+                output = open(options['output'], 'w', newline='') if options['output'] else sys.stdout
+                try:
+                    report = csv.DictWriter(output, fieldnames=REPORT_FIELDS)
+                    report.writeheader()
+                    for issue in reconcile(
+                        stream_payments(options['chunk_size']), read_settlement(file, format)
+                    ):
+                        issues[issue['issue']] += 1
+                        report.writerow(issue)
+                finally:
+                    if output is not sys.stdout:
+                        output.close()
+        except (OSError, SettlementFileError) as e:
+            raise CommandError(str(e))
+        
+        elapsed = time.perf_counter() - started
+        summary = ', '.join(f'{count} {issue}' for issue, count in sorted(issues.items())) or 'no mismatches'
+        self.stderr.write(self.style.SUCCESS(f'Reconciled in {elapsed:.1f}s: {summary}'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from bookings.inventory import seed_inventory
+from theaters.models import Show
+
+class Command(BaseCommand):
+    """
+    Create show_seats inventory rows ahead of an on-sale
+    """
+    help = 'Create missing seat inventory rows for shows'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--show', type=int, action='append', dest='show_ids',
+                            help='Show id to seed (repeatable)')
+    
+    def handle(self, *args, **options):
+        shows = Show.objects.filter(is_active=True, show_date__gte=timezone.now().date())
+        if options['show_ids']:
+            shows = Show.objects.filter(id__in=options['show_ids'])
+        
+        seeded = 0
+        for show_id in shows.values_list('id', flat=True).iterator():
+            seed_inventory(show_id)
+            seeded += 1
+        
+        self.stdout.write(self.style.SUCCESS(f'Seeded inventory for {seeded} shows'))
\ No newline at end of file
@@ -0,0 +1,73 @@
+import socketserver
+import threading
+import time
+from django.core.management.base import BaseCommand
+
+class SinkHandler(socketserver.StreamRequestHandler):
+    """
+    Minimal SMTP session that accepts and discards every message
+    """
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+    
+    def handle(self):
+        self.reply('220 moviebook smtp sink')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].upper()
+            if command in (b'EHLO', b'HELO'):
+                self.reply('250 moviebook')
+            elif command == b'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                for data in iter(self.rfile.readline, b''):
+                    if data in (b'.\r\n', b'.\n'):
+                        break
+                self.server.count()
+                self.reply('250 OK')
+            elif command == b'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+class SinkServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    
+    def __init__(self, address):
+        super().__init__(address, SinkHandler)
+        self.received = 0
+        self._lock = threading.Lock()
+    
+    def count(self):
+        with self._lock:
+            self.received += 1
+
+class Command(BaseCommand):
+    """
+    Local SMTP server that swallows mail, for measuring dispatcher throughput
+    """
+    help = 'Run an SMTP sink that accepts and counts messages'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=1025)
+    
+    def handle(self, *args, **options):
+        server = SinkServer((options['host'], options['port']))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.stdout.write(f"SMTP sink listening on {options['host']}:{options['port']}")
+        
+        last = 0
+        try:
+            while True:
+                time.sleep(1)
+                if server.received != last:
+                    self.stdout.write(f'{server.received} messages received ({server.received - last}/s)')
+                    last = server.received
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.shutdown()
@@ -0,0 +1,133 @@
+"""
+Local HTTP payment gateway for development and tests.
+
+It accepts charges on POST /charges and answers at once with a pending
+status, like a real gateway would. Outcomes are decided after a delay and
+posted back to each charge's callback_url in signed batches, so the whole
+asynchronous flow (worker, webhook, settlement) runs without a real
+provider. Run it with the mock_gateway command.
+"""
+import json
+import logging
+import random
+import threading
+import time
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .payments import RESULT_FAILED, RESULT_SUCCESS, SIGNATURE_HEADER, sign
+
+logger = logging.getLogger(__name__)
+
+class MockGateway:
+    """
+    Charge queue and webhook dispatcher behind the mock HTTP server
+    """
+    def __init__(self, delay=1.0, failure_rate=0.0, batch_size=100):
+        self.delay = delay
+        self.failure_rate = failure_rate
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._pending = []
+        self._stopped = threading.Event()
+    
+    def submit(self, charge):
+        """Queue a charge and return the gateway's immediate reply"""
+        transaction_id = f"MOCK_{uuid.uuid4().hex[:16].upper()}"
+        with self._lock:
+            self._pending.append((time.monotonic() + self.delay, transaction_id, charge))
+        return {'status': 'pending', 'transaction_id': transaction_id}
+    
+    def _due(self):
+        now = time.monotonic()
+        with self._lock:
+            due = [entry for entry in self._pending if entry[0] <= now]
+            self._pending = [entry for entry in self._pending if entry[0] > now]
+        return due
+    
+    def dispatch(self):
+        """Post every due outcome to its callback URL, returning how many were sent"""
+        batches = {}
+        for _, transaction_id, charge in self._due():
+            # Redelivered outcomes keep the status they were first given
+            outcome = charge.get('status') or (
+                RESULT_FAILED if random.random() < self.failure_rate else RESULT_SUCCESS
+            )
+            batches.setdefault(charge['callback_url'], []).append({
+                'payment_id': charge['payment_id'],
+                'status': outcome,
+                'transaction_id': transaction_id,
+                'amount': charge.get('amount'),
+                'gateway': 'mock-http',
+            })
+        
+        sent = 0
+        for url, events in batches.items():
+            for start in range(0, len(events), self.batch_size):
+                batch = events[start:start + self.batch_size]
+                body = json.dumps({'events': batch}).encode()
+                request = urllib.request.Request(url, data=body, headers={
+                    'Content-Type': 'application/json',
+                    SIGNATURE_HEADER: sign(body),
+                })
+                try:
+                    urllib.request.urlopen(request, timeout=10).close()
+                    sent += len(batch)
+                except OSError as e:
+                    logger.warning("Webhook delivery to %s failed: %s", url, e)
+                    # Redeliver on the next tick, as real gateways retry
+                    with self._lock:
+                        self._pending.extend(
+                            (0, event['transaction_id'], {**event, 'callback_url': url})
+                            for event in batch
+                        )
+        return sent
+    
+    def run_dispatcher(self, interval=0.5):
+        while not self._stopped.wait(interval):
+            self.dispatch()
+    
+    def stop(self):
+        self._stopped.set()
+    
+    def handler(self):
+        gateway = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path.rstrip('/') != '/charges':
+                    self.send_error(404)
+                    return
+                try:
+                    length = int(self.headers.get('Content-Length', 0))
+                    charge = json.loads(self.rfile.read(length))
+                except ValueError:
+                    charge = None
+                if not isinstance(charge, dict) or not charge.get('payment_id') or not charge.get('callback_url'):
+                    self.send_error(400)
+                    return
+                
+                body = json.dumps(gateway.submit(charge)).encode()
+                self.send_response(202)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                logger.debug(format, *args)
+        
+        return Handler
+
+def serve(host='127.0.0.1', port=8765, **options):
+    """
+    Start the mock gateway in background threads.
+    
+    Returns (server, gateway); call server.shutdown() and gateway.stop()
+    when done.
+    """
+    gateway = MockGateway(**options)
+    server = ThreadingHTTPServer((host, port), gateway.handler())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    threading.Thread(target=gateway.run_dispatcher, daemon=True).start()
+    return server, gateway
@@ -1,7 +1,9 @@
-from django.db import models
+from django.db import models, transaction
+from django.core.cache import cache
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 import uuid
+from .transitions import TransitionConflict, transition, transition_many
 
 class Booking(models.Model):
     """
@@ -18,9 +20,13 @@ class Booking(models.Model):
         ('pending', 'Pending'),
         ('completed', 'Completed'),
         ('failed', 'Failed'),
+        ('refund_required', 'Refund Required'),
         ('refunded', 'Refunded'),
     ]
     
+    # How long a pending booking holds its seats
+    HOLD_DURATION = timezone.timedelta(minutes=15)
+    
     # Booking details
     booking_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     user = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='bookings')
@@ -50,7 +56,7 @@ class Booking(models.Model):
     def save(self, *args, **kwargs):
         if not self.expiry_time:
             # Set expiry time to 15 minutes from booking time
-            self.expiry_time = timezone.now() + timezone.timedelta(minutes=15)
+            self.expiry_time = timezone.now() + self.HOLD_DURATION
         super().save(*args, **kwargs)
     
     def __str__(self):
@@ -77,16 +83,16 @@ class Booking(models.Model):
         return timezone.datetime.combine(self.show.show_date, self.show.show_time)
     
     def confirm_booking(self):
-        """Confirm the booking"""
-        self.status = 'confirmed'
-        self.confirmed_at = timezone.now()
-        self.save()
+        """Confirm the pending booking, rolled back if its seats are no longer held"""
+        with transaction.atomic():
+            transition(self, {'status': ('pending', 'confirmed')}, confirmed_at=timezone.now())
     
-    def cancel_booking(self):
-        """Cancel the booking"""
-        self.status = 'cancelled'
-        self.cancelled_at = timezone.now()
-        self.save()
+    def cancel_booking(self, refund=False):
+        """Cancel the booking, marking its payment refunded if asked"""
+        states = {'status': (self.status, 'cancelled')}
+        if refund:
+            states['payment_status'] = ('completed', 'refunded')
+        transition(self, states, cancelled_at=timezone.now())
     
     class Meta:
         db_table = 'bookings'
@@ -95,6 +101,7 @@ class Booking(models.Model):
             models.Index(fields=['user', 'status']),
             models.Index(fields=['booking_id']),
             models.Index(fields=['show', 'status']),
+            models.Index(fields=['status', 'expiry_time']),
         ]
 
 class BookedSeat(models.Model):
@@ -112,6 +119,42 @@ class BookedSeat(models.Model):
         db_table = 'booked_seats'
         unique_together = ('booking', 'seat')
 
+class ShowSeat(models.Model):
+    """
+    Model for per-show seat inventory, one row per show and seat
+    """
+    STATUS_CHOICES = [
+        ('available', 'Available'),
+        ('held', 'Held'),
+        ('booked', 'Booked'),
+    ]
+    
+    show = models.ForeignKey('theaters.Show', on_delete=models.CASCADE, related_name='inventory')
+    seat = models.ForeignKey('theaters.Seat', on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='available')
+    
+    # Current claim on the seat
+    booking = models.ForeignKey(Booking, on_delete=models.SET_NULL, null=True, blank=True, related_name='inventory')
+    holder = models.CharField(max_length=64, blank=True, null=True)
+    held_until = models.DateTimeField(null=True, blank=True)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.show_id} - {self.seat_id} ({self.status})"
+    
+    @property
+    def is_hold_expired(self):
+        return self.status == 'held' and timezone.now() >= self.held_until
+    
+    class Meta:
+        db_table = 'show_seats'
+        unique_together = ('show', 'seat')
+        indexes = [
+            models.Index(fields=['show', 'status']),
+            models.Index(fields=['holder']),
+        ]
+
 class Payment(models.Model):
     """
     Model for payment transactions
@@ -130,6 +173,7 @@ class Payment(models.Model):
         ('completed', 'Completed'),
         ('failed', 'Failed'),
         ('cancelled', 'Cancelled'),
+        ('refund_required', 'Refund Required'),
         ('refunded', 'Refunded'),
     ]
     
@@ -154,30 +198,54 @@ class Payment(models.Model):
         return f"Payment {self.payment_id} - {self.booking.booking_id}"
     
     def mark_completed(self, transaction_id=None, response_data=None):
-        """Mark payment as completed"""
-        self.status = 'completed'
-        self.completed_at = timezone.now()
+        """Mark the processing payment completed and confirm its booking"""
+        now = timezone.now()
+        values = {'completed_at': now}
         if transaction_id:
-            self.gateway_transaction_id = transaction_id
+            values['gateway_transaction_id'] = transaction_id
         if response_data:
-            self.gateway_response = response_data
-        self.save()
+            values['gateway_response'] = response_data
         
-        # Update booking status
-        self.booking.payment_status = 'completed'
-        self.booking.confirm_booking()
+        with transaction.atomic():
+            transition(self, {'status': ('processing', 'completed')}, **values)
+            transition(self.booking, {
+                'status': ('pending', 'confirmed'),
+                'payment_status': ('pending', 'completed'),
+            }, confirmed_at=now)
     
     def mark_failed(self, response_data=None):
-        """Mark payment as failed"""
-        self.status = 'failed'
-        self.failed_at = timezone.now()
+        """Mark the processing payment failed"""
+        values = {'failed_at': timezone.now()}
         if response_data:
-            self.gateway_response = response_data
-        self.save()
+            values['gateway_response'] = response_data
+        
+        with transaction.atomic():
+            transition(self, {'status': ('processing', 'failed')}, **values)
+            # A booking that moved on keeps its payment status
+            transition_many(Booking, [self.booking_id], {'payment_status': ('pending', 'failed')})
+    
+    def mark_refund_required(self, reason, response_data=None):
+        """
+        Settle a processing payment the gateway charged but whose booking
+        can no longer be confirmed, cancelling the booking if still pending.
         
-        # Update booking status
-        self.booking.payment_status = 'failed'
-        self.booking.save()
+        The reason is kept in gateway_response for whoever issues the refund.
+        """
+        values = {
+            'failed_at': timezone.now(),
+            'gateway_response': {**(response_data or {}), 'refund_reason': reason},
+        }
+        
+        with transaction.atomic():
+            transition(self, {'status': ('processing', 'refund_required')}, **values)
+            booking = Booking.objects.get(pk=self.booking_id)
+            if booking.status == 'pending':
+                try:
+                    booking.cancel_booking()
+                except TransitionConflict:
+                    pass
+            transition_many(Booking, [booking.pk], {'payment_status': ('pending', 'refund_required')})
+        self.booking = booking
     
     class Meta:
         db_table = 'payments'
@@ -244,13 +312,85 @@ class Coupon(models.Model):
         if not self.is_valid:
             return False
         
-        user_usage = CouponUsage.objects.filter(coupon=self, user=user).count()
-        return user_usage < self.user_limit
+        return self.user_usage_count(user) < self.user_limit
+    
+    def user_usage_count(self, user):
+        """How many times the user redeemed the coupon, cached in front of the counter table"""
+        key = CouponUserCount.cache_key(self.id, user.pk)
+        used = cache.get(key)
+        if used is None:
+            used = CouponUserCount.objects.filter(
+                coupon_id=self.id, user_id=user.pk
+            ).values_list('used_count', flat=True).first() or 0
+            cache.set(key, used, CouponUserCount.CACHE_TIMEOUT)
+        return used
+    
+    def redeem(self, user):
+        """
+        Count one use of the coupon by the user.
+        
+        Both the overall and the per-user counters are bumped with
+        conditional UPDATEs, so concurrent redemptions can never take either
+        past its limit. Returns False (changing nothing) if a limit is hit.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            redeemed = Coupon.objects.filter(
+                id=self.id,
+                is_active=True,
+                valid_from__lte=now,
+                valid_until__gte=now
+            ).filter(
+                models.Q(usage_limit__isnull=True) | models.Q(used_count__lt=models.F('usage_limit'))
+            ).update(used_count=models.F('used_count') + 1)
+            if not redeemed:
+                return False
+            
+            CouponUserCount.objects.bulk_create(
+                [CouponUserCount(coupon_id=self.id, user_id=user.pk)], ignore_conflicts=True
+            )
+            redeemed = CouponUserCount.objects.filter(
+                coupon_id=self.id,
+                user_id=user.pk,
+                used_count__lt=self.user_limit
+            ).update(used_count=models.F('used_count') + 1)
+            if not redeemed:
+                transaction.set_rollback(True)
+                return False
+        
+        key = CouponUserCount.cache_key(self.id, user.pk)
+        transaction.on_commit(lambda: cache.delete(key))
+        
+        # Catalog copies now carry a stale used_count
+        from .coupons import invalidate_coupon
+        invalidate_coupon(self.code)
+        return True
     
     class Meta:
         db_table = 'coupons'
         ordering = ['-created_at']
 
+class CouponUserCount(models.Model):
+    """
+    Number of times a user has redeemed a coupon
+    """
+    CACHE_TIMEOUT = 60 * 60
+    
+    coupon = models.ForeignKey(Coupon, on_delete=models.CASCADE, related_name='user_counts')
+    user = models.ForeignKey('users.User', on_delete=models.CASCADE)
+    used_count = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.coupon_id} - {self.user_id}: {self.used_count}"
+    
+    @staticmethod
+    def cache_key(coupon_id, user_id):
+        return f'coupon-usage:{coupon_id}:{user_id}'
+    
+    class Meta:
+        db_table = 'coupon_user_counts'
+        unique_together = ('coupon', 'user')
+
 class CouponUsage(models.Model):
     """
     Model to track coupon usage
@@ -267,4 +407,57 @@ class CouponUsage(models.Model):
     class Meta:
         db_table = 'coupon_usages'
         unique_together = ('coupon', 'booking')
-        ordering = ['-used_at']
\ No newline at end of file
+        ordering = ['-used_at']
+
+class OutboxEmail(models.Model):
+    """
+    Model for transactional emails waiting to be delivered
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    
+    template = models.CharField(max_length=50)
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='emails')
+    recipient = models.EmailField()
+    
+    # Delivery
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    
+    # Timestamps
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.template} to {self.recipient} ({self.status})"
+    
+    class Meta:
+        db_table = 'email_outbox'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+class TicketCheckIn(models.Model):
+    """
+    Model for a booking scanned in at the theater entrance
+    """
+    booking = models.OneToOneField(Booking, on_delete=models.CASCADE, related_name='check_in')
+    show = models.ForeignKey('theaters.Show', on_delete=models.CASCADE, related_name='check_ins')
+    gate = models.CharField(max_length=20, blank=True)
+    scanned_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"{self.booking_id} at {self.gate or 'gate'} ({self.scanned_at})"
+    
+    class Meta:
+        db_table = 'ticket_check_ins'
+        ordering = ['-scanned_at']
+        indexes = [
+            models.Index(fields=['show', 'scanned_at']),
+        ]
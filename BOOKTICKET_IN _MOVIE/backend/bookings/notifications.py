@@ -0,0 +1,153 @@
+"""
+Rendering of booking notification emails.
+
+Templates are compiled once per process and kept, so rendering a message
+never goes back to the template loaders. For mass sends, contexts for a
+whole batch of bookings are loaded with a handful of queries: shows,
+movies and theaters are prefetched once and shared by every booking that
+points at them instead of being loaded per recipient. Batches are split
+into chunks rendered in a process pool; each worker compiles the templates
+once and returns plain and HTML parts ready for delivery.
+"""
+import multiprocessing
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.template.loader import get_template
+
+DEFAULT_BATCH_SIZE = 2000
+
+DEFAULT_CHUNK_SIZE = 250
+
+BOOKING_CONFIRMATION = 'booking_confirmation'
+BOOKING_CANCELLATION = 'booking_cancellation'
+PAYMENT_SUCCESS = 'payment_success'
+
+SUBJECTS = {
+    BOOKING_CONFIRMATION: 'Booking Confirmation - {movie}',
+    BOOKING_CANCELLATION: 'Booking Cancelled - {movie}',
+    PAYMENT_SUCCESS: 'Payment Successful - Ticket Confirmed for {movie}',
+}
+
+RenderedEmail = namedtuple('RenderedEmail', ['booking_id', 'recipient', 'subject', 'text', 'html'])
+
+_compiled = {}
+
+def get_templates(name):
+    """Return the compiled (text, html) templates of a notification"""
+    templates = _compiled.get(name)
+    if templates is None:
+        if name not in SUBJECTS:
+            raise ValueError(f'Unknown email template {name}')
+        templates = (get_template(f'emails/{name}.txt'), get_template(f'emails/{name}.html'))
+        _compiled[name] = templates
+    return templates
+
+def email_context(booking, name):
+    context = {
+        'booking': booking,
+        'user': booking.user,
+    }
+    if name == BOOKING_CANCELLATION:
+        context['refund_amount'] = booking.final_amount if booking.payment_status == 'refunded' else 0
+        return context
+    
+    context.update({
+        'movie': booking.show.movie,
+        'theater': booking.show.screen.theater,
+        'show': booking.show,
+        'seats': booking.booked_seats.all(),
+    })
+    if name == PAYMENT_SUCCESS:
+        context['payment'] = booking.payment
+    return context
+
+def render_email(booking, name, recipient=None):
+    """Render a notification about the booking"""
+    text, html = get_templates(name)
+    context = email_context(booking, name)
+    return RenderedEmail(
+        booking.id,
+        recipient or booking.email,
+        SUBJECTS[name].format(movie=booking.movie_title),
+        text.render(context),
+        html.render(context)
+    )
+
+def to_message(rendered, connection=None):
+    """Build a sendable message from a rendered notification"""
+    message = EmailMultiAlternatives(
+        subject=rendered.subject,
+        body=rendered.text,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[rendered.recipient],
+        connection=connection
+    )
+    message.attach_alternative(rendered.html, 'text/html')
+    return message
+
+def load_bookings(booking_ids):
+    """Bookings with everything the templates read, in a few queries"""
+    from .models import Booking
+    
+    return list(Booking.objects.filter(id__in=booking_ids).select_related(
+        'user', 'payment'
+    ).prefetch_related(
+        'show__movie', 'show__screen__theater', 'booked_seats__seat'
+    ).order_by('id'))
+
+def _init_worker(name):
+    import django
+    django.setup()
+    get_templates(name)
+
+def _render_chunk(name, bookings):
+    return [render_email(booking, name) for booking in bookings]
+
+class BulkRenderer:
+    """
+    Renders notifications for many bookings, in a process pool when workers > 1
+    """
+    def __init__(self, name, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        get_templates(name)
+        self.name = name
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._pool = None
+    
+    def __enter__(self):
+        if self.workers > 1:
+            # Spawned rather than forked, so workers never inherit database sockets
+            self._pool = ProcessPoolExecutor(
+                self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(self.name,)
+            )
+        return self
+    
+    def __exit__(self, *exc_info):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+    
+    def render(self, bookings):
+        """Render the bookings, returning RenderedEmails in the same order"""
+        if self._pool is None:
+            return _render_chunk(self.name, bookings)
+        chunks = [bookings[start:start + self.chunk_size] for start in range(0, len(bookings), self.chunk_size)]
+        futures = [self._pool.submit(_render_chunk, self.name, chunk) for chunk in chunks]
+        return [rendered for future in futures for rendered in future.result()]
+
+def render_bulk(name, booking_ids, batch_size=DEFAULT_BATCH_SIZE, workers=None):
+    """
+    Yield lists of RenderedEmails for the bookings, one list per batch.
+    
+    Only one batch of bookings is loaded at a time.
+    """
+    booking_ids = list(booking_ids)
+    with BulkRenderer(name, workers) as renderer:
+        for start in range(0, len(booking_ids), batch_size):
+            yield renderer.render(load_bookings(booking_ids[start:start + batch_size]))
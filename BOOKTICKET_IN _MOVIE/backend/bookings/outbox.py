@@ -0,0 +1,116 @@
+"""
+Transactional email outbox.
+
+Booking code only writes an OutboxEmail row, inside the same transaction
+as the change it reports, so an email goes out exactly when that change
+commits and requests never wait on rendering or SMTP. The dispatch_emails
+command drains due rows in batches: each batch is claimed with SKIP LOCKED,
+rendered with the compiled notification templates and delivered over one
+reused SMTP connection. Failed deliveries are retried with exponential
+backoff until MAX_ATTEMPTS.
+"""
+import logging
+import time
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .notifications import SUBJECTS, load_bookings, render_email, to_message
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 100
+
+MAX_ATTEMPTS = 8
+
+# Delay before the first retry, doubled on every further attempt
+RETRY_DELAY = timezone.timedelta(seconds=30)
+
+# How long a claimed batch stays invisible to other dispatchers
+CLAIM_TIMEOUT = timezone.timedelta(minutes=5)
+
+def queue_email(booking, template):
+    """Add an email about the booking to the outbox in the current transaction"""
+    from .models import OutboxEmail
+    
+    if template not in SUBJECTS:
+        raise ValueError(f'Unknown email template {template}')
+    return OutboxEmail.objects.create(template=template, booking=booking, recipient=booking.email)
+
+def build_message(email, connection=None):
+    """Render an outbox email into a message ready to send"""
+    return to_message(render_email(email.booking, email.template, email.recipient), connection)
+
+def retry_delay(attempts):
+    return RETRY_DELAY * 2 ** (attempts - 1)
+
+def claim_batch(now, batch_size=DEFAULT_BATCH_SIZE):
+    """Claim up to batch_size due emails, returning them with their bookings loaded"""
+    from .models import OutboxEmail
+    
+    with transaction.atomic():
+        email_ids = list(OutboxEmail.objects.select_for_update(skip_locked=True).filter(
+            status='pending',
+            next_attempt_at__lte=now
+        ).order_by('next_attempt_at').values_list('id', flat=True)[:batch_size])
+        if not email_ids:
+            return []
+        # Pushing the due time back hides the batch if this dispatcher dies
+        OutboxEmail.objects.filter(id__in=email_ids).update(next_attempt_at=now + CLAIM_TIMEOUT)
+    
+    emails = list(OutboxEmail.objects.filter(id__in=email_ids))
+    bookings = {booking.id: booking for booking in load_bookings({email.booking_id for email in emails})}
+    for email in emails:
+        email.booking = bookings[email.booking_id]
+    return emails
+
+def send_batch(emails, connection):
+    """Deliver claimed emails over an open connection and record the outcomes"""
+    from .models import OutboxEmail
+    
+    sent = []
+    for email in emails:
+        try:
+            build_message(email, connection).send()
+        except Exception as e:
+            # Replace a possibly broken connection with a fresh one for the
+            # rest of the batch; if the server is down, later sends fail and
+            # are retried like this one
+            connection.close()
+            try:
+                connection.open()
+            except Exception as open_error:
+                logger.warning("Reopening the SMTP connection failed: %s", open_error)
+            email.attempts += 1
+            email.last_error = str(e)[:1000]
+            if email.attempts >= MAX_ATTEMPTS:
+                email.status = 'failed'
+            else:
+                email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+            email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+            continue
+        sent.append(email.id)
+    
+    OutboxEmail.objects.filter(id__in=sent).update(
+        status='sent', sent_at=timezone.now(), attempts=F('attempts') + 1
+    )
+    return len(sent)
+
+def dispatch_pending(batch_size=DEFAULT_BATCH_SIZE, connection=None):
+    """
+    Deliver every due email in batches over one SMTP connection.
+    
+    Returns a (sent, seconds) tuple for the run.
+    """
+    started = time.perf_counter()
+    connection = connection or get_connection()
+    total = 0
+    with connection:
+        while True:
+            emails = claim_batch(timezone.now(), batch_size)
+            if not emails:
+                break
+            total += send_batch(emails, connection)
+            if len(emails) < batch_size:
+                break
+    return total, time.perf_counter() - started
@@ -0,0 +1,257 @@
+"""
+Asynchronous payment processing.
+
+process_payment only moves a payment to processing and queues it; the
+gateway is called from a worker pool, never from a request thread. A
+gateway reports the outcome either straight back to the worker or later
+through the payment webhook, which takes results in batches. Both paths
+settle payments through apply_results, which moves each payment out of
+processing exactly once. Clients poll the payment or subscribe to
+ws/payments/<payment_id>/ for the outcome. The gateway client is chosen
+with PAYMENT_GATEWAY_CLIENT.
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import re
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from theaters.realtime import get_broker, wait_for_disconnect
+from .inventory import SeatsNotHeld
+from .notifications import PAYMENT_SUCCESS
+from .outbox import queue_email
+from .transitions import TransitionConflict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CLIENT = 'bookings.payments.MockGatewayClient'
+
+DEFAULT_WORKERS = 4
+
+SIGNATURE_HEADER = 'X-Gateway-Signature'
+
+RESULT_SUCCESS = 'success'
+RESULT_FAILED = 'failed'
+
+# How long a booking's seats stay held once its payment is processing
+PAYMENT_HOLD_DURATION = timezone.timedelta(minutes=30)
+
+SETTLED_STATUSES = ('completed', 'failed', 'cancelled', 'refund_required', 'refunded')
+
+STREAM_PATH = re.compile(r'^/ws/payments/(?P<payment_id>[\w-]+)/$')
+
+class BaseGatewayClient:
+    """
+    Interface for payment gateway clients
+    """
+    def charge(self, payment):
+        """
+        Submit a charge for the payment.
+        
+        Returns a result dict (payment_id, status, transaction_id) when the
+        outcome is known right away, or None when the gateway will report it
+        through the webhook.
+        """
+        raise NotImplementedError
+
+class MockGatewayClient(BaseGatewayClient):
+    """
+    In-process gateway that approves every charge immediately
+    """
+    def charge(self, payment):
+        return {
+            'payment_id': payment.payment_id,
+            'status': RESULT_SUCCESS,
+            'transaction_id': f"TXN_{payment.payment_id}",
+            'gateway': 'mock',
+        }
+
+class HttpGatewayClient(BaseGatewayClient):
+    """
+    Gateway reached over HTTP that reports outcomes through the webhook
+    """
+    def __init__(self):
+        self.url = settings.PAYMENT_GATEWAY_URL.rstrip('/') + '/charges'
+        self.callback_url = settings.PAYMENT_WEBHOOK_URL
+        self.timeout = getattr(settings, 'PAYMENT_GATEWAY_TIMEOUT', 10)
+    
+    def charge(self, payment):
+        body = json.dumps({
+            'payment_id': payment.payment_id,
+            'amount': str(payment.amount),
+            'method': payment.payment_method,
+            'callback_url': self.callback_url,
+        }).encode()
+        request = urllib.request.Request(
+            self.url, data=body, headers={'Content-Type': 'application/json'}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            result = json.loads(response.read() or b'{}')
+        if result.get('status') in (RESULT_SUCCESS, RESULT_FAILED):
+            return {'payment_id': payment.payment_id, **result}
+        return None
+
+def sign(body):
+    """Signature of a webhook body under PAYMENT_WEBHOOK_SECRET"""
+    return hmac.new(settings.PAYMENT_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+
+def verify_signature(body, signature):
+    return hmac.compare_digest(sign(body), signature or '')
+
+_client = None
+_executor = None
+_lock = threading.Lock()
+
+def get_gateway_client():
+    """Return the configured gateway client instance"""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                path = getattr(settings, 'PAYMENT_GATEWAY_CLIENT', DEFAULT_CLIENT)
+                _client = import_string(path)()
+    return _client
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'PAYMENT_WORKERS', DEFAULT_WORKERS),
+                    thread_name_prefix='payments'
+                )
+    return _executor
+
+def enqueue_payment(payment_id):
+    """Hand the payment to the worker pool once the transaction commits"""
+    transaction.on_commit(lambda: _get_executor().submit(_charge, payment_id))
+
+def _charge(payment_id):
+    from .models import Payment
+    
+    close_old_connections()
+    try:
+        payment = Payment.objects.filter(payment_id=payment_id, status='processing').first()
+        if payment is None:
+            return
+        try:
+            result = get_gateway_client().charge(payment)
+        except Exception as e:
+            logger.warning("Gateway charge for payment %s failed: %s", payment_id, e)
+            result = {'payment_id': payment_id, 'status': RESULT_FAILED, 'error': str(e)}
+        if result is not None:
+            apply_results([result])
+    except Exception:
+        logger.exception("Processing payment %s failed", payment_id)
+    finally:
+        close_old_connections()
+
+def apply_results(results):
+    """
+    Settle processing payments from a batch of gateway results.
+    
+    Results for unknown or already settled payments are ignored, so
+    redelivered webhooks are harmless. Returns how many payments settled.
+    """
+    from .models import Payment
+    
+    by_id = {
+        result['payment_id']: result for result in results
+        if isinstance(result, dict) and result.get('status') in (RESULT_SUCCESS, RESULT_FAILED)
+    }
+    if not by_id:
+        return 0
+    
+    settled = []
+    with transaction.atomic():
+        payments = Payment.objects.select_for_update().select_related('booking').filter(
+            payment_id__in=list(by_id), status='processing'
+        )
+        for payment in payments:
+            result = by_id[payment.payment_id]
+            try:
+                if result['status'] == RESULT_SUCCESS:
+                    payment.mark_completed(
+                        transaction_id=result.get('transaction_id'),
+                        response_data=result
+                    )
+                    queue_email(payment.booking, PAYMENT_SUCCESS)
+                else:
+                    payment.mark_failed(response_data=result)
+            except (TransitionConflict, SeatsNotHeld) as e:
+                # Charged, but the booking moved on meanwhile and can't be confirmed
+                logger.warning("Payment %s needs a refund: %s", payment.payment_id, e)
+                payment.mark_refund_required(str(e), response_data=result)
+            settled.append(payment)
+    
+    for payment in settled:
+        publish_outcome(payment)
+    return len(settled)
+
+def channel_for(payment_id):
+    return f'payment:{payment_id}'
+
+def status_message(payment):
+    return {
+        'type': 'payment',
+        'payment_id': payment.payment_id,
+        'status': payment.status,
+        'booking_id': str(payment.booking.booking_id),
+    }
+
+def publish_outcome(payment):
+    """Tell subscribers of the payment how it settled"""
+    get_broker().publish(channel_for(payment.payment_id), status_message(payment))
+
+def _current_status(payment_id):
+    from .models import Payment
+    
+    payment = Payment.objects.select_related('booking').filter(payment_id=payment_id).first()
+    if payment is None:
+        return None
+    return status_message(payment)
+
+async def payment_stream(scope, receive, send):
+    """ASGI application for ws/payments/<payment_id>/"""
+    match = STREAM_PATH.match(scope['path'])
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    if match is None:
+        await send({'type': 'websocket.close', 'code': 4404})
+        return
+    
+    channel = channel_for(match.group('payment_id'))
+    broker = get_broker()
+    # Subscribe before reading the status so the outcome can't slip past
+    queue = broker.subscribe(channel)
+    try:
+        current = await sync_to_async(_current_status)(match.group('payment_id'))
+        if current is None:
+            await send({'type': 'websocket.close', 'code': 4404})
+            return
+        
+        await send({'type': 'websocket.accept'})
+        await send({'type': 'websocket.send', 'text': json.dumps(current)})
+        
+        if current['status'] not in SETTLED_STATUSES:
+            disconnected = asyncio.ensure_future(wait_for_disconnect(receive, queue))
+            try:
+                text = await queue.get()
+                if text is None:
+                    return
+                await send({'type': 'websocket.send', 'text': text})
+            finally:
+                disconnected.cancel()
+        await send({'type': 'websocket.close', 'code': 1000})
+    finally:
+        broker.unsubscribe(channel, queue)
@@ -0,0 +1,69 @@
+"""
+Seat pricing for shows.
+
+ShowPricing loads a show's whole ShowSeatPricing table in one query and
+prices any set of seats from memory. Quotes carry the per-seat prices and
+totals so the same numbers can be shown, validated and stored.
+"""
+CONVENIENCE_FEE_PER_TICKET = 20
+
+class PriceQuote:
+    """
+    Priced set of seats for a show
+    """
+    def __init__(self, seat_prices, convenience_fee, discount_amount=0, coupon=None):
+        self.seat_prices = seat_prices
+        self.total_amount = sum(seat_prices.values())
+        self.convenience_fee = convenience_fee
+        self.discount_amount = discount_amount
+        self.coupon = coupon
+    
+    @property
+    def quantity(self):
+        return len(self.seat_prices)
+    
+    @property
+    def final_amount(self):
+        return self.total_amount + self.convenience_fee - self.discount_amount
+    
+    def as_dict(self):
+        return {
+            'seat_prices': self.seat_prices,
+            'quantity': self.quantity,
+            'total_amount': self.total_amount,
+            'convenience_fee': self.convenience_fee,
+            'discount_amount': self.discount_amount,
+            'final_amount': self.final_amount,
+            'coupon_code': self.coupon.code if self.coupon else None,
+        }
+
+class ShowPricing:
+    """
+    In-memory seat category -> price map for a show
+    """
+    def __init__(self, show, category_prices):
+        self.show = show
+        self.category_prices = category_prices
+    
+    @classmethod
+    def for_show(cls, show):
+        from theaters.models import ShowSeatPricing
+        
+        return cls(show, dict(
+            ShowSeatPricing.objects.filter(show=show).values_list('seat_category_id', 'price')
+        ))
+    
+    def price_for(self, category_id):
+        """Price of a seat category, falling back to the show's base price"""
+        return self.category_prices.get(category_id, self.show.base_price)
+    
+    def quote(self, seats, coupon=None, user=None):
+        """Price the seats in one pass, applying the coupon if the user may use it"""
+        seat_prices = {seat.id: self.price_for(seat.category_id) for seat in seats}
+        quote = PriceQuote(seat_prices, len(seat_prices) * CONVENIENCE_FEE_PER_TICKET)
+        
+        if coupon is not None and (user is None or coupon.can_be_used_by_user(user)):
+            quote.discount_amount = coupon.calculate_discount(quote.total_amount)
+            if quote.discount_amount > 0:
+                quote.coupon = coupon
+        return quote
\ No newline at end of file
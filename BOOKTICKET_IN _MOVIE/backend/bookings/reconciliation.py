@@ -0,0 +1,143 @@
+"""
+Reconciliation of payments against a gateway settlement file.
+
+The settlement file (CSV with a header row, or JSON lines) has one record
+per charge with payment_id, transaction_id, amount and status, sorted by
+payment_id. Payments are streamed in the same order and the two sides are
+merge-joined, so memory stays flat however many rows there are (payment
+ids are upper-case ASCII, so the database and a plain sort agree on the
+order). Payments are read a page at a time by key: MySQL drivers buffer a
+whole result set even behind .iterator(), so one long query would not
+stay flat there.
+"""
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+from .payments import RESULT_FAILED, RESULT_SUCCESS
+
+DEFAULT_CHUNK_SIZE = 2000
+
+SETTLEMENT_REFUNDED = 'refunded'
+
+# Settlement status each payment status should match; None means no charge
+EXPECTED_SETTLEMENT = {
+    'completed': RESULT_SUCCESS,
+    'refund_required': RESULT_SUCCESS,
+    'refunded': SETTLEMENT_REFUNDED,
+    'failed': RESULT_FAILED,
+}
+
+MISSING_IN_SETTLEMENT = 'missing_in_settlement'
+UNKNOWN_PAYMENT = 'unknown_payment'
+STATUS_MISMATCH = 'status'
+AMOUNT_MISMATCH = 'amount'
+TRANSACTION_MISMATCH = 'transaction_id'
+
+REPORT_FIELDS = (
+    'payment_id', 'issue', 'payment_status', 'settlement_status',
+    'amount', 'settlement_amount', 'transaction_id', 'settlement_transaction_id'
+)
+
+class SettlementFileError(ValueError):
+    pass
+
+def read_settlement(file, format='csv'):
+    """Yield settlement records from an open file, checking they are sorted"""
+    rows = csv.DictReader(file) if format == 'csv' else (
+        json.loads(line) for line in file if line.strip()
+    )
+    previous = None
+    for line, row in enumerate(rows, start=1):
+        payment_id = (row.get('payment_id') or '').strip()
+        if not payment_id:
+            raise SettlementFileError(f'Record {line} has no payment_id')
+        if previous is not None and payment_id <= previous:
+            raise SettlementFileError(
+                f'Record {line} ({payment_id}) is out of order; sort the file by payment_id'
+            )
+        previous = payment_id
+        try:
+            amount = Decimal(str(row['amount'])) if row.get('amount') not in (None, '') else None
+        except InvalidOperation:
+            raise SettlementFileError(f'Record {line} has an invalid amount')
+        yield {
+            'payment_id': payment_id,
+            'transaction_id': (row.get('transaction_id') or '').strip() or None,
+            'amount': amount,
+            'status': (row.get('status') or '').strip().lower(),
+        }
+
+def stream_payments(chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield payments ordered by payment_id, without their gateway responses"""
+    from .models import Payment
+    
+    last = None
+    while True:
+        payments = Payment.objects.only(
+            'id', 'payment_id', 'gateway_transaction_id', 'amount', 'status'
+        ).order_by('payment_id')
+        if last is not None:
+            payments = payments.filter(payment_id__gt=last)
+        
+        count = 0
+        for payment in payments[:chunk_size].iterator(chunk_size=chunk_size):
+            count += 1
+            last = payment.payment_id
+            yield payment
+        if count < chunk_size:
+            return
+
+def _compare(payment, record):
+    expected = EXPECTED_SETTLEMENT.get(payment.status)
+    if record['status'] != expected and not (expected is None and record['status'] == RESULT_FAILED):
+        return STATUS_MISMATCH
+    if record['status'] == RESULT_FAILED:
+        return None
+    if record['amount'] is not None and record['amount'] != payment.amount:
+        return AMOUNT_MISMATCH
+    if (
+        record['transaction_id'] and payment.gateway_transaction_id and
+        record['transaction_id'] != payment.gateway_transaction_id
+    ):
+        return TRANSACTION_MISMATCH
+    return None
+
+def _issue(issue, payment=None, record=None):
+    return {
+        'payment_id': payment.payment_id if payment else record['payment_id'],
+        'issue': issue,
+        'payment_status': payment.status if payment else '',
+        'settlement_status': record['status'] if record else '',
+        'amount': payment.amount if payment else '',
+        'settlement_amount': record['amount'] if record and record['amount'] is not None else '',
+        'transaction_id': (payment.gateway_transaction_id or '') if payment else '',
+        'settlement_transaction_id': (record['transaction_id'] or '') if record else '',
+    }
+
+def reconcile(payments, records):
+    """
+    Merge-join payments and settlement records, both sorted by payment_id.
+    
+    Yields one issue dict per mismatch. Payments nobody was charged for and
+    failed charges with no payment behind them are not issues.
+    """
+    payments = iter(payments)
+    records = iter(records)
+    payment = next(payments, None)
+    record = next(records, None)
+    
+    while payment is not None or record is not None:
+        if record is None or (payment is not None and payment.payment_id < record['payment_id']):
+            if EXPECTED_SETTLEMENT.get(payment.status) in (RESULT_SUCCESS, SETTLEMENT_REFUNDED):
+                yield _issue(MISSING_IN_SETTLEMENT, payment=payment)
+            payment = next(payments, None)
+        elif payment is None or record['payment_id'] < payment.payment_id:
+            if record['status'] != RESULT_FAILED:
+                yield _issue(UNKNOWN_PAYMENT, record=record)
+            record = next(records, None)
+        else:
+            issue = _compare(payment, record)
+            if issue is not None:
+                yield _issue(issue, payment=payment, record=record)
+            payment = next(payments, None)
+            record = next(records, None)
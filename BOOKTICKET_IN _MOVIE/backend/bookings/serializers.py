@@ -1,6 +1,11 @@
 from rest_framework import serializers
 from django.utils import timezone
 from .models import Booking, BookedSeat, Payment, Coupon, CouponUsage
+from django.db import transaction
+from .coupons import get_coupon
+from .holds import backend_held_seat_ids, holder_for_user
+from .inventory import claim_seats, unavailable_seat_ids
+from .pricing import ShowPricing
 
 class BookedSeatSerializer(serializers.ModelSerializer):
     """
@@ -112,15 +117,12 @@ class BookingCreateSerializer(serializers.ModelSerializer):
         if len(seats) != len(seat_ids):
             raise serializers.ValidationError("Some selected seats are not available")
         
-        # Check if seats are already booked for this show
-        booked_seat_ids = BookedSeat.objects.filter(
-            booking__show=show,
-            booking__status='confirmed',
-            seat__id__in=seat_ids
-        ).values_list('seat_id', flat=True)
-        
-        if booked_seat_ids:
-            raise serializers.ValidationError("Some selected seats are already booked")
+        # Check if seats are already booked or held by someone else
+        holder = holder_for_user(self.context['request'].user)
+        taken = unavailable_seat_ids(show.id, seat_ids, holder)
+        taken |= backend_held_seat_ids(show.id, exclude_holder=holder).intersection(seat_ids)
+        if taken:
+            raise serializers.ValidationError("Some selected seats are already booked or held by another user")
         
         data['seats'] = seats
         return data
@@ -133,68 +135,49 @@ class BookingCreateSerializer(serializers.ModelSerializer):
         show = validated_data['show']
         user = self.context['request'].user
         
-        # Calculate total amount
-        total_amount = 0
-        seat_prices = {}
-        
-        for seat in seats:
-            # Get seat price from show pricing or use base price
-            try:
-                pricing = show.seat_pricing.get(seat_category=seat.category)
-                price = pricing.price
-            except:
-                price = show.base_price
-            
-            seat_prices[seat.id] = price
-            total_amount += price
-        
-        # Calculate convenience fee (₹20 per ticket)
-        convenience_fee = len(seats) * 20
-        
-        # Apply coupon if provided
-        discount_amount = 0
-        if coupon_code:
-            try:
-                coupon = Coupon.objects.get(code=coupon_code)
-                if coupon.can_be_used_by_user(user):
-                    discount_amount = coupon.calculate_discount(total_amount)
-            except Coupon.DoesNotExist:
-                pass
+        # Look up the coupon once for pricing and redemption
+        coupon = get_coupon(coupon_code) if coupon_code else None
         
-        final_amount = total_amount + convenience_fee - discount_amount
+        # Price all seats from the show's pricing table
+        quote = ShowPricing.for_show(show).quote(seats, coupon=coupon, user=user)
         
-        # Create booking
-        booking = Booking.objects.create(
-            user=user,
-            show=show,
-            quantity=len(seats),
-            total_amount=total_amount,
-            convenience_fee=convenience_fee,
-            discount_amount=discount_amount,
-            final_amount=final_amount,
-            phone_number=validated_data['phone_number'],
-            email=validated_data['email']
-        )
+        # Claim the seats until the booking expires
+        expiry_time = timezone.now() + Booking.HOLD_DURATION
         
-        # Create booked seats
-        for seat in seats:
-            BookedSeat.objects.create(
-                booking=booking,
-                seat=seat,
-                price=seat_prices[seat.id]
-            )
-        
-        # Create coupon usage record if coupon was applied
-        if coupon_code and discount_amount > 0:
-            coupon = Coupon.objects.get(code=coupon_code)
-            CouponUsage.objects.create(
-                coupon=coupon,
+        with transaction.atomic():
+            # Create booking
+            booking = Booking.objects.create(
                 user=user,
-                booking=booking,
-                discount_amount=discount_amount
+                show=show,
+                quantity=quote.quantity,
+                total_amount=quote.total_amount,
+                convenience_fee=quote.convenience_fee,
+                discount_amount=quote.discount_amount,
+                final_amount=quote.final_amount,
+                phone_number=validated_data['phone_number'],
+                email=validated_data['email'],
+                expiry_time=expiry_time
             )
-            coupon.used_count += 1
-            coupon.save()
+            
+            if not claim_seats(show.id, seat_ids, holder_for_user(user), expiry_time, booking=booking):
+                raise serializers.ValidationError("Some selected seats were just booked by another user")
+            
+            # Create booked seats
+            BookedSeat.objects.bulk_create([
+                BookedSeat(booking=booking, seat=seat, price=quote.seat_prices[seat.id])
+                for seat in seats
+            ])
+            
+            # Redeem the coupon with the booking so neither outlives the other
+            if quote.coupon is not None:
+                if not quote.coupon.redeem(user):
+                    raise serializers.ValidationError("Coupon usage limit exceeded")
+                CouponUsage.objects.create(
+                    coupon=quote.coupon,
+                    user=user,
+                    booking=booking,
+                    discount_amount=quote.discount_amount
+                )
         
         return booking
 
@@ -244,10 +227,9 @@ class CouponValidationSerializer(serializers.Serializer):
     amount = serializers.DecimalField(max_digits=10, decimal_places=2)
     
     def validate_coupon_code(self, value):
-        try:
-            coupon = Coupon.objects.get(code=value)
-            if not coupon.is_valid:
-                raise serializers.ValidationError("Coupon is not valid or has expired")
-            return value
-        except Coupon.DoesNotExist:
-            raise serializers.ValidationError("Invalid coupon code")
\ No newline at end of file
+        coupon = get_coupon(value)
+        if coupon is None:
+            raise serializers.ValidationError("Invalid coupon code")
+        if not coupon.is_valid:
+            raise serializers.ValidationError("Coupon is not valid or has expired")
+        return value
\ No newline at end of file
@@ -0,0 +1,78 @@
+import logging
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from theaters.availability import SEAT_AVAILABLE, SEAT_BOOKED, update_seat_states
+from theaters.models import Show
+from .holds import holder_for_user, release_backend_holds
+from .inventory import SeatsNotHeld, booked_seat_count, mark_available, mark_booked
+from .coupons import invalidate_coupon
+from .models import Booking, BookedSeat, Coupon
+from .tickets import enqueue_ticket
+from .waiting_room import invalidate_admission_rate
+
+logger = logging.getLogger(__name__)
+
+@receiver(post_save, sender=Booking)
+def sync_seats_on_booking_save(sender, instance, created, update_fields=None, **kwargs):
+    """Move the booking's seats in the inventory and seat map when its status changes"""
+    if created or (update_fields is not None and 'status' not in update_fields):
+        return
+    
+    if instance.status == 'confirmed':
+        state = SEAT_BOOKED
+        claimed = mark_booked(instance)
+        # A confirmed booking saved again has nothing left to claim; anything
+        # else short means someone took seats whose hold ran out, and raising
+        # rolls the confirmation back so the seats are never sold twice
+        if claimed != instance.quantity and booked_seat_count(instance) != instance.quantity:
+            raise SeatsNotHeld(instance, claimed)
+        enqueue_ticket(instance.id)
+        seats = claimed
+    elif instance.status in ('cancelled', 'expired'):
+        state = SEAT_AVAILABLE
+        seats = -mark_available(instance)
+    else:
+        return
+    
+    if not Show.adjust_booked_count(instance.show_id, seats):
+        # The inventory already moved; only the counters are off
+        logger.error(
+            "Seat counters of show %s could not absorb %+d seats for booking %s; run reconcile_show_counts",
+            instance.show_id, seats, instance.booking_id
+        )
+    
+    seat_ids = list(instance.booked_seats.values_list('seat_id', flat=True))
+    update_seat_states(instance.show_id, seat_ids, state)
+    
+    # Seats are either sold or free again, so the checkout hold is done
+    release_backend_holds(instance.show_id, seat_ids, holder_for_user(instance.user))
+
+@receiver(post_save, sender=BookedSeat)
+def sync_seat_map_on_seat_booked(sender, instance, created, **kwargs):
+    """Mark seats added to an already confirmed booking as booked"""
+    if created and instance.booking.status == 'confirmed':
+        update_seat_states(instance.booking.show_id, [instance.seat_id], SEAT_BOOKED)
+
+@receiver(post_delete, sender=BookedSeat)
+def sync_seat_map_on_seat_released(sender, instance, **kwargs):
+    """Release seats removed from a confirmed booking"""
+    booking = Booking.objects.filter(pk=instance.booking_id).only('show_id', 'status').first()
+    if booking is not None and booking.status == 'confirmed':
+        update_seat_states(booking.show_id, [instance.seat_id], SEAT_AVAILABLE)
+
+@receiver(post_save, sender=Show)
+@receiver(post_delete, sender=Show)
+def invalidate_admission_rate_on_show_change(sender, instance, **kwargs):
+    invalidate_admission_rate(instance.id)
+
+@receiver(pre_save, sender=Coupon)
+def remember_coupon_code(sender, instance, **kwargs):
+    """Keep the code a coupon is renamed from so its catalog entry is dropped too"""
+    instance._previous_code = None
+    if instance.pk:
+        instance._previous_code = Coupon.objects.filter(pk=instance.pk).values_list('code', flat=True).first()
+
+@receiver(post_save, sender=Coupon)
+@receiver(post_delete, sender=Coupon)
+def invalidate_catalog_on_coupon_change(sender, instance, **kwargs):
+    invalidate_coupon(instance.code, getattr(instance, '_previous_code', None))
\ No newline at end of file
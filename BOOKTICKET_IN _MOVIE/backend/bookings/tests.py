@@ -0,0 +1,278 @@
+from decimal import Decimal
+import uuid
+from unittest import mock
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+from movies.models import Movie
+from theaters.models import Theater, Screen, SeatCategory, Seat, Show
+from users.models import User
+from .idempotency import HEADER, idempotent
+from .inventory import SeatsNotHeld, claim_seats
+from .models import Booking, Coupon, CouponUserCount, OutboxEmail, Payment, ShowSeat
+from .notifications import BOOKING_CONFIRMATION
+from .outbox import send_batch
+from .transitions import InvalidTransition, TransitionConflict, transition
+
+class BookingFixturesMixin:
+    """
+    Builds a show on a small screen and users to book it
+    """
+    @classmethod
+    def setUpTestData(cls):
+        theater = Theater.objects.create(
+            name='Test Cinema', address='1 Main Road', city='Mumbai', state='MH',
+            pincode='400001', phone='9999999999'
+        )
+        screen = Screen.objects.create(theater=theater, name='Screen 1', total_seats=4, rows=1, seats_per_row=4)
+        category = SeatCategory.objects.create(name='Silver')
+        cls.seats = [
+            Seat.objects.create(screen=screen, seat_number=f'A{column}', row='A', column=column, category=category)
+            for column in range(1, 5)
+        ]
+        movie = Movie.objects.create(
+            title='Test Movie', description='A test movie', duration=120,
+            release_date=timezone.now().date(), director='Director', cast='Actor One, Actor Two'
+        )
+        cls.show = Show.objects.create(
+            movie=movie, screen=screen,
+            show_date=timezone.now().date() + timezone.timedelta(days=1),
+            show_time=timezone.datetime(2000, 1, 1, 18, 0).time(),
+            base_price=Decimal('200.00')
+        )
+        cls.user = cls.make_user('first')
+        cls.other_user = cls.make_user('second')
+    
+    @staticmethod
+    def make_user(name):
+        return User.objects.create_user(
+            username=name, email=f'{name}@example.com', password='secret-password',
+            first_name=name.title(), last_name='Tester'
+        )
+    
+    def make_booking(self, user=None, quantity=1):
+        return Booking.objects.create(
+            user=user or self.user, show=self.show, quantity=quantity,
+            total_amount=Decimal('200.00') * quantity, final_amount=Decimal('200.00') * quantity,
+            phone_number='9999999999', email='first@example.com'
+        )
+
+class TransitionTests(BookingFixturesMixin, TestCase):
+    """
+    Compare-and-set state transitions of bookings and payments
+    """
+    def test_stale_instance_loses_the_transition(self):
+        booking = self.make_booking()
+        stale = Booking.objects.get(pk=booking.pk)
+        
+        booking.cancel_booking()
+        with self.assertRaises(TransitionConflict):
+            stale.cancel_booking()
+        
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'cancelled')
+    
+    def test_conflict_leaves_the_winner_in_place(self):
+        booking = self.make_booking()
+        stale = Booking.objects.get(pk=booking.pk)
+        
+        transition(booking, {'status': ('pending', 'expired')})
+        with self.assertRaises(TransitionConflict):
+            transition(stale, {'status': ('pending', 'cancelled')}, cancelled_at=timezone.now())
+        
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'expired')
+        self.assertIsNone(booking.cancelled_at)
+    
+    def test_undeclared_move_is_rejected(self):
+        booking = self.make_booking()
+        with self.assertRaises(InvalidTransition):
+            transition(booking, {'status': ('cancelled', 'confirmed')})
+    
+    def test_payment_settles_only_once(self):
+        booking = self.make_booking()
+        payment = Payment.objects.create(
+            booking=booking, payment_id='PAY_TEST_1', payment_method='upi',
+            amount=booking.final_amount, status='processing'
+        )
+        stale = Payment.objects.get(pk=payment.pk)
+        
+        payment.mark_failed()
+        with self.assertRaises(TransitionConflict):
+            stale.mark_completed(transaction_id='TXN_1')
+        
+        payment.refresh_from_db()
+        booking.refresh_from_db()
+        self.assertEqual(payment.status, 'failed')
+        self.assertEqual((booking.status, booking.payment_status), ('pending', 'failed'))
+
+class IdempotencyTests(BookingFixturesMixin, TestCase):
+    """
+    Replays of requests sent with an Idempotency-Key
+    """
+    def setUp(self):
+        self.calls = 0
+        self.key = uuid.uuid4().hex
+        
+        @api_view(['POST'])
+        @idempotent
+        def create_thing(request):
+            self.calls += 1
+            return Response({'call': self.calls, **request.data}, status=status.HTTP_201_CREATED)
+        self.view = create_thing
+    
+    def post(self, data, key=None, user=None):
+        request = APIRequestFactory().post('/things/', data, format='json', **{
+            f'HTTP_{HEADER.upper().replace("-", "_")}': key or self.key
+        })
+        force_authenticate(request, user=user or self.user)
+        return self.view(request)
+    
+    def test_replay_returns_the_stored_response(self):
+        first = self.post({'seats': [1, 2]})
+        replay = self.post({'seats': [1, 2]})
+        
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(replay.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertJSONEqual(replay.content, first.data)
+    
+    def test_key_reused_with_another_body_is_refused(self):
+        self.post({'seats': [1, 2]})
+        response = self.post({'seats': [3]})
+        
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+    
+    def test_keys_are_scoped_to_the_user(self):
+        self.post({'seats': [1, 2]})
+        response = self.post({'seats': [1, 2]}, user=self.other_user)
+        
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(response.data['call'], 2)
+
+class CouponRedemptionTests(BookingFixturesMixin, TestCase):
+    """
+    Overall and per-user limits of coupon redemptions
+    """
+    def make_coupon(self, **limits):
+        now = timezone.now()
+        return Coupon.objects.create(
+            code=f'TEST{uuid.uuid4().hex[:8].upper()}', description='Test coupon',
+            coupon_type='fixed', value=Decimal('50.00'),
+            valid_from=now - timezone.timedelta(days=1), valid_until=now + timezone.timedelta(days=1),
+            **limits
+        )
+    
+    def test_redeem_stops_at_the_per_user_limit(self):
+        coupon = self.make_coupon(user_limit=2)
+        
+        self.assertTrue(coupon.redeem(self.user))
+        self.assertTrue(coupon.redeem(self.user))
+        self.assertFalse(coupon.redeem(self.user))
+        
+        self.assertEqual(CouponUserCount.objects.get(coupon=coupon, user=self.user).used_count, 2)
+        coupon.refresh_from_db()
+        self.assertEqual(coupon.used_count, 2)
+    
+    def test_redeem_stops_at_max_uses(self):
+        coupon = self.make_coupon(usage_limit=1)
+        third_user = self.make_user('third')
+        
+        self.assertTrue(coupon.redeem(self.user))
+        self.assertFalse(coupon.redeem(self.other_user))
+        self.assertFalse(coupon.redeem(third_user))
+        
+        coupon.refresh_from_db()
+        self.assertEqual(coupon.used_count, 1)
+        self.assertFalse(CouponUserCount.objects.filter(coupon=coupon, user=self.other_user, used_count__gt=0).exists())
+    
+    def test_refused_redemption_changes_nothing(self):
+        coupon = self.make_coupon(usage_limit=5, user_limit=1)
+        coupon.redeem(self.user)
+        
+        self.assertFalse(coupon.redeem(self.user))
+        
+        coupon.refresh_from_db()
+        self.assertEqual(coupon.used_count, 1)
+
+class SeatClaimTests(BookingFixturesMixin, TestCase):
+    """
+    Conditional seat claims in the show inventory
+    """
+    def held_until(self, minutes=15):
+        return timezone.now() + timezone.timedelta(minutes=minutes)
+    
+    def test_second_claim_on_held_seat_fails(self):
+        seat_id = self.seats[0].id
+        
+        self.assertTrue(claim_seats(self.show.id, [seat_id], 'holder-a', self.held_until()))
+        self.assertFalse(claim_seats(self.show.id, [seat_id], 'holder-b', self.held_until()))
+        
+        self.assertEqual(ShowSeat.objects.get(show=self.show, seat_id=seat_id).holder, 'holder-a')
+    
+    def test_claim_is_all_or_nothing(self):
+        first, second = self.seats[0].id, self.seats[1].id
+        claim_seats(self.show.id, [first], 'holder-a', self.held_until())
+        
+        self.assertFalse(claim_seats(self.show.id, [first, second], 'holder-b', self.held_until()))
+        
+        self.assertEqual(ShowSeat.objects.get(show=self.show, seat_id=second).status, 'available')
+    
+    def test_expired_hold_can_be_claimed(self):
+        seat_id = self.seats[0].id
+        claim_seats(self.show.id, [seat_id], 'holder-a', self.held_until(-1))
+        
+        self.assertTrue(claim_seats(self.show.id, [seat_id], 'holder-b', self.held_until()))
+    
+    def test_confirmation_is_refused_when_seats_were_taken(self):
+        seat_id = self.seats[0].id
+        booking = self.make_booking()
+        claim_seats(self.show.id, [seat_id], 'holder-a', self.held_until(-1), booking=booking)
+        claim_seats(self.show.id, [seat_id], 'holder-b', self.held_until())
+        
+        with self.assertRaises(SeatsNotHeld):
+            booking.confirm_booking()
+        
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'pending')
+        self.assertEqual(ShowSeat.objects.get(show=self.show, seat_id=seat_id).holder, 'holder-b')
+
+class FailingConnection:
+    """
+    SMTP connection whose server has gone away
+    """
+    def __init__(self):
+        self.opened = 0
+    
+    def open(self):
+        self.opened += 1
+        raise ConnectionRefusedError('Connection refused')
+    
+    def close(self):
+        pass
+
+class OutboxDeliveryTests(BookingFixturesMixin, TestCase):
+    """
+    Recording failed deliveries of outbox emails
+    """
+    def test_failed_send_is_retried_when_reconnecting_fails(self):
+        email = OutboxEmail.objects.create(
+            template=BOOKING_CONFIRMATION, booking=self.make_booking(), recipient='first@example.com'
+        )
+        due_at = email.next_attempt_at
+        message = mock.Mock()
+        message.send.side_effect = OSError('Connection lost')
+        connection = FailingConnection()
+        
+        with mock.patch('bookings.outbox.build_message', return_value=message):
+            self.assertEqual(send_batch([email], connection), 0)
+        
+        email.refresh_from_db()
+        self.assertEqual(connection.opened, 1)
+        self.assertEqual((email.status, email.attempts), ('pending', 1))
+        self.assertEqual(email.last_error, 'Connection lost')
+        self.assertGreater(email.next_attempt_at, due_at)
@@ -0,0 +1,216 @@
+"""
+Ticket PDF rendering and caching.
+
+A ticket is a Pillow-drawn page with the booking details and a QR code
+carrying a signed payload that gate scanners verify offline, saved as a
+PDF. Rendered tickets live in an on-disk cache addressed by a
+digest of everything printed on them, so a booking that changes gets a
+new file and an unchanged one is never rendered twice. Rendering runs in
+a worker pool once a booking is confirmed; download requests only ever
+serve cached files, with ETags and byte ranges.
+"""
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core import signing
+from django.db import close_old_connections, transaction
+from django.http import FileResponse, HttpResponse
+from django.utils.http import quote_etag
+import qrcode
+from rest_framework import renderers
+from PIL import Image, ImageDraw, ImageFont
+
+# Bump to re-render every ticket after a layout change
+RENDER_VERSION = 1
+
+DEFAULT_WORKERS = 2
+
+PAGE_SIZE = (1240, 620)
+RESOLUTION = 150
+
+TOKEN_SALT = 'bookings.tickets'
+
+RANGE_HEADER = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+def load_booking(**lookup):
+    """Booking matching the lookup, with everything printed on its ticket"""
+    from .models import Booking
+    
+    return Booking.objects.select_related(
+        'user', 'show__movie', 'show__screen__theater'
+    ).prefetch_related('booked_seats__seat').filter(**lookup).first()
+
+def ticket_lines(booking):
+    """Text printed on the ticket, also the input of its cache digest"""
+    seats = sorted(seat.seat.seat_number for seat in booking.booked_seats.all())
+    return [
+        booking.movie_title,
+        f'{booking.theater_name} - {booking.screen_name}',
+        f'{booking.show.show_date:%a, %d %b %Y} at {booking.show.show_time:%I:%M %p}',
+        f'Seats: {", ".join(seats)}',
+        f'Amount paid: Rs. {booking.final_amount}',
+        f'Booked by {booking.user.full_name}',
+        f'Booking ID: {booking.booking_id}',
+    ]
+
+def _signer():
+    return signing.Signer(key=settings.TICKET_SIGNING_KEY, salt=TOKEN_SALT)
+
+def sign_ticket(booking):
+    """
+    Compact signed payload for the ticket's QR code.
+    
+    Signer.sign_object output: compressed JSON {b: booking id hex, s: show
+    id, t: seat ids} and an HMAC-SHA256 signature under TICKET_SIGNING_KEY,
+    so scanners holding the key can verify tickets without the database.
+    """
+    seat_ids = sorted(seat.seat_id for seat in booking.booked_seats.all())
+    return _signer().sign_object(
+        {'b': booking.booking_id.hex, 's': booking.show_id, 't': seat_ids}, compress=True
+    )
+
+def verify_ticket(token):
+    """Return (booking_id hex, show_id, seat_ids) from a signed ticket, or None"""
+    try:
+        data = _signer().unsign_object(token)
+        return data['b'], data['s'], data['t']
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        return None
+
+def qr_payload(booking):
+    """Data encoded in the ticket's QR code"""
+    return sign_ticket(booking)
+
+def ticket_digest(booking):
+    content = '\n'.join([str(RENDER_VERSION), booking.status, qr_payload(booking), *ticket_lines(booking)])
+    return hashlib.sha256(content.encode()).hexdigest()
+
+def ticket_path(digest):
+    return os.path.join(settings.TICKET_CACHE_DIR, digest[:2], f'{digest}.pdf')
+
+def _font(size):
+    try:
+        return ImageFont.truetype('DejaVuSans.ttf', size)
+    except OSError:
+        return ImageFont.load_default()
+
+def render_ticket(booking):
+    """Render the ticket as PDF bytes"""
+    page = Image.new('RGB', PAGE_SIZE, 'white')
+    draw = ImageDraw.Draw(page)
+    
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, box_size=10, border=2)
+    qr.add_data(qr_payload(booking))
+    qr.make(fit=True)
+    code = qr.make_image(fill_color='black', back_color='white').convert('RGB')
+    code.thumbnail((480, 480))
+    page.paste(code, (PAGE_SIZE[0] - code.width - 60, (PAGE_SIZE[1] - code.height) // 2))
+    
+    draw.rectangle((0, 0, PAGE_SIZE[0], 90), fill='#1F2937')
+    draw.text((60, 24), 'MovieBook', font=_font(40), fill='white')
+    lines = ticket_lines(booking)
+    draw.text((60, 130), lines[0], font=_font(44), fill='black')
+    y = 210
+    for line in lines[1:]:
+        draw.text((60, y), line, font=_font(26), fill='#374151')
+        y += 50
+    
+    buffer = io.BytesIO()
+    page.save(buffer, 'PDF', resolution=RESOLUTION)
+    return buffer.getvalue()
+
+def ensure_ticket(booking):
+    """Render the booking's ticket unless it is cached, returning (path, digest)"""
+    digest = ticket_digest(booking)
+    path = ticket_path(digest)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written aside and renamed so readers never see a partial file
+        partial = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(partial, 'wb') as file:
+            file.write(render_ticket(booking))
+        os.replace(partial, path)
+    return path, digest
+
+_executor = None
+_lock = threading.Lock()
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'TICKET_RENDER_WORKERS', DEFAULT_WORKERS),
+                    thread_name_prefix='tickets'
+                )
+    return _executor
+
+def _render(booking_id):
+    close_old_connections()
+    try:
+        booking = load_booking(id=booking_id, status='confirmed')
+        if booking is not None:
+            ensure_ticket(booking)
+    finally:
+        close_old_connections()
+
+def enqueue_ticket(booking_id):
+    """Render the booking's ticket in the worker pool once the transaction commits"""
+    transaction.on_commit(lambda: _get_executor().submit(_render, booking_id))
+
+class PDFRenderer(renderers.BaseRenderer):
+    """
+    Lets API views that return ticket files accept Accept: application/pdf
+    """
+    media_type = 'application/pdf'
+    format = 'pdf'
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, bytes):
+            return data
+        return json.dumps(data).encode()
+
+def ticket_response(request, path, digest, filename):
+    """
+    Serve a cached ticket, honouring If-None-Match and a single byte range
+    """
+    etag = quote_etag(digest)
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        response = HttpResponse(status=304)
+        response['ETag'] = etag
+        return response
+    
+    size = os.path.getsize(path)
+    file = open(path, 'rb')
+    match = RANGE_HEADER.match(request.headers.get('Range', ''))
+    if match is None or not any(match.groups()) or request.headers.get('If-Range', etag) != etag:
+        response = FileResponse(file, content_type='application/pdf', filename=filename)
+    else:
+        start, end = match.groups()
+        if start:
+            start, end = int(start), min(int(end) if end else size - 1, size - 1)
+        else:
+            start, end = max(size - int(end), 0), size - 1
+        if start > end:
+            file.close()
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        file.seek(start)
+        response = FileResponse(
+            io.BytesIO(file.read(end - start + 1)), status=206,
+            content_type='application/pdf', filename=filename
+        )
+        file.close()
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    
+    response['ETag'] = etag
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = 'private, max-age=3600'
+    return response
@@ -0,0 +1,113 @@
+"""
+State transitions for bookings and payments.
+
+Every transition is one conditional UPDATE that matches only while the row
+is still in the expected state and writes only the columns it changes, so
+of two concurrent transitions out of the same state exactly one wins. The
+loser gets a TransitionConflict and the row keeps what the winner wrote.
+post_save is sent with update_fields, as save(update_fields=...) would, so
+receivers that follow status changes (seat syncing) still run.
+"""
+import logging
+from django.db.models.signals import post_save
+
+logger = logging.getLogger(__name__)
+
+# Allowed (from, to) moves per model and field
+TRANSITIONS = {
+    'Booking': {
+        'status': {
+            ('pending', 'confirmed'),
+            ('pending', 'expired'),
+            ('pending', 'cancelled'),
+            ('confirmed', 'cancelled'),
+        },
+        'payment_status': {
+            ('pending', 'completed'),
+            ('pending', 'failed'),
+            ('pending', 'refund_required'),
+            ('completed', 'refunded'),
+            ('refund_required', 'refunded'),
+        },
+    },
+    'Payment': {
+        'status': {
+            ('initiated', 'processing'),
+            ('initiated', 'cancelled'),
+            ('processing', 'completed'),
+            ('processing', 'failed'),
+            ('processing', 'refund_required'),
+            ('completed', 'refunded'),
+            ('refund_required', 'refunded'),
+        },
+    },
+}
+
+class InvalidTransition(ValueError):
+    pass
+
+class TransitionConflict(Exception):
+    """
+    The row was no longer in the expected state when the transition ran
+    """
+    def __init__(self, instance, states):
+        self.instance = instance
+        self.states = states
+        moves = ', '.join(f'{field} {expected}->{target}' for field, (expected, target) in states.items())
+        super().__init__(f'{type(instance).__name__} {instance.pk}: lost transition {moves}')
+
+def _check(model, states):
+    allowed = TRANSITIONS.get(model.__name__, {})
+    for field, move in states.items():
+        if move not in allowed.get(field, ()):
+            raise InvalidTransition(f'{model.__name__}.{field} cannot move {move[0]} -> {move[1]}')
+
+def transition(instance, states, **values):
+    """
+    Move an instance between states with one conditional UPDATE.
+    
+    states maps each status field to an (expected, target) pair; values are
+    other columns written alongside (timestamps, gateway details). The
+    instance is updated in place on success. Raises TransitionConflict if
+    any field was not in its expected state.
+    """
+    model = type(instance)
+    _check(model, states)
+    
+    changes = {field: target for field, (_, target) in states.items()}
+    changes.update(values)
+    updated = model._default_manager.filter(
+        pk=instance.pk, **{field: expected for field, (expected, _) in states.items()}
+    ).update(**changes)
+    if not updated:
+        conflict = TransitionConflict(instance, states)
+        logger.warning("%s", conflict)
+        raise conflict
+    
+    for field, value in changes.items():
+        setattr(instance, field, value)
+    post_save.send(
+        sender=model, instance=instance, created=False,
+        update_fields=frozenset(changes), raw=False, using=instance._state.db
+    )
+    return instance
+
+def transition_many(model, pks, states, **values):
+    """
+    Apply one transition to many rows, skipping rows not in the expected state.
+    
+    Returns how many rows moved. No signals are sent; callers handle the
+    side effects in bulk.
+    """
+    _check(model, states)
+    
+    changes = {field: target for field, (_, target) in states.items()}
+    changes.update(values)
+    updated = model._default_manager.filter(
+        pk__in=pks, **{field: expected for field, (expected, _) in states.items()}
+    ).update(**changes)
+    if updated < len(pks):
+        logger.info(
+            "%s of %s %s rows were not in the expected state", len(pks) - updated, len(pks), model.__name__
+        )
+    return updated
@@ -4,18 +4,28 @@ from . import views
 urlpatterns = [
     path('', views.BookingListView.as_view(), name='booking_list'),
     path('create/', views.BookingCreateView.as_view(), name='create_booking'),
+    path('queue/<int:show_id>/join/', views.join_waiting_room, name='join_waiting_room'),
+    path('queue/<int:show_id>/status/', views.waiting_room_status, name='waiting_room_status'),
     path('summary/', views.booking_summary, name='booking_summary'),
     path('<uuid:booking_id>/', views.BookingDetailView.as_view(), name='booking_detail'),
     path('<uuid:booking_id>/cancel/', views.cancel_booking, name='cancel_booking'),
     path('<uuid:booking_id>/download/', views.download_ticket, name='download_ticket'),
+    path('<uuid:booking_id>/ticket.pdf', views.ticket_pdf, name='ticket_pdf'),
     
     # Payments
     path('payments/create/', views.PaymentCreateView.as_view(), name='create_payment'),
+    path('payments/webhook/', views.payment_webhook, name='payment_webhook'),
+    path('payments/<str:payment_id>/', views.payment_status, name='payment_status'),
     path('payments/<str:payment_id>/process/', views.process_payment, name='process_payment'),
     
+    # Gate
+    path('shows/<int:show_id>/manifest/', views.show_manifest, name='show_manifest'),
+    path('shows/<int:show_id>/check-in/', views.check_in_tickets, name='check_in_tickets'),
+    
     # Coupons
     path('coupons/validate/', views.validate_coupon, name='validate_coupon'),
     
     # Admin endpoints
     path('admin/stats/', views.admin_booking_stats, name='admin_booking_stats'),
+    path('admin/queue/', views.admin_waiting_room_stats, name='admin_waiting_room_stats'),
 ]
\ No newline at end of file
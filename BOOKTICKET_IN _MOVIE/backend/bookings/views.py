@@ -1,12 +1,27 @@
+import os
 from rest_framework import generics, status, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, permission_classes, renderer_classes
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from django.utils import timezone
 from django.db import transaction
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
-from django.conf import settings
-from .models import Booking, Payment, Coupon
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from .models import Booking, Payment
+from .coupons import get_coupon
+from .gate import MAX_BATCH_SIZE, SCAN_ADMITTED, check_in, manifest_lines
+from .idempotency import idempotent
+from .notifications import BOOKING_CANCELLATION, BOOKING_CONFIRMATION
+from .outbox import queue_email
+from .inventory import SeatsNotHeld, extend_booking_hold
+from .payments import PAYMENT_HOLD_DURATION, SIGNATURE_HEADER, apply_results, enqueue_payment, verify_signature
+from .waiting_room import (
+    get_admission_rate, get_queue_store, join_queue, queue_metrics, queue_status
+)
+from .tickets import (
+    PDFRenderer, enqueue_ticket, load_booking, ticket_digest, ticket_path, ticket_response
+)
+from .transitions import TransitionConflict, transition
 from .serializers import (
     BookingListSerializer, BookingDetailSerializer, BookingCreateSerializer,
     PaymentCreateSerializer, PaymentSerializer, CouponSerializer,
@@ -41,43 +56,82 @@ class BookingCreateView(generics.CreateAPIView):
     serializer_class = BookingCreateSerializer
     permission_classes = [permissions.IsAuthenticated]
     
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        # Shows behind a waiting room only take bookings from admitted clients
+        try:
+            show_id = int(request.data.get('show'))
+        except (TypeError, ValueError):
+            show_id = None
+        rate = get_admission_rate(show_id) if show_id else None
+        
+        if rate:
+            ticket = queue_status(show_id, request.user, request.headers.get('X-Queue-Token', ''), rate)
+            if ticket is None:
+                return Response(
+                    {'error': 'Join the waiting room for this show before booking'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+            if not ticket['admitted']:
+                return Response(
+                    {'error': 'Still waiting in the queue', **ticket},
+                    status=status.HTTP_429_TOO_MANY_REQUESTS,
+                    headers={'Retry-After': str(ticket['retry_after'])}
+                )
+            # Spent up front so concurrent requests can't share one admission
+            if not get_queue_store().use_position(show_id, ticket['position']):
+                return Response(
+                    {'error': 'This queue token has already been used'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+        
+        try:
+            response = super().create(request, *args, **kwargs)
+        except Exception:
+            if rate:
+                get_queue_store().release_position(show_id, ticket['position'])
+            raise
+        if rate:
+            if response.status_code == status.HTTP_201_CREATED:
+                get_queue_store().record_booking(show_id)
+            else:
+                get_queue_store().release_position(show_id, ticket['position'])
+        return response
+    
     def perform_create(self, serializer):
-        booking = serializer.save()
-        # Send booking confirmation email
-        self.send_booking_confirmation_email(booking)
+        with transaction.atomic():
+            booking = serializer.save()
+            # Booking confirmation email goes out from the outbox
+            queue_email(booking, BOOKING_CONFIRMATION)
         return booking
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def join_waiting_room(request, show_id):
+    """
+    API view to join a show's booking queue
+    """
+    rate = get_admission_rate(show_id)
+    if not rate:
+        return Response({'admitted': True, 'token': None})
     
-    def send_booking_confirmation_email(self, booking):
-        """Send booking confirmation email to user"""
-        try:
-            subject = f'Booking Confirmation - {booking.movie_title}'
-            
-            # Prepare email context
-            context = {
-                'booking': booking,
-                'user': booking.user,
-                'movie': booking.show.movie,
-                'theater': booking.show.screen.theater,
-                'show': booking.show,
-                'seats': booking.booked_seats.all(),
-            }
-            
-            # Render email template
-            html_message = render_to_string('emails/booking_confirmation.html', context)
-            plain_message = render_to_string('emails/booking_confirmation.txt', context)
-            
-            # Send email
-            send_mail(
-                subject=subject,
-                message=plain_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[booking.email],
-                html_message=html_message,
-                fail_silently=True
-            )
-        except Exception as e:
-            # Log error but don't fail the booking
-            print(f"Failed to send booking confirmation email: {e}")
+    return Response(join_queue(show_id, request.user, rate), status=status.HTTP_201_CREATED)
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def waiting_room_status(request, show_id):
+    """
+    API view to poll a place in a show's booking queue
+    """
+    rate = get_admission_rate(show_id)
+    if not rate:
+        return Response({'admitted': True, 'token': None})
+    
+    token = request.headers.get('X-Queue-Token') or request.query_params.get('token', '')
+    ticket = queue_status(show_id, request.user, token, rate)
+    if ticket is None:
+        return Response({'error': 'Invalid or expired queue token'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(ticket)
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
@@ -121,50 +175,27 @@ def cancel_booking(request, booking_id):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Cancel the booking
-    with transaction.atomic():
-        booking.cancel_booking()
-        
-        # Update payment status if payment was completed
-        if hasattr(booking, 'payment') and booking.payment.status == 'completed':
-            booking.payment.status = 'refunded'
-            booking.payment.save()
-            booking.payment_status = 'refunded'
-            booking.save()
-        
-        # Send cancellation email
-        send_cancellation_email(booking)
+    # Cancel the booking, refunding the payment if it was completed
+    refund = hasattr(booking, 'payment') and booking.payment.status == 'completed'
+    try:
+        with transaction.atomic():
+            booking.cancel_booking(refund=refund)
+            if refund:
+                transition(booking.payment, {'status': ('completed', 'refunded')})
+            
+            # Cancellation email goes out from the outbox
+            queue_email(booking, BOOKING_CANCELLATION)
+    except TransitionConflict:
+        return Response(
+            {'error': 'Booking was changed by another request, please retry'},
+            status=status.HTTP_409_CONFLICT
+        )
     
     return Response({
         'message': 'Booking cancelled successfully',
         'booking_id': booking.booking_id
     })
 
-def send_cancellation_email(booking):
-    """Send booking cancellation email"""
-    try:
-        subject = f'Booking Cancelled - {booking.movie_title}'
-        
-        context = {
-            'booking': booking,
-            'user': booking.user,
-            'refund_amount': booking.final_amount if booking.payment_status == 'refunded' else 0,
-        }
-        
-        html_message = render_to_string('emails/booking_cancellation.html', context)
-        plain_message = render_to_string('emails/booking_cancellation.txt', context)
-        
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[booking.email],
-            html_message=html_message,
-            fail_silently=True
-        )
-    except Exception as e:
-        print(f"Failed to send cancellation email: {e}")
-
 class PaymentCreateView(generics.CreateAPIView):
     """
     API view for creating payments
@@ -172,6 +203,7 @@ class PaymentCreateView(generics.CreateAPIView):
     serializer_class = PaymentCreateSerializer
     permission_classes = [permissions.IsAuthenticated]
     
+    @idempotent
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -187,8 +219,11 @@ class PaymentCreateView(generics.CreateAPIView):
         
         # Check if booking is still valid
         if booking.is_expired:
-            booking.status = 'expired'
-            booking.save()
+            try:
+                transition(booking, {'status': ('pending', 'expired')})
+            except TransitionConflict:
+                # The expiry sweeper got there first
+                pass
             return Response(
                 {'error': 'Booking has expired'},
                 status=status.HTTP_400_BAD_REQUEST
@@ -215,9 +250,13 @@ class PaymentCreateView(generics.CreateAPIView):
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@idempotent
 def process_payment(request, payment_id):
     """
-    API view to process payment (mock implementation)
+    API view to start processing a payment
+    
+    The gateway is called from the payment worker pool; poll the payment
+    status or subscribe to its WebSocket for the outcome.
     """
     try:
         payment = Payment.objects.get(
@@ -236,67 +275,88 @@ def process_payment(request, payment_id):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Mock payment processing
-    # In real implementation, this would involve payment gateway integration
-    payment_success = True  # Simulate successful payment
-    
-    if payment_success:
+    try:
         with transaction.atomic():
-            payment.mark_completed(
-                transaction_id=f"TXN_{payment.payment_id}",
-                response_data={'status': 'success', 'gateway': 'mock'}
-            )
-            
-            # Send payment success email
-            send_payment_success_email(payment.booking)
-        
-        return Response({
-            'message': 'Payment completed successfully',
-            'booking_id': payment.booking.booking_id,
-            'payment_status': payment.status,
-            'ticket_details': BookingDetailSerializer(
-                payment.booking, 
-                context={'request': request}
-            ).data
-        })
-    else:
-        payment.mark_failed(
-            response_data={'status': 'failed', 'gateway': 'mock'}
+            transition(payment, {'status': ('initiated', 'processing')})
+            # The seats must outlast the charge, or another checkout could
+            # claim them while the gateway settles
+            booking = payment.booking
+            held = extend_booking_hold(booking, timezone.now() + PAYMENT_HOLD_DURATION)
+            if held != booking.quantity:
+                raise SeatsNotHeld(booking, held)
+            enqueue_payment(payment.payment_id)
+    except TransitionConflict:
+        return Response(
+            {'error': 'Payment is already being processed'},
+            status=status.HTTP_409_CONFLICT
         )
-        
+    except SeatsNotHeld:
         return Response(
-            {'error': 'Payment failed'},
-            status=status.HTTP_400_BAD_REQUEST
+            {'error': 'Seat hold has expired, please book again'},
+            status=status.HTTP_409_CONFLICT
         )
+    
+    return Response({
+        'message': 'Payment is being processed',
+        'payment_id': payment.payment_id,
+        'booking_id': payment.booking.booking_id,
+        'payment_status': 'processing',
+        'status_url': reverse('payment_status', args=[payment.payment_id])
+    }, status=status.HTTP_202_ACCEPTED)
 
-def send_payment_success_email(booking):
-    """Send payment success and ticket details email"""
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def payment_status(request, payment_id):
+    """
+    API view to poll the outcome of a payment
+    """
     try:
-        subject = f'Payment Successful - Ticket Confirmed for {booking.movie_title}'
-        
-        context = {
-            'booking': booking,
-            'user': booking.user,
-            'movie': booking.show.movie,
-            'theater': booking.show.screen.theater,
-            'show': booking.show,
-            'seats': booking.booked_seats.all(),
-            'payment': booking.payment,
-        }
-        
-        html_message = render_to_string('emails/payment_success.html', context)
-        plain_message = render_to_string('emails/payment_success.txt', context)
-        
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[booking.email],
-            html_message=html_message,
-            fail_silently=True
+        payment = Payment.objects.select_related('booking').get(
+            payment_id=payment_id,
+            booking__user=request.user
+        )
+    except Payment.DoesNotExist:
+        return Response(
+            {'error': 'Payment not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    data = {
+        **PaymentSerializer(payment).data,
+        'booking_id': payment.booking.booking_id,
+    }
+    if payment.status == 'completed':
+        data['ticket_details'] = BookingDetailSerializer(
+            payment.booking,
+            context={'request': request}
+        ).data
+    return Response(data)
+
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
+def payment_webhook(request):
+    """
+    API view for gateways to report payment results in batches
+    """
+    # The raw body is read before request.data so the signature covers it
+    if not verify_signature(request.body, request.headers.get(SIGNATURE_HEADER)):
+        return Response(
+            {'error': 'Invalid signature'},
+            status=status.HTTP_403_FORBIDDEN
         )
-    except Exception as e:
-        print(f"Failed to send payment success email: {e}")
+    
+    events = request.data.get('events') if isinstance(request.data, dict) else None
+    if not isinstance(events, list):
+        return Response(
+            {'error': 'Expected a list of events'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    return Response({
+        'received': len(events),
+        'settled': apply_results(events)
+    })
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
@@ -309,29 +369,28 @@ def validate_coupon(request):
         coupon_code = serializer.validated_data['coupon_code']
         amount = serializer.validated_data['amount']
         
-        try:
-            coupon = Coupon.objects.get(code=coupon_code)
-            
-            if not coupon.can_be_used_by_user(request.user):
-                return Response(
-                    {'error': 'Coupon usage limit exceeded'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            discount_amount = coupon.calculate_discount(amount)
-            
-            return Response({
-                'valid': True,
-                'coupon': CouponSerializer(coupon).data,
-                'discount_amount': discount_amount,
-                'final_amount': amount - discount_amount
-            })
-            
-        except Coupon.DoesNotExist:
+        # Served from the coupon catalog without a query
+        coupon = get_coupon(coupon_code)
+        if coupon is None:
             return Response(
                 {'error': 'Invalid coupon code'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        
+        if not coupon.can_be_used_by_user(request.user):
+            return Response(
+                {'error': 'Coupon usage limit exceeded'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        discount_amount = coupon.calculate_discount(amount)
+        
+        return Response({
+            'valid': True,
+            'coupon': CouponSerializer(coupon).data,
+            'discount_amount': discount_amount,
+            'final_amount': amount - discount_amount
+        })
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -368,7 +427,7 @@ def booking_summary(request):
 @permission_classes([permissions.IsAuthenticated])
 def download_ticket(request, booking_id):
     """
-    API view to download ticket as PDF
+    API view to get ticket details and the PDF download link
     """
     try:
         booking = Booking.objects.get(
@@ -382,17 +441,95 @@ def download_ticket(request, booking_id):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # In a real implementation, you would generate a PDF ticket here
-    # For now, we'll return the ticket data
     ticket_data = BookingDetailSerializer(booking, context={'request': request}).data
     
     return Response({
         'message': 'Ticket download initiated',
         'ticket_data': ticket_data,
-        'download_url': f'/api/bookings/{booking_id}/ticket.pdf'  # Mock URL
+        'download_url': reverse('ticket_pdf', args=[booking.booking_id])
+    })
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+@renderer_classes([JSONRenderer, PDFRenderer])
+def ticket_pdf(request, booking_id):
+    """
+    API view to download the ticket PDF rendered after payment
+    """
+    booking = load_booking(
+        booking_id=booking_id,
+        user=request.user,
+        status='confirmed'
+    )
+    if booking is None:
+        return Response(
+            {'error': 'Booking not found or not confirmed'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    # Tickets are only rendered by the worker pool, never in the request
+    digest = ticket_digest(booking)
+    path = ticket_path(digest)
+    if not os.path.exists(path):
+        enqueue_ticket(booking.id)
+        return Response(
+            {'message': 'Ticket is being prepared'},
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Retry-After': '2'}
+        )
+    
+    return ticket_response(request, path, digest, f'ticket-{booking.booking_id}.pdf')
+
+# Gate views
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def show_manifest(request, show_id):
+    """
+    API view streaming every confirmed seat assignment of a show as JSON lines
+    """
+    return StreamingHttpResponse(manifest_lines(show_id), content_type='application/x-ndjson')
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAdminUser])
+def check_in_tickets(request, show_id):
+    """
+    API view to record a batch of ticket scans at the entrance
+    """
+    tokens = request.data.get('tokens')
+    if not isinstance(tokens, list) or not tokens:
+        return Response(
+            {'error': 'Expected a list of ticket tokens'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(tokens) > MAX_BATCH_SIZE:
+        return Response(
+            {'error': f'At most {MAX_BATCH_SIZE} scans per batch'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    results = check_in(show_id, tokens, gate=str(request.data.get('gate', ''))[:20])
+    return Response({
+        'admitted': sum(result['status'] == SCAN_ADMITTED for result in results),
+        'results': results
     })
 
 # Admin views
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def admin_waiting_room_stats(request):
+    """
+    API view for queue depth and admission rates of shows with a waiting room
+    """
+    from theaters.models import Show
+    
+    shows = Show.objects.filter(
+        queue_admission_rate__isnull=False,
+        show_date__gte=timezone.now().date()
+    ).values_list('id', 'queue_admission_rate')
+    
+    stats = [queue_metrics(show_id, rate) for show_id, rate in shows]
+    return Response([entry for entry in stats if entry is not None])
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAdminUser])
 def admin_booking_stats(request):
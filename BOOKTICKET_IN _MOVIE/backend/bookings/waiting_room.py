@@ -0,0 +1,260 @@
+"""
+Virtual waiting room for booking creation.
+
+Shows with a queue_admission_rate only take bookings from admitted
+clients. A client joins the show's queue and gets a signed token
+carrying its place in line, polls until the show's admission cursor
+passes that place, then sends the token with the booking request; a
+token is spent by the booking it makes. The cursor moves forward at the
+show's rate, so however many clients arrive, bookings reach the database
+at a steady pace. Queue state lives in the store chosen with
+WAITING_ROOM_STORE: in process memory by default, or in the cache.
+"""
+import threading
+import time
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+DEFAULT_STORE = 'bookings.waiting_room.LocalQueueStore'
+
+TOKEN_SALT = 'bookings.waiting_room'
+
+# Tokens expire this long after joining, time spent waiting included
+TOKEN_MAX_AGE = 60 * 60 * 2
+
+RATE_TIMEOUT = 60 * 5
+
+class BaseQueueStore:
+    """
+    Interface for per-show queue state.
+    
+    A show's queue is a tail counter handed out to joining clients and an
+    admission cursor; every position at or below the cursor is admitted.
+    """
+    def join(self, show_id, now):
+        """Append a client to the queue, returning its 1-based position"""
+        raise NotImplementedError
+    
+    def advance(self, show_id, rate, now):
+        """Move the cursor forward at rate per second, returning the admitted position"""
+        raise NotImplementedError
+    
+    def record_booking(self, show_id):
+        """Count a booking made with an admitted token"""
+        raise NotImplementedError
+    
+    def use_position(self, show_id, position):
+        """Spend an admitted position, returning False if it was already spent"""
+        raise NotImplementedError
+    
+    def release_position(self, show_id, position):
+        """Make a spent position usable again after its booking failed"""
+        raise NotImplementedError
+    
+    def is_used(self, show_id, position):
+        raise NotImplementedError
+    
+    def state(self, show_id):
+        """Return (tail, admitted, bookings, opened_at, updated_at) or None"""
+        raise NotImplementedError
+    
+    @staticmethod
+    def next_cursor(cursor, tail, rate, elapsed):
+        # Idle time earns at most one second of admissions, so a quiet
+        # queue can't bank credit and let a whole rush through at once
+        return min(cursor + rate * elapsed, tail + rate)
+
+class LocalQueueStore(BaseQueueStore):
+    """
+    Queue state kept in process memory
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queues = {}
+        self._used = {}
+    
+    def _queue(self, show_id, now):
+        queue = self._queues.get(show_id)
+        if queue is None:
+            # A new queue starts with one second of admissions in hand
+            queue = self._queues[show_id] = {
+                'tail': 0, 'cursor': 0.0, 'bookings': 0, 'opened_at': now, 'updated_at': now - 1
+            }
+        return queue
+    
+    def join(self, show_id, now):
+        with self._lock:
+            queue = self._queue(show_id, now)
+            queue['tail'] += 1
+            return queue['tail']
+    
+    def advance(self, show_id, rate, now):
+        with self._lock:
+            queue = self._queue(show_id, now)
+            elapsed = max(now - queue['updated_at'], 0)
+            queue['cursor'] = self.next_cursor(queue['cursor'], queue['tail'], rate, elapsed)
+            queue['updated_at'] = now
+            return int(queue['cursor'])
+    
+    def record_booking(self, show_id):
+        with self._lock:
+            self._queue(show_id, time.time())['bookings'] += 1
+    
+    def use_position(self, show_id, position):
+        with self._lock:
+            used = self._used.setdefault(show_id, set())
+            if position in used:
+                return False
+            used.add(position)
+            return True
+    
+    def release_position(self, show_id, position):
+        with self._lock:
+            self._used.get(show_id, set()).discard(position)
+    
+    def is_used(self, show_id, position):
+        with self._lock:
+            return position in self._used.get(show_id, ())
+    
+    def state(self, show_id):
+        with self._lock:
+            queue = self._queues.get(show_id)
+            if queue is None:
+                return None
+            admitted = min(int(queue['cursor']), queue['tail'])
+            return queue['tail'], admitted, queue['bookings'], queue['opened_at'], queue['updated_at']
+
+class CacheQueueStore(BaseQueueStore):
+    """
+    Queue state kept in the cache, shared by every worker using it
+    """
+    def _key(self, show_id, name):
+        return f'waiting-room:{show_id}:{name}'
+    
+    def join(self, show_id, now):
+        cache.add(self._key(show_id, 'tail'), 0, None)
+        cache.add(self._key(show_id, 'cursor'), (0.0, now, now - 1), None)
+        return cache.incr(self._key(show_id, 'tail'))
+    
+    def advance(self, show_id, rate, now):
+        tail = cache.get(self._key(show_id, 'tail'), 0)
+        cursor, opened_at, updated_at = cache.get(self._key(show_id, 'cursor'), (0.0, now, now - 1))
+        # Racing workers compute the same cursor from the same state, so the
+        # last write winning loses nothing
+        cursor = self.next_cursor(cursor, tail, rate, max(now - updated_at, 0))
+        cache.set(self._key(show_id, 'cursor'), (cursor, opened_at, now), None)
+        return int(cursor)
+    
+    def record_booking(self, show_id):
+        cache.add(self._key(show_id, 'bookings'), 0, None)
+        cache.incr(self._key(show_id, 'bookings'))
+    
+    def use_position(self, show_id, position):
+        # add only succeeds for the first writer; the key outlives the token
+        return cache.add(self._key(show_id, f'used:{position}'), 1, TOKEN_MAX_AGE)
+    
+    def release_position(self, show_id, position):
+        cache.delete(self._key(show_id, f'used:{position}'))
+    
+    def is_used(self, show_id, position):
+        return cache.get(self._key(show_id, f'used:{position}')) is not None
+    
+    def state(self, show_id):
+        values = cache.get_many([self._key(show_id, name) for name in ('tail', 'cursor', 'bookings')])
+        tail = values.get(self._key(show_id, 'tail'))
+        if tail is None:
+            return None
+        cursor, opened_at, updated_at = values[self._key(show_id, 'cursor')]
+        bookings = values.get(self._key(show_id, 'bookings'), 0)
+        return tail, min(int(cursor), tail), bookings, opened_at, updated_at
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_queue_store():
+    """Return the configured waiting room store instance"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                path = getattr(settings, 'WAITING_ROOM_STORE', DEFAULT_STORE)
+                _store = import_string(path)()
+    return _store
+
+def _rate_key(show_id):
+    return f'waiting-room:rate:{show_id}'
+
+def get_admission_rate(show_id):
+    """The show's admissions per second, or None when it has no waiting room"""
+    from theaters.models import Show
+    
+    key = _rate_key(show_id)
+    rate = cache.get(key)
+    if rate is None:
+        rate = Show.objects.filter(id=show_id).values_list('queue_admission_rate', flat=True).first() or 0
+        cache.set(key, rate, RATE_TIMEOUT)
+    return rate or None
+
+def invalidate_admission_rate(show_id):
+    key = _rate_key(show_id)
+    transaction.on_commit(lambda: cache.delete(key))
+
+def _ticket(show_id, position, rate, token):
+    admitted = get_queue_store().advance(show_id, rate, time.time())
+    ahead = max(position - admitted, 0)
+    return {
+        'token': token,
+        'position': position,
+        'ahead': ahead,
+        'admitted': ahead == 0,
+        'retry_after': 0 if ahead == 0 else max(1, round(ahead / rate))
+    }
+
+def join_queue(show_id, user, rate):
+    """Put the user in the show's queue and return their ticket"""
+    position = get_queue_store().join(show_id, time.time())
+    token = signing.dumps({'show': show_id, 'user': user.pk, 'position': position}, salt=TOKEN_SALT)
+    return _ticket(show_id, position, rate, token)
+
+def read_token(token, show_id, user):
+    """Position carried by a valid, unspent token for this show and user, or None"""
+    try:
+        data = signing.loads(token, salt=TOKEN_SALT, max_age=TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    if data.get('show') != show_id or data.get('user') != user.pk:
+        return None
+    if get_queue_store().is_used(show_id, data['position']):
+        return None
+    return data['position']
+
+def queue_status(show_id, user, token, rate):
+    """The ticket for a token, or None if the token isn't valid here"""
+    position = read_token(token, show_id, user)
+    if position is None:
+        return None
+    return _ticket(show_id, position, rate, token)
+
+def queue_metrics(show_id, rate):
+    """Queue depth and admission figures for a show's waiting room"""
+    now = time.time()
+    store = get_queue_store()
+    if rate:
+        store.advance(show_id, rate, now)
+    state = store.state(show_id)
+    if state is None:
+        return None
+    
+    tail, admitted, bookings, opened_at, updated_at = state
+    return {
+        'show': show_id,
+        'admission_rate': rate,
+        'joined': tail,
+        'admitted': admitted,
+        'waiting': tail - admitted,
+        'bookings': bookings,
+        'admitted_per_second': round(admitted / max(updated_at - opened_at, 1), 2)
+    }
\ No newline at end of file
@@ -3,4 +3,17 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'moviebook.settings')
 
-application = get_asgi_application()
\ No newline at end of file
+django_application = get_asgi_application()
+
+# Imported once Django is set up
+from bookings.payments import payment_stream
+from theaters.realtime import seat_stream
+
+async def application(scope, receive, send):
+    """Serve seat map and payment WebSockets next to the plain Django application"""
+    if scope['type'] == 'websocket' and scope['path'].startswith('/ws/payments/'):
+        await payment_stream(scope, receive, send)
+    elif scope['type'] == 'websocket':
+        await seat_stream(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
\ No newline at end of file
@@ -1,4 +1,6 @@
 import os
+from pathlib import Path
+from corsheaders.defaults import default_headers
 from decouple import config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -75,6 +77,40 @@ DATABASES = {
     }
 }
 
+# Cache
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='moviebook'),
+    }
+}
+
+# Seat holds ('bookings.holds.LocalHoldBackend' keeps holds in process memory)
+SEAT_HOLD_BACKEND = config('SEAT_HOLD_BACKEND', default='bookings.holds.DatabaseHoldBackend')
+
+IDEMPOTENCY_STORE = config('IDEMPOTENCY_STORE', default='bookings.idempotency.LocalResponseStore')
+
+WAITING_ROOM_STORE = config('WAITING_ROOM_STORE', default='bookings.waiting_room.LocalQueueStore')
+
+SEAT_STREAM_BROKER = config('SEAT_STREAM_BROKER', default='theaters.realtime.InProcessBroker')
+
+# Payments ('bookings.payments.HttpGatewayClient' talks to the mock_gateway command or a real gateway)
+PAYMENT_GATEWAY_CLIENT = config('PAYMENT_GATEWAY_CLIENT', default='bookings.payments.MockGatewayClient')
+PAYMENT_GATEWAY_URL = config('PAYMENT_GATEWAY_URL', default='http://127.0.0.1:8765')
+PAYMENT_GATEWAY_TIMEOUT = config('PAYMENT_GATEWAY_TIMEOUT', default=10, cast=int)
+PAYMENT_WEBHOOK_URL = config('PAYMENT_WEBHOOK_URL', default='http://127.0.0.1:8000/api/bookings/payments/webhook/')
+PAYMENT_WEBHOOK_SECRET = config('PAYMENT_WEBHOOK_SECRET', default='django-insecure-payment-webhook-secret')
+PAYMENT_WORKERS = config('PAYMENT_WORKERS', default=4, cast=int)
+
+# Rendered ticket PDFs, kept out of MEDIA_ROOT so they are never served publicly
+TICKET_CACHE_DIR = config('TICKET_CACHE_DIR', default=str(BASE_DIR / 'ticket_cache'))
+TICKET_RENDER_WORKERS = config('TICKET_RENDER_WORKERS', default=2, cast=int)
+# Shared with gate scanners so they can verify ticket QR codes offline
+TICKET_SIGNING_KEY = config('TICKET_SIGNING_KEY', default='django-insecure-ticket-signing-key')
+
+# Movie search index snapshot
+MOVIE_SEARCH_INDEX_PATH = config('MOVIE_SEARCH_INDEX_PATH', default=str(BASE_DIR / 'movie_search.idx'))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -137,8 +173,18 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+CORS_ALLOW_HEADERS = [
+    *default_headers,
+    'idempotency-key',
+    'x-queue-token',
+]
+
 # Email settings (for production)
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+# Emails are queued in the outbox and delivered by the dispatch_emails command
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = config('EMAIL_HOST', default='localhost')
+EMAIL_PORT = config('EMAIL_PORT', default=25, cast=int)
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='MovieBook <noreply@moviebook.com>')
 
 # Security settings
 SECURE_BROWSER_XSS_FILTER = True
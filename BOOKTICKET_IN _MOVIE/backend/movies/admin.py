@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Movie, Genre, Language, MovieReview, MovieImage
+from .reviews import set_verified
 
 @admin.register(Genre)
 class GenreAdmin(admin.ModelAdmin):
@@ -45,6 +46,10 @@ class MovieAdmin(admin.ModelAdmin):
     filter_horizontal = ('genres', 'languages')
     date_hierarchy = 'release_date'
     inlines = [MovieImageInline, MovieReviewInline]
+    readonly_fields = (
+        'review_count', 'review_rating_sum', 'rating_1_count', 'rating_2_count',
+        'rating_3_count', 'rating_4_count', 'rating_5_count'
+    )
     
     fieldsets = (
         ('Basic Information', {
@@ -59,6 +64,10 @@ class MovieAdmin(admin.ModelAdmin):
         ('Ratings & Status', {
             'fields': ('rating', 'is_active', 'is_featured')
         }),
+        ('Verified Reviews', {
+            'fields': readonly_fields,
+            'classes': ('collapse',)
+        }),
     )
 
 @admin.register(MovieReview)
@@ -72,13 +81,13 @@ class MovieReviewAdmin(admin.ModelAdmin):
     actions = ['verify_reviews', 'unverify_reviews']
     
     def verify_reviews(self, request, queryset):
-        queryset.update(is_verified=True)
-        self.message_user(request, f'{queryset.count()} reviews verified successfully.')
+        count = set_verified(queryset, True)
+        self.message_user(request, f'{count} reviews verified successfully.')
     verify_reviews.short_description = 'Verify selected reviews'
     
     def unverify_reviews(self, request, queryset):
-        queryset.update(is_verified=False)
-        self.message_user(request, f'{queryset.count()} reviews unverified successfully.')
+        count = set_verified(queryset, False)
+        self.message_user(request, f'{count} reviews unverified successfully.')
     unverify_reviews.short_description = 'Unverify selected reviews'
 
 @admin.register(MovieImage)
@@ -0,0 +1,35 @@
+from django.db.models import Case, IntegerField, When
+from rest_framework import filters
+from .search import search_movies
+
+def rank_by_search(queryset, query):
+    """
+    Narrow the queryset to movies matching the query in the search index,
+    annotated with search_rank (0 is the best match)
+    """
+    movie_ids = search_movies(query)
+    if not movie_ids:
+        return queryset.none()
+    return queryset.filter(id__in=movie_ids).annotate(search_rank=Case(
+        *[When(id=movie_id, then=rank) for rank, movie_id in enumerate(movie_ids)],
+        output_field=IntegerField()
+    ))
+
+class MovieSearchFilter(filters.SearchFilter):
+    """
+    Search filter answered by the movie search index instead of LIKE scans
+    """
+    def filter_queryset(self, request, queryset, view):
+        query = ' '.join(self.get_search_terms(request))
+        if not query:
+            return queryset
+        return rank_by_search(queryset, query)
+
+class MovieOrderingFilter(filters.OrderingFilter):
+    """
+    Orders search results by rank unless another ordering is asked for
+    """
+    def get_ordering(self, request, queryset, view):
+        if not request.query_params.get(self.ordering_param) and 'search_rank' in queryset.query.annotations:
+            return ['search_rank']
+        return super().get_ordering(request, queryset, view)
@@ -0,0 +1,19 @@
+import time
+from django.core.management.base import BaseCommand
+from movies.search import build_index, replace_index, save_index
+
+class Command(BaseCommand):
+    """
+    Rebuild the movie search index from the database and save its snapshot
+    """
+    help = 'Rebuild the full-text movie search index'
+    
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        index = build_index()
+        save_index(index)
+        replace_index(index)
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {len(index.documents)} movies ({len(index.postings)} terms) '
+            f'in {time.perf_counter() - started:.1f}s'
+        ))
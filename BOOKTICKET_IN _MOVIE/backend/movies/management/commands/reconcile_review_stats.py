@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from movies.models import Movie
+from movies.reviews import STAT_FIELDS, compute_stats
+
+class Command(BaseCommand):
+    """
+    Detect and repair drift in the review aggregates stored on movies
+    """
+    help = 'Recompute review counts, rating sums and star histograms of movies from verified reviews'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--movie', type=int, action='append', dest='movie_ids',
+                            help='Movie id to reconcile (repeatable)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drift without fixing it')
+    
+    def handle(self, *args, **options):
+        movies = Movie.objects.all()
+        if options['movie_ids']:
+            movies = movies.filter(id__in=options['movie_ids'])
+        stats = compute_stats(options['movie_ids'])
+        
+        checked = 0
+        changed = []
+        for movie in movies.only('id', 'title', *STAT_FIELDS).iterator(chunk_size=2000):
+            checked += 1
+            expected = stats.get(movie.id, {})
+            drift = {
+                field: (getattr(movie, field), expected.get(field, 0))
+                for field in STAT_FIELDS if getattr(movie, field) != expected.get(field, 0)
+            }
+            if not drift:
+                continue
+            self.stdout.write(f'Movie {movie.id} {movie.title}: ' + ', '.join(
+                f'{field} {stored} -> {actual}' for field, (stored, actual) in drift.items()
+            ))
+            for field, (_, actual) in drift.items():
+                setattr(movie, field, actual)
+            changed.append(movie)
+        
+        if not options['dry_run']:
+            Movie.objects.bulk_update(changed, STAT_FIELDS, batch_size=1000)
+        
+        action = 'found' if options['dry_run'] else 'repaired'
+        self.stdout.write(self.style.SUCCESS(f'Checked {checked} movies, {action} drift in {len(changed)}'))
@@ -1,6 +1,7 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils.text import slugify
+from .reviews import STAR_FIELDS, STAT_FIELDS, record_review_change
 
 class Genre(models.Model):
     """
@@ -62,6 +63,15 @@ class Movie(models.Model):
     )
     certificate = models.CharField(max_length=5, choices=RATING_CHOICES, default='U')
     
+    # Verified review aggregates, maintained by movies.reviews
+    review_count = models.PositiveIntegerField(default=0)
+    review_rating_sum = models.PositiveIntegerField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
+    
     # Media
     poster = models.ImageField(upload_to='movies/posters/')
     trailer_url = models.URLField(blank=True, null=True)
@@ -77,6 +87,13 @@ class Movie(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            # Review aggregates only change through F() updates; writing back
+            # the values loaded with this instance would lose concurrent ones
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in STAT_FIELDS
+            ]
         super().save(*args, **kwargs)
     
     def __str__(self):
@@ -102,6 +119,16 @@ class Movie(models.Model):
     def cast_list(self):
         return [name.strip() for name in self.cast.split(',') if name.strip()]
     
+    @property
+    def average_review_rating(self):
+        if self.review_count:
+            return round(self.review_rating_sum / self.review_count, 1)
+        return 0.0
+    
+    @property
+    def rating_histogram(self):
+        return {stars: getattr(self, field) for stars, field in STAR_FIELDS.items()}
+    
     class Meta:
         db_table = 'movies'
         ordering = ['-release_date', 'title']
@@ -128,6 +155,21 @@ class MovieReview(models.Model):
     def __str__(self):
         return f"{self.movie.title} - {self.user.full_name} ({self.rating}/5)"
     
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not {'movie', 'movie_id', 'rating', 'is_verified'} & set(update_fields):
+            return super().save(*args, **kwargs)
+        
+        # The stored row, locked, tells what the movie's aggregates counted so far
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = MovieReview.objects.select_for_update().filter(pk=self.pk).values_list(
+                    'movie_id', 'rating', 'is_verified'
+                ).first()
+            super().save(*args, **kwargs)
+            record_review_change(previous, (self.movie_id, self.rating, self.is_verified))
+    
     class Meta:
         db_table = 'movie_reviews'
         unique_together = ('movie', 'user')
@@ -0,0 +1,81 @@
+"""
+Verified review aggregates on Movie.
+
+Movies carry the count, rating sum and 1-5 star histogram of their
+verified reviews, so showing an average never scans the reviews. Every
+change that adds or removes a verified review applies its difference to
+those columns with F() updates in the same transaction, including bulk
+verification from the admin. The reconcile_review_stats command
+recomputes them from the reviews in one grouped query.
+"""
+from collections import Counter, defaultdict
+from django.db import transaction
+from django.db.models import Count, F
+
+STAR_FIELDS = {stars: f'rating_{stars}_count' for stars in range(1, 6)}
+
+STAT_FIELDS = ['review_count', 'review_rating_sum', *STAR_FIELDS.values()]
+
+def review_delta(rating, sign=1):
+    """Column changes for adding (sign 1) or removing (sign -1) a verified review"""
+    delta = {'review_count': sign, 'review_rating_sum': sign * rating}
+    if rating in STAR_FIELDS:
+        delta[STAR_FIELDS[rating]] = sign
+    return delta
+
+def apply_changes(changes):
+    """
+    Apply (movie_id, rating, sign) changes of verified reviews, one UPDATE per movie
+    """
+    from .models import Movie
+    
+    deltas = defaultdict(Counter)
+    for movie_id, rating, sign in changes:
+        deltas[movie_id].update(review_delta(rating, sign))
+    # Movies in id order so concurrent bulk changes lock rows in the same order
+    for movie_id, delta in sorted(deltas.items()):
+        values = {field: F(field) + amount for field, amount in delta.items() if amount}
+        if values:
+            Movie.objects.filter(id=movie_id).update(**values)
+
+def record_review_change(previous, current):
+    """
+    Update aggregates for a review going from previous to current, each a
+    (movie_id, rating, is_verified) tuple or None
+    """
+    changes = []
+    if previous is not None and previous[2]:
+        changes.append((previous[0], previous[1], -1))
+    if current is not None and current[2]:
+        changes.append((current[0], current[1], 1))
+    apply_changes(changes)
+
+def set_verified(queryset, verified):
+    """
+    Verify or unverify the reviews in the queryset, returning how many changed
+    """
+    from .models import MovieReview
+    
+    with transaction.atomic():
+        rows = list(queryset.select_for_update().exclude(is_verified=verified).values_list(
+            'id', 'movie_id', 'rating'
+        ))
+        if rows:
+            MovieReview.objects.filter(id__in=[row[0] for row in rows]).update(is_verified=verified)
+            sign = 1 if verified else -1
+            apply_changes((movie_id, rating, sign) for _, movie_id, rating in rows)
+    return len(rows)
+
+def compute_stats(movie_ids=None):
+    """Aggregates of every movie with verified reviews, from one grouped query"""
+    from .models import MovieReview
+    
+    reviews = MovieReview.objects.filter(is_verified=True)
+    if movie_ids is not None:
+        reviews = reviews.filter(movie_id__in=movie_ids)
+    stats = defaultdict(Counter)
+    for movie_id, rating, total in reviews.values('movie_id', 'rating').annotate(
+        total=Count('id')
+    ).order_by().values_list('movie_id', 'rating', 'total').iterator():
+        stats[movie_id].update({field: amount * total for field, amount in review_delta(rating).items()})
+    return stats
@@ -0,0 +1,286 @@
+"""
+In-process full-text search over movies.
+
+Titles, directors, cast members and descriptions are tokenized and
+case-folded (accents stripped) into an inverted index whose postings are
+sorted arrays of movie ids with term weights; title terms weigh most.
+Queries match every token, the last one as a prefix, and rank by weight
+times inverse document frequency.
+
+Each process holds its own copy. Saved or deleted movies are applied to
+it after commit and appended to a change log in the cache, which other
+processes replay on their next query. A writer reserves a number, logs
+its change under it and only then publishes it, so readers never reach a
+change that is not logged yet. Other processes only see the log through
+a shared cache (CACHE_BACKEND); the default local-memory cache keeps it
+per process, which only suits a single worker.
+
+A snapshot on disk (MOVIE_SEARCH_INDEX_PATH) records the last change it
+includes, so a new process loads it and replays the rest; if the log no
+longer reaches back that far the index is rebuilt from the database. The
+rebuild_search_index command rebuilds and saves it.
+"""
+import math
+import os
+import pickle
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+WEIGHTS = {
+    'title': 3.0,
+    'cast': 2.0,
+    'director': 2.0,
+    'description': 1.0,
+}
+
+DEFAULT_LIMIT = 1000
+
+# Vocabulary terms a trailing prefix may expand to
+MAX_PREFIX_TERMS = 50
+
+# Last change number handed out, and last one published to readers
+RESERVED_KEY = 'movie-search:reserved'
+SEQUENCE_KEY = 'movie-search:seq'
+
+# Logged in place of a change whose writer never logged it
+LOST_CHANGE = 0
+
+# Seconds to wait for an earlier writer to log its change before it is
+# given up as lost
+PUBLISH_WAIT = 1.0
+
+CHANGE_TIMEOUT = 60 * 60 * 24
+
+TOKEN = re.compile(r'\w+')
+
+def tokenize(text):
+    """Case-folded, accent-free word tokens of the text"""
+    text = unicodedata.normalize('NFKD', text or '').casefold()
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return TOKEN.findall(text)
+
+def movie_terms(movie):
+    """Weighted terms of a movie for the index"""
+    terms = {}
+    fields = [
+        ('title', movie.title),
+        ('director', movie.director),
+        ('description', movie.description),
+    ] + [('cast', name) for name in movie.cast_list]
+    for field, text in fields:
+        for token in tokenize(text):
+            terms[token] = terms.get(token, 0.0) + WEIGHTS[field]
+    return terms
+
+class SearchIndex:
+    """
+    Inverted index from terms to (movie ids, weights) array pairs
+    """
+    def __init__(self):
+        self.postings = {}
+        self.documents = {}
+        self.sequence = 0
+        self._vocabulary = None
+    
+    def __getstate__(self):
+        return {'postings': self.postings, 'documents': self.documents, 'sequence': self.sequence}
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._vocabulary = None
+    
+    def add(self, movie_id, terms):
+        self.remove(movie_id)
+        for term, weight in terms.items():
+            ids, weights = self.postings.get(term) or self.postings.setdefault(term, (array('q'), array('f')))
+            position = bisect_left(ids, movie_id)
+            ids.insert(position, movie_id)
+            weights.insert(position, weight)
+        self.documents[movie_id] = tuple(terms)
+        self._vocabulary = None
+    
+    def remove(self, movie_id):
+        for term in self.documents.pop(movie_id, ()):
+            ids, weights = self.postings[term]
+            position = bisect_left(ids, movie_id)
+            if position < len(ids) and ids[position] == movie_id:
+                del ids[position]
+                del weights[position]
+            if not ids:
+                del self.postings[term]
+                self._vocabulary = None
+    
+    def _expand(self, prefix):
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        start = bisect_left(self._vocabulary, prefix)
+        end = bisect_right(self._vocabulary, prefix + '\U0010ffff')
+        return self._vocabulary[start:min(end, start + MAX_PREFIX_TERMS)]
+    
+    def _scores(self, terms):
+        """Score of each movie over any of the terms"""
+        total = len(self.documents) or 1
+        scores = {}
+        for term in terms:
+            ids, weights = self.postings.get(term, ((), ()))
+            idf = math.log(1 + total / len(ids)) if ids else 0
+            for movie_id, weight in zip(ids, weights):
+                scores[movie_id] = max(scores.get(movie_id, 0.0), weight * idf)
+        return scores
+    
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """Ids of movies matching every token of the query, best first"""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        
+        groups = [[token] for token in tokens[:-1]]
+        groups.append(self._expand(tokens[-1]) or [tokens[-1]])
+        # Rarest token first keeps the candidate set small
+        groups.sort(key=lambda terms: sum(len(self.postings.get(term, ((),))[0]) for term in terms))
+        
+        ranked = None
+        for terms in groups:
+            scores = self._scores(terms)
+            if ranked is None:
+                ranked = scores
+            else:
+                ranked = {movie_id: score + scores[movie_id] for movie_id, score in ranked.items() if movie_id in scores}
+            if not ranked:
+                return []
+        return sorted(ranked, key=lambda movie_id: (-ranked[movie_id], movie_id))[:limit]
+
+def _index_path():
+    return str(getattr(settings, 'MOVIE_SEARCH_INDEX_PATH', settings.BASE_DIR / 'movie_search.idx'))
+
+def _change_key(sequence):
+    return f'movie-search:change:{sequence}'
+
+def _published_key(sequence):
+    return f'movie-search:published:{sequence}'
+
+def current_sequence():
+    cache.add(SEQUENCE_KEY, 0, None)
+    return cache.get(SEQUENCE_KEY) or 0
+
+def _reserve_sequence():
+    # Numbering restarts after the published changes if the key was evicted
+    cache.add(RESERVED_KEY, current_sequence(), None)
+    return cache.incr(RESERVED_KEY)
+
+def _publish(sequence):
+    """
+    Advance the published sequence over consecutive logged changes up to
+    the given one; each change is counted once by whichever writer claims it
+    """
+    deadline = time.monotonic() + PUBLISH_WAIT
+    position = current_sequence() + 1
+    while position <= sequence:
+        if cache.get(_change_key(position)) is None:
+            if time.monotonic() < deadline:
+                time.sleep(0.01)
+                continue
+            # Its writer died between reserving and logging, so readers
+            # that reach it rebuild instead of missing the change
+            cache.add(_change_key(position), LOST_CHANGE, CHANGE_TIMEOUT)
+        if cache.add(_published_key(position), 1, CHANGE_TIMEOUT):
+            current_sequence()
+            cache.incr(SEQUENCE_KEY)
+        position += 1
+
+def build_index():
+    """Build a fresh index from every active movie"""
+    from .models import Movie
+    
+    index = SearchIndex()
+    index.sequence = current_sequence()
+    for movie in Movie.objects.filter(is_active=True).only(
+        'id', 'title', 'director', 'cast', 'description'
+    ).iterator(chunk_size=2000):
+        index.add(movie.id, movie_terms(movie))
+    return index
+
+def save_index(index):
+    """Write the index snapshot, replacing the old one atomically"""
+    path = _index_path()
+    partial = f'{path}.{os.getpid()}.tmp'
+    with open(partial, 'wb') as file:
+        pickle.dump(index, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(partial, path)
+
+def _load_index():
+    try:
+        with open(_index_path(), 'rb') as file:
+            index = pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        index = None
+    if index is None or index.sequence > current_sequence() or not _replay(index):
+        index = build_index()
+        save_index(index)
+    return index
+
+def _replay(index):
+    """Apply logged changes the index hasn't seen, returning False if some are lost"""
+    from .models import Movie
+    
+    current = current_sequence()
+    if index.sequence >= current:
+        return True
+    sequences = range(index.sequence + 1, current + 1)
+    logged = cache.get_many([_change_key(sequence) for sequence in sequences])
+    if len(logged) < len(sequences) or LOST_CHANGE in logged.values():
+        return False
+    
+    movie_ids = set(logged.values())
+    movies = {movie.id: movie for movie in Movie.objects.filter(id__in=movie_ids, is_active=True).only(
+        'id', 'title', 'director', 'cast', 'description'
+    )}
+    for movie_id in movie_ids:
+        if movie_id in movies:
+            index.add(movie_id, movie_terms(movies[movie_id]))
+        else:
+            index.remove(movie_id)
+    index.sequence = current
+    return True
+
+_index = None
+_lock = threading.Lock()
+
+def get_index():
+    """Return this process's index, caught up with changes from other processes"""
+    global _index
+    with _lock:
+        if _index is None:
+            _index = _load_index()
+        elif _index.sequence != current_sequence() and not _replay(_index):
+            _index = build_index()
+        return _index
+
+def search_movies(query, limit=DEFAULT_LIMIT):
+    """Ids of active movies matching the query, best match first"""
+    index = get_index()
+    with _lock:
+        return index.search(query, limit)
+
+def replace_index(index):
+    """Install a rebuilt index in this process"""
+    global _index
+    with _lock:
+        _index = index
+
+def record_change(movie_id):
+    """Log a saved or deleted movie for every process once the transaction commits"""
+    def log():
+        sequence = _reserve_sequence()
+        cache.set(_change_key(sequence), movie_id, CHANGE_TIMEOUT)
+        _publish(sequence)
+        if _index is not None:
+            get_index()
+    transaction.on_commit(log)
@@ -76,8 +76,9 @@ class MovieDetailSerializer(serializers.ModelSerializer):
     poster_url = serializers.SerializerMethodField()
     images = MovieImageSerializer(many=True, read_only=True)
     reviews = MovieReviewSerializer(many=True, read_only=True)
-    average_rating = serializers.SerializerMethodField()
-    total_reviews = serializers.SerializerMethodField()
+    average_rating = serializers.FloatField(source='average_review_rating', read_only=True)
+    total_reviews = serializers.IntegerField(source='review_count', read_only=True)
+    rating_histogram = serializers.ReadOnlyField()
     
     class Meta:
         model = Movie
@@ -85,22 +86,13 @@ class MovieDetailSerializer(serializers.ModelSerializer):
             'id', 'title', 'slug', 'description', 'duration', 'duration_formatted',
             'release_date', 'end_date', 'director', 'cast', 'cast_list', 'rating',
             'certificate', 'poster', 'poster_url', 'trailer_url', 'genres', 'languages',
-            'images', 'reviews', 'average_rating', 'total_reviews', 'is_featured'
+            'images', 'reviews', 'average_rating', 'total_reviews', 'rating_histogram', 'is_featured'
         ]
     
     def get_poster_url(self, obj):
         if obj.poster:
             return self.context['request'].build_absolute_uri(obj.poster.url)
         return None
-    
-    def get_average_rating(self, obj):
-        reviews = obj.reviews.filter(is_verified=True)
-        if reviews.exists():
-            return round(sum(review.rating for review in reviews) / reviews.count(), 1)
-        return 0.0
-    
-    def get_total_reviews(self, obj):
-        return obj.reviews.filter(is_verified=True).count()
 
 class MovieReviewCreateSerializer(serializers.ModelSerializer):
     """
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Movie, MovieReview
+from .reviews import record_review_change
+from .search import record_change
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+def update_search_index_on_movie_change(sender, instance, **kwargs):
+    record_change(instance.id)
+
+@receiver(post_delete, sender=MovieReview)
+def update_review_stats_on_review_delete(sender, instance, **kwargs):
+    record_review_change((instance.movie_id, instance.rating, instance.is_verified), None)
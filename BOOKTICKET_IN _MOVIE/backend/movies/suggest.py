@@ -0,0 +1,159 @@
+"""
+Search-as-you-type suggestions.
+
+Titles, directors and cast members of active movies are case- and
+accent-folded and kept, starting at every word, in one sorted array that
+a prefix is looked up in with bisect. Each suggestion carries a
+popularity, the confirmed bookings of its movies, and results are the
+most popular matches. Prefixes of up to PRECOMPUTED_LENGTH characters,
+which match the largest share of the catalog, have their results worked
+out when the index is built.
+
+The index is immutable: a catalog change (see search.record_change) or
+POPULARITY_TTL passing makes it stale, a new one is built in a
+background thread and swapped in with a single assignment while the old
+one keeps answering.
+"""
+import threading
+import time
+from bisect import bisect_left
+from django.db import close_old_connections
+from django.db.models import Count
+from .search import current_sequence, tokenize
+
+MAX_SUGGESTIONS = 10
+
+PRECOMPUTED_LENGTH = 2
+
+# Seconds before booking counts are refreshed
+POPULARITY_TTL = 10 * 60
+
+# Seconds between checks of the catalog version in the shared cache
+CHECK_INTERVAL = 1.0
+
+SUGGEST_MOVIE = 'movie'
+SUGGEST_DIRECTOR = 'director'
+SUGGEST_CAST = 'cast'
+
+def _fold(text):
+    return ' '.join(tokenize(text))
+
+class SuggestionIndex:
+    """
+    Sorted (key, suggestion) arrays over every word start of every suggestion
+    """
+    def __init__(self, suggestions, sequence=0):
+        # Most popular first, so the first matches found are the best ones
+        self.suggestions = sorted(suggestions, key=lambda item: (-item['popularity'], item['text']))
+        self.sequence = sequence
+        self.built_at = time.monotonic()
+        
+        entries = []
+        for position, suggestion in enumerate(self.suggestions):
+            words = _fold(suggestion['text']).split(' ')
+            for start in range(len(words)):
+                entries.append((' '.join(words[start:]), position))
+        entries.sort()
+        self.keys = [key for key, _ in entries]
+        self.positions = [position for _, position in entries]
+        
+        self.precomputed = {}
+        for key, position in entries:
+            for length in range(1, min(PRECOMPUTED_LENGTH, len(key)) + 1):
+                self.precomputed.setdefault(key[:length], set()).add(position)
+        for prefix, positions in self.precomputed.items():
+            self.precomputed[prefix] = sorted(positions)[:MAX_SUGGESTIONS]
+    
+    def _match(self, prefix, limit):
+        if len(prefix) <= PRECOMPUTED_LENGTH and ' ' not in prefix:
+            return self.precomputed.get(prefix, [])[:limit]
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + '\U0010ffff', start)
+        return sorted(set(self.positions[start:end]))[:limit]
+    
+    def suggest(self, query, limit=MAX_SUGGESTIONS):
+        """Most popular suggestions with a word starting with the query"""
+        prefix = _fold(query)
+        if not prefix:
+            return []
+        return [self.suggestions[position] for position in self._match(prefix, min(limit, MAX_SUGGESTIONS))]
+
+def _popularity():
+    """Confirmed bookings per movie id, in one grouped query"""
+    from bookings.models import Booking
+    
+    return dict(Booking.objects.filter(status='confirmed').values(
+        'show__movie_id'
+    ).annotate(total=Count('id')).order_by().values_list('show__movie_id', 'total'))
+
+def build_index():
+    """Build suggestions from every active movie"""
+    from .models import Movie
+    
+    sequence = current_sequence()
+    popularity = _popularity()
+    suggestions = []
+    people = {}
+    for movie in Movie.objects.filter(is_active=True).only(
+        'id', 'title', 'slug', 'director', 'cast'
+    ).iterator(chunk_size=2000):
+        bookings = popularity.get(movie.id, 0)
+        suggestions.append({
+            'type': SUGGEST_MOVIE,
+            'text': movie.title,
+            'id': movie.id,
+            'slug': movie.slug,
+            'popularity': bookings,
+        })
+        # A person is as popular as all their movies together
+        for kind, name in [(SUGGEST_DIRECTOR, movie.director)] + [(SUGGEST_CAST, name) for name in movie.cast_list]:
+            key = (kind, _fold(name))
+            if not key[1]:
+                continue
+            person = people.setdefault(key, {'type': kind, 'text': name.strip(), 'popularity': 0})
+            person['popularity'] += bookings
+    return SuggestionIndex(suggestions + list(people.values()), sequence)
+
+_index = None
+_lock = threading.Lock()
+_rebuilding = False
+_checked_at = 0.0
+
+def _rebuild():
+    global _index, _rebuilding
+    close_old_connections()
+    try:
+        _index = build_index()
+    finally:
+        _rebuilding = False
+        close_old_connections()
+
+def _is_stale(index):
+    return index.sequence != current_sequence() or time.monotonic() - index.built_at > POPULARITY_TTL
+
+def get_index():
+    """
+    Return this process's suggestion index, refreshing it in the background once stale
+    """
+    global _index, _rebuilding, _checked_at
+    index = _index
+    if index is None:
+        with _lock:
+            if _index is None:
+                _index = build_index()
+            return _index
+    
+    now = time.monotonic()
+    if now - _checked_at < CHECK_INTERVAL:
+        return index
+    _checked_at = now
+    if not _rebuilding and _is_stale(index):
+        with _lock:
+            if not _rebuilding:
+                _rebuilding = True
+                threading.Thread(target=_rebuild, name='movie-suggest', daemon=True).start()
+    return index
+
+def suggest(query, limit=MAX_SUGGESTIONS):
+    """Up to limit suggestions for a partly typed query, most popular first"""
+    return get_index().suggest(query, limit)
@@ -9,6 +9,7 @@ urlpatterns = [
     path('genres/', views.genres_list, name='genres_list'),
     path('languages/', views.languages_list, name='languages_list'),
     path('search/', views.movie_search, name='movie_search'),
+    path('suggest/', views.movie_suggest, name='movie_suggest'),
     path('theater/<int:theater_id>/', views.movie_by_theater, name='movie_by_theater'),
     path('<slug:slug>/', views.MovieDetailView.as_view(), name='movie_detail'),
     path('<int:movie_id>/reviews/', views.MovieReviewListView.as_view(), name='movie_reviews'),
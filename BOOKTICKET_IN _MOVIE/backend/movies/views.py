@@ -1,10 +1,12 @@
-from rest_framework import generics, filters, status
+from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Avg
+from django.db.models import Avg
 from .models import Movie, Genre, Language, MovieReview
+from .filters import MovieSearchFilter, MovieOrderingFilter, rank_by_search
+from .suggest import MAX_SUGGESTIONS, suggest
 from .serializers import (
     MovieListSerializer, MovieDetailSerializer, GenreSerializer,
     LanguageSerializer, MovieReviewSerializer, MovieReviewCreateSerializer
@@ -17,7 +19,7 @@ class MovieListView(generics.ListAPIView):
     queryset = Movie.objects.filter(is_active=True)
     serializer_class = MovieListSerializer
     permission_classes = [AllowAny]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, MovieSearchFilter, MovieOrderingFilter]
     filterset_fields = ['genres__name', 'languages__name', 'certificate', 'is_featured']
     search_fields = ['title', 'director', 'cast', 'description']
     ordering_fields = ['release_date', 'rating', 'title']
@@ -150,12 +152,7 @@ def movie_search(request):
     movies = Movie.objects.filter(is_active=True)
     
     if query:
-        movies = movies.filter(
-            Q(title__icontains=query) |
-            Q(director__icontains=query) |
-            Q(cast__icontains=query) |
-            Q(description__icontains=query)
-        )
+        movies = rank_by_search(movies, query).order_by('search_rank')
     
     if city:
         movies = movies.filter(shows__theater__city__icontains=city).distinct()
@@ -172,20 +169,35 @@ def movie_search(request):
         'total': movies.count()
     })
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def movie_suggest(request):
+    """
+    API view for search-as-you-type suggestions of titles, directors and cast
+    """
+    query = request.GET.get('q', '')
+    try:
+        limit = max(1, min(int(request.GET.get('limit', MAX_SUGGESTIONS)), MAX_SUGGESTIONS))
+    except ValueError:
+        limit = MAX_SUGGESTIONS
+    
+    return Response({
+        'query': query,
+        'suggestions': suggest(query, limit)
+    })
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def movie_by_theater(request, theater_id):
     """
     API view to get movies showing in a specific theater
     """
-    from django.utils import timezone
-    today = timezone.now().date()
+    from theaters.showtimes import movie_ids_for_theater
     
     movies = Movie.objects.filter(
         is_active=True,
-        shows__theater_id=theater_id,
-        shows__show_date__gte=today
-    ).distinct()
+        id__in=movie_ids_for_theater(theater_id)
+    ).prefetch_related('genres', 'languages')
     
     serializer = MovieListSerializer(movies, many=True, context={'request': request})
     return Response(serializer.data)
\ No newline at end of file
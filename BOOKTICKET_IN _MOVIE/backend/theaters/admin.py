@@ -73,10 +73,15 @@ class ShowAdmin(admin.ModelAdmin):
     """
     Admin configuration for Show model
     """
-    list_display = ('movie', 'screen', 'show_date', 'show_time', 'base_price', 'available_seats', 'is_active')
+    list_display = (
+        'movie', 'screen', 'show_date', 'show_time', 'base_price', 'available_seats',
+        'queue_admission_rate', 'is_active'
+    )
     list_filter = ('show_date', 'is_active', 'is_housefull', 'screen__theater__city')
+    list_editable = ('queue_admission_rate',)
     search_fields = ('movie__title', 'screen__name', 'screen__theater__name')
     date_hierarchy = 'show_date'
+    readonly_fields = ('booked_count', 'available_count')
     inlines = [ShowSeatPricingInline]
     
     def get_queryset(self, request):
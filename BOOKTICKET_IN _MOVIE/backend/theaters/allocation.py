@@ -0,0 +1,103 @@
+"""
+Best-available seat allocation.
+
+Free seats of a show are indexed per row as runs of adjacent seats (same
+row, consecutive columns). A block of the requested size is placed inside
+a run only where it leaves no single free seat stranded on either side,
+and placements are ranked by how central the block sits: close to the
+middle of its row and to the preferred row two thirds of the way back.
+Everything works off the cached screen layout and seat map, so no query
+is needed beyond the show's held seats.
+"""
+import heapq
+from .availability import SEAT_BOOKED
+
+MAX_QUANTITY = 10
+
+# Fraction of the way from the screen to the back wall with the best view
+PREFERRED_ROW = 2 / 3
+
+class SeatBlock:
+    """
+    Adjacent seats in one row offered as a single allocation
+    """
+    def __init__(self, row, seats, score):
+        self.row = row
+        self.seats = seats
+        self.score = score
+    
+    @property
+    def seat_ids(self):
+        return [seat['id'] for seat in self.seats]
+
+def free_runs(layout, seat_map, held_seat_ids):
+    """Index the show's free seats as {row: [runs of adjacent free seats]}"""
+    taken = set(seat_map.seat_ids_in_state(SEAT_BOOKED)) | set(held_seat_ids)
+    index = {}
+    for row, seats in layout['rows'].items():
+        runs = []
+        run = []
+        for seat in seats:
+            free = seat['id'] not in taken
+            if free and run and seat['column'] == run[-1]['column'] + 1:
+                run.append(seat)
+                continue
+            if run:
+                runs.append(run)
+            run = [seat] if free else []
+        if run:
+            runs.append(run)
+        index[row] = runs
+    return index
+
+def _row_centres(layout):
+    centres = {}
+    for row, seats in layout['rows'].items():
+        columns = [seat['column'] for seat in seats]
+        if columns:
+            centres[row] = ((min(columns) + max(columns)) / 2, max((max(columns) - min(columns)) / 2, 1))
+    return centres
+
+def best_blocks(layout, seat_map, held_seat_ids, quantity, category_id=None, accessible=False, limit=5):
+    """
+    Up to limit blocks of quantity seats, best first.
+    
+    Blocks are restricted to the seat category and to accessible seats when
+    asked, and are never placed so that they leave a single-seat gap.
+    """
+    centres = _row_centres(layout)
+    positions = {row: position for position, row in enumerate(centres)}
+    preferred = (len(positions) - 1) * PREFERRED_ROW
+    depth = max(len(positions) - 1, 1)
+    
+    def eligible(seat):
+        if category_id is not None and seat['category_id'] != category_id:
+            return False
+        return seat['is_accessible'] or not accessible
+    
+    candidates = []
+    for row, runs in free_runs(layout, seat_map, held_seat_ids).items():
+        if row not in centres:
+            continue
+        centre, half_width = centres[row]
+        row_penalty = abs(positions[row] - preferred) / depth
+        
+        for run in runs:
+            size = len(run)
+            # Sliding count of seats in the window that don't match the filters
+            misses = [0]
+            for seat in run:
+                misses.append(misses[-1] + (not eligible(seat)))
+            
+            for start in range(size - quantity + 1):
+                end = start + quantity
+                if start == 1 or size - end == 1 or misses[end] != misses[start]:
+                    continue
+                middle = (run[start]['column'] + run[end - 1]['column']) / 2
+                score = abs(middle - centre) / half_width + row_penalty
+                candidates.append((score, positions[row], run[start]['column'], row, run, start))
+    
+    return [
+        SeatBlock(row, run[start:start + quantity], score)
+        for score, _, _, row, run, start in heapq.nsmallest(limit, candidates, key=lambda candidate: candidate[:3])
+    ]
\ No newline at end of file
@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+class TheatersConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'theaters'
+    
+    def ready(self):
+        from . import signals
\ No newline at end of file
@@ -0,0 +1,169 @@
+"""
+Per-show seat availability maps.
+
+A seat map holds one state byte per active seat of the show's screen,
+indexed by seat position (row, column order). Maps live in the cache and
+are updated in place whenever a booking changes, so reading the
+availability of a show never has to join bookings.
+
+The maps, their generation counters and the writer lock assume a single
+process: with the default local-memory cache every worker has its own
+copy, and a booking only updates the map of the worker that made it.
+SEAT_MAP_TIMEOUT is kept short so a map another worker changed is
+rebuilt from the database within seconds; deployments running several
+workers should point CACHE_BACKEND at a shared cache.
+"""
+from array import array
+from django.core.cache import cache
+from django.db import transaction
+from .realtime import DELTA_AVAILABLE, DELTA_BOOKED, publish_seat_delta
+
+SEAT_AVAILABLE = 0
+SEAT_BOOKED = 1
+
+# Seconds a map is trusted before it is rebuilt from the database
+SEAT_MAP_TIMEOUT = 30
+LOCK_TIMEOUT = 5
+
+def _map_key(show_id):
+    return f'seatmap:{show_id}'
+
+def _generation_key(show_id):
+    return f'seatmap:{show_id}:gen'
+
+def _lock_key(show_id):
+    return f'seatmap:{show_id}:lock'
+
+def _generation(show_id):
+    cache.add(_generation_key(show_id), 0, None)
+    return cache.get(_generation_key(show_id), 0)
+
+def _bump_generation(show_id):
+    cache.add(_generation_key(show_id), 0, None)
+    try:
+        return cache.incr(_generation_key(show_id))
+    except ValueError:
+        # Key was evicted between add() and incr()
+        cache.set(_generation_key(show_id), 1, None)
+        return 1
+
+class SeatMap:
+    """
+    Compact availability array for a single show
+    """
+    def __init__(self, show_id, seat_ids, states, generation=0):
+        self.show_id = show_id
+        self.seat_ids = seat_ids
+        self.states = states
+        self.generation = generation
+        self._positions = None
+    
+    @property
+    def positions(self):
+        """Seat id -> position lookup, built on first use"""
+        if self._positions is None:
+            self._positions = {seat_id: i for i, seat_id in enumerate(self.seat_ids)}
+        return self._positions
+    
+    def __len__(self):
+        return len(self.seat_ids)
+    
+    def state_of(self, seat_id):
+        position = self.positions.get(seat_id)
+        if position is None:
+            return None
+        return self.states[position]
+    
+    def is_booked(self, seat_id):
+        return self.state_of(seat_id) == SEAT_BOOKED
+    
+    def count(self, state):
+        return self.states.count(state)
+    
+    def seat_ids_in_state(self, state):
+        return [seat_id for seat_id, seat_state in zip(self.seat_ids, self.states) if seat_state == state]
+    
+    def set_state(self, seat_ids, state):
+        """Set the state of the given seats, returning the ids that changed"""
+        changed = []
+        for seat_id in seat_ids:
+            position = self.positions.get(seat_id)
+            if position is not None and self.states[position] != state:
+                self.states[position] = state
+                changed.append(seat_id)
+        return changed
+    
+    def dumps(self):
+        return (self.generation, self.seat_ids.tobytes(), bytes(self.states))
+    
+    @classmethod
+    def loads(cls, show_id, data):
+        generation, seat_ids, states = data
+        return cls(show_id, array('q', seat_ids), bytearray(states), generation)
+
+def build_seat_map(show):
+    """Build a seat map for the show from Seat and BookedSeat rows"""
+    from .models import Seat
+    from bookings.models import BookedSeat
+    
+    generation = _generation(show.id)
+    seat_ids = array('q', Seat.objects.filter(
+        screen_id=show.screen_id,
+        is_active=True
+    ).order_by('row', 'column').values_list('id', flat=True))
+    
+    seat_map = SeatMap(show.id, seat_ids, bytearray(len(seat_ids)), generation)
+    seat_map.set_state(
+        BookedSeat.objects.filter(
+            booking__show_id=show.id,
+            booking__status='confirmed'
+        ).values_list('seat_id', flat=True),
+        SEAT_BOOKED
+    )
+    return seat_map
+
+def rebuild_seat_map(show):
+    """Rebuild and store the seat map for the show"""
+    seat_map = build_seat_map(show)
+    cache.set(_map_key(show.id), seat_map.dumps(), SEAT_MAP_TIMEOUT)
+    return seat_map
+
+def get_seat_map(show):
+    """Return the cached seat map for the show, rebuilding it if stale"""
+    data = cache.get(_map_key(show.id))
+    if data is not None:
+        seat_map = SeatMap.loads(show.id, data)
+        if seat_map.generation == _generation(show.id):
+            return seat_map
+    return rebuild_seat_map(show)
+
+def invalidate_seat_maps(show_ids):
+    """Mark the seat maps of the given shows as stale"""
+    for show_id in show_ids:
+        _bump_generation(show_id)
+
+def _apply_seat_states(show_id, seat_ids, state):
+    generation = _bump_generation(show_id)
+    if not cache.add(_lock_key(show_id), 1, LOCK_TIMEOUT):
+        # Another writer holds the map; the generation bump makes the
+        # next reader rebuild it instead of losing this update.
+        return
+    try:
+        data = cache.get(_map_key(show_id))
+        if data is None:
+            return
+        seat_map = SeatMap.loads(show_id, data)
+        if seat_map.generation != generation - 1:
+            return
+        seat_map.set_state(seat_ids, state)
+        seat_map.generation = generation
+        cache.set(_map_key(show_id), seat_map.dumps(), SEAT_MAP_TIMEOUT)
+    finally:
+        cache.delete(_lock_key(show_id))
+
+def update_seat_states(show_id, seat_ids, state):
+    """Update seats in the show's map once the current transaction commits"""
+    seat_ids = list(seat_ids)
+    if seat_ids:
+        transaction.on_commit(lambda: _apply_seat_states(show_id, seat_ids, state))
+        publish_seat_delta(show_id, seat_ids, DELTA_BOOKED if state == SEAT_BOOKED else DELTA_AVAILABLE)
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""
+Cached static screen layouts.
+
+The seat grid of a screen (rows, columns, categories, accessibility) and
+its ScreenSerializer payload are serialized once per screen and cached as
+JSON bytes. seat_layout only merges the show's prices and booked/held
+state into that static part, producing the same response shape as
+serializing everything per request.
+"""
+import json
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+LAYOUT_TIMEOUT = 60 * 60 * 24
+
+CATEGORIES_KEY = 'seat-categories'
+
+def _layout_key(screen_id):
+    return f'screen-layout:{screen_id}'
+
+def build_screen_layout(screen):
+    """Serialize the static parts of a screen's seat layout"""
+    from .models import Screen
+    from .serializers import ScreenSerializer
+    
+    screen = Screen.objects.prefetch_related('seats__category').get(pk=screen.pk)
+    
+    rows = {}
+    for seat in screen.seats.all():
+        if not seat.is_active:
+            continue
+        rows.setdefault(seat.row, []).append({
+            'id': seat.id,
+            'seat_number': seat.seat_number,
+            'column': seat.column,
+            'category': {
+                'id': seat.category.id,
+                'name': seat.category.name,
+                'color_code': seat.category.color_code
+            },
+            'category_id': seat.category_id,
+            'is_accessible': seat.is_accessible
+        })
+    
+    return JSONRenderer().render({
+        'screen': ScreenSerializer(screen).data,
+        'rows': rows
+    })
+
+def get_screen_layout(screen):
+    """Return the cached static layout for the screen as a dict"""
+    key = _layout_key(screen.id)
+    data = cache.get(key)
+    if data is None:
+        data = build_screen_layout(screen)
+        cache.set(key, data, LAYOUT_TIMEOUT)
+    return json.loads(data)
+
+def get_seat_categories():
+    """Return the cached SeatCategorySerializer payload for all categories"""
+    from .models import SeatCategory
+    from .serializers import SeatCategorySerializer
+    
+    data = cache.get(CATEGORIES_KEY)
+    if data is None:
+        data = JSONRenderer().render(SeatCategorySerializer(SeatCategory.objects.all(), many=True).data)
+        cache.set(CATEGORIES_KEY, data, LAYOUT_TIMEOUT)
+    return json.loads(data)
+
+def invalidate_screen_layout(screen_id):
+    """Drop a screen's cached layout once the current transaction commits"""
+    key = _layout_key(screen_id)
+    transaction.on_commit(lambda: cache.delete(key))
+
+def invalidate_seat_category(category_id):
+    """
+    Drop the category list and the layouts of the screens with seats in the
+    category, whose name and color are embedded in them
+    """
+    from .models import Seat
+    
+    screen_ids = Seat.objects.filter(category_id=category_id).values_list('screen_id', flat=True).distinct()
+    keys = [CATEGORIES_KEY] + [_layout_key(screen_id) for screen_id in screen_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+def merge_show_state(layout, pricing, seat_map, held_seat_ids):
+    """Build seat_layout rows from the static layout and the show's state"""
+    seat_layout = {}
+    for row, seats in layout['rows'].items():
+        seat_layout[row] = [
+            {
+                'id': seat['id'],
+                'seat_number': seat['seat_number'],
+                'column': seat['column'],
+                'category': seat['category'],
+                'price': pricing.price_for(seat['category_id']),
+                'is_booked': seat_map.is_booked(seat['id']),
+                'is_held': seat['id'] in held_seat_ids,
+                'is_accessible': seat['is_accessible']
+            }
+            for seat in seats
+        ]
+    return seat_layout
\ No newline at end of file
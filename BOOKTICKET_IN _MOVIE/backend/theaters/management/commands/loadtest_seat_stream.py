@@ -0,0 +1,137 @@
+import asyncio
+import json
+import statistics
+import threading
+import time
+from django.core.management.base import BaseCommand, CommandError
+from theaters.models import Seat, Show
+from theaters.realtime import DELTA_HELD, get_broker, seat_stream
+
+DELTA_PREFIX = json.dumps({'type': 'delta'})[:-1]
+RESYNC_PREFIX = json.dumps({'type': 'resync'})[:-1]
+
+class Command(BaseCommand):
+    """
+    Load test the seat map WebSocket on a single show.
+    
+    Opens the requested number of watchers against the ASGI application in
+    this process, publishes deltas from a worker thread the way booking code
+    does, and reports how long each delta took to reach every watcher.
+    """
+    help = 'Load test seat map push with many concurrent watchers of one show'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('show_id', type=int)
+        parser.add_argument('--watchers', type=int, default=2000)
+        parser.add_argument('--deltas', type=int, default=50, help='Number of deltas to publish')
+        parser.add_argument('--rate', type=float, default=20.0, help='Deltas published per second')
+    
+    def handle(self, *args, **options):
+        try:
+            show = Show.objects.get(id=options['show_id'])
+        except Show.DoesNotExist:
+            raise CommandError('Show not found')
+        
+        seat_ids = list(Seat.objects.filter(screen=show.screen, is_active=True).values_list('id', flat=True))
+        if not seat_ids:
+            raise CommandError('Show has no seats')
+        
+        stats = asyncio.run(self.run(show.id, seat_ids, options))
+        
+        latencies = sorted(stats['latencies'])
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] if latencies else 0
+        self.stdout.write(f"Watchers:         {stats['connected']} of {options['watchers']}")
+        self.stdout.write(f"Connect time:     {stats['connect_time']:.2f}s")
+        self.stdout.write(f"Deltas:           {options['deltas']} ({len(latencies)} deliveries)")
+        if latencies:
+            self.stdout.write(f"Latency p50/p99:  {statistics.median(latencies) * 1000:.1f}ms / {p99 * 1000:.1f}ms")
+        if stats['fan_out']:
+            self.stdout.write(f"Fan-out max:      {max(stats['fan_out']) * 1000:.1f}ms")
+        self.stdout.write(f"Resyncs:          {stats['resyncs']}")
+        
+        expected = stats['connected'] * options['deltas']
+        if len(latencies) + stats['resyncs'] < expected:
+            self.stdout.write(self.style.ERROR(f"{expected - len(latencies)} deliveries were lost"))
+        else:
+            self.stdout.write(self.style.SUCCESS('Every watcher received every delta'))
+    
+    async def run(self, show_id, seat_ids, options):
+        broker = get_broker()
+        published = []
+        received = []
+        stats = {'connected': 0, 'resyncs': 0}
+        ready = asyncio.Event()
+        
+        def watcher():
+            state = {'connected': False, 'deltas': 0}
+            disconnect = asyncio.Event()
+            messages = [{'type': 'websocket.connect'}]
+            
+            async def receive():
+                if messages:
+                    return messages.pop()
+                await disconnect.wait()
+                return {'type': 'websocket.disconnect', 'code': 1000}
+            
+            async def send(message):
+                now = time.perf_counter()
+                if message['type'] == 'websocket.accept':
+                    state['connected'] = True
+                    stats['connected'] += 1
+                    if stats['connected'] == options['watchers']:
+                        ready.set()
+                elif message['type'] == 'websocket.send':
+                    # Deltas are told apart by prefix to keep the watchers cheap
+                    text = message['text']
+                    if text.startswith(DELTA_PREFIX):
+                        received.append((state['deltas'], now))
+                        state['deltas'] += 1
+                    elif text.startswith(RESYNC_PREFIX):
+                        stats['resyncs'] += 1
+                elif message['type'] == 'websocket.close':
+                    ready.set()
+            
+            scope = {'type': 'websocket', 'path': f'/ws/shows/{show_id}/seats/'}
+            return disconnect, asyncio.ensure_future(seat_stream(scope, receive, send))
+        
+        started = time.perf_counter()
+        connections = [watcher() for _ in range(options['watchers'])]
+        await ready.wait()
+        connect_time = time.perf_counter() - started
+        
+        def publish():
+            interval = 1 / options['rate']
+            for number in range(options['deltas']):
+                seat_id = seat_ids[number % len(seat_ids)]
+                published.append(time.perf_counter())
+                broker.publish(show_id, {'type': 'delta', 'show': show_id, 'state': DELTA_HELD, 'seats': [seat_id]})
+                time.sleep(interval)
+        
+        publisher = threading.Thread(target=publish)
+        publisher.start()
+        await asyncio.to_thread(publisher.join)
+        
+        # Let the last fan-out drain before disconnecting
+        expected = stats['connected'] * options['deltas']
+        for _ in range(100):
+            if len(received) + stats['resyncs'] >= expected:
+                break
+            await asyncio.sleep(0.05)
+        
+        for disconnect, task in connections:
+            disconnect.set()
+        await asyncio.gather(*(task for _, task in connections))
+        
+        last_delivery = {}
+        latencies = []
+        for number, at in received:
+            latencies.append(at - published[number])
+            last_delivery[number] = max(last_delivery.get(number, 0), at)
+        
+        return {
+            'connected': stats['connected'],
+            'connect_time': connect_time,
+            'latencies': latencies,
+            'fan_out': [at - published[number] for number, at in last_delivery.items()],
+            'resyncs': stats['resyncs'],
+        }
\ No newline at end of file
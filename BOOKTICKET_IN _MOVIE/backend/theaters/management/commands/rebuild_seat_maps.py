@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from theaters.availability import rebuild_seat_map
+from theaters.models import Show
+
+class Command(BaseCommand):
+    """
+    Rebuild cached per-show seat availability maps from the database
+    """
+    help = 'Rebuild seat availability maps for shows'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--show', type=int, action='append', dest='show_ids',
+                            help='Show id to rebuild (repeatable)')
+        parser.add_argument('--all', action='store_true',
+                            help='Include past and inactive shows')
+    
+    def handle(self, *args, **options):
+        shows = Show.objects.all()
+        if options['show_ids']:
+            shows = shows.filter(id__in=options['show_ids'])
+        elif not options['all']:
+            shows = shows.filter(is_active=True, show_date__gte=timezone.now().date())
+        
+        rebuilt = 0
+        for show in shows.only('id', 'screen_id').iterator():
+            rebuild_seat_map(show)
+            rebuilt += 1
+        
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rebuilt} seat maps'))
\ No newline at end of file
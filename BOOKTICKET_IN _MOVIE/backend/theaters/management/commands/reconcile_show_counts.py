@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from django.utils import timezone
+from bookings.models import Booking
+from theaters.models import Show
+
+class Command(BaseCommand):
+    """
+    Detect and repair drift in the denormalized seat counters on Show
+    """
+    help = 'Recompute booked_count/available_count from confirmed bookings'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--show', type=int, action='append', dest='show_ids',
+                            help='Show id to reconcile (repeatable)')
+        parser.add_argument('--all', action='store_true',
+                            help='Include past and inactive shows')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drift without fixing it')
+    
+    def handle(self, *args, **options):
+        shows = Show.objects.all()
+        if options['show_ids']:
+            shows = shows.filter(id__in=options['show_ids'])
+        elif not options['all']:
+            shows = shows.filter(is_active=True, show_date__gte=timezone.now().date())
+        
+        booked = dict(Booking.objects.filter(
+            status='confirmed',
+            show__in=shows
+        ).values('show_id').annotate(total=Sum('quantity')).values_list('show_id', 'total'))
+        
+        checked = drifted = 0
+        for show in shows.select_related('screen').only(
+            'id', 'booked_count', 'available_count', 'is_housefull', 'screen__total_seats'
+        ).iterator():
+            checked += 1
+            booked_count = booked.get(show.id, 0)
+            available_count = max(show.screen.total_seats - booked_count, 0)
+            if (show.booked_count, show.available_count) == (booked_count, available_count):
+                continue
+            
+            drifted += 1
+            self.stdout.write(
+                f'Show {show.id}: booked {show.booked_count} -> {booked_count}, '
+                f'available {show.available_count} -> {available_count}'
+            )
+            if not options['dry_run']:
+                Show.objects.filter(id=show.id).update(
+                    booked_count=booked_count,
+                    available_count=available_count,
+                    is_housefull=available_count == 0
+                )
+        
+        action = 'found' if options['dry_run'] else 'repaired'
+        self.stdout.write(self.style.SUCCESS(f'Checked {checked} shows, {action} drift in {drifted}'))
\ No newline at end of file
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 
@@ -126,6 +126,16 @@ class Show(models.Model):
     # Pricing
     base_price = models.DecimalField(max_digits=8, decimal_places=2)
     
+    # Seat counters, maintained as bookings are confirmed and released.
+    # available_count follows the screen's capacity (refresh_available_counts);
+    # rows that predate the counters are backfilled by reconcile_show_counts,
+    # which also runs after migrate for shows whose counters are both 0
+    booked_count = models.PositiveIntegerField(default=0)
+    available_count = models.PositiveIntegerField(default=0)
+    
+    # Admissions per second through the booking waiting room; empty turns it off
+    queue_admission_rate = models.PositiveIntegerField(null=True, blank=True)
+    
     # Status
     is_active = models.BooleanField(default=True)
     is_housefull = models.BooleanField(default=False)
@@ -134,6 +144,18 @@ class Show(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        if adding:
+            self.available_count = max(self.screen.total_seats - self.booked_count, 0)
+        super().save(*args, **kwargs)
+        
+        update_fields = kwargs.get('update_fields')
+        if not adding and (update_fields is None or 'screen' in update_fields):
+            # The show may have moved to a screen of another size
+            Show.refresh_available_counts(Show.objects.filter(pk=self.pk))
+            self.refresh_from_db(fields=['available_count', 'is_housefull'])
+    
     def __str__(self):
         return f"{self.movie.title} - {self.screen} - {self.show_date} {self.show_time}"
     
@@ -143,11 +165,70 @@ class Show(models.Model):
     
     @property
     def available_seats(self):
-        total_seats = self.screen.total_seats
-        booked_seats = self.bookings.filter(status='confirmed').aggregate(
-            total=models.Sum('quantity')
-        )['total'] or 0
-        return total_seats - booked_seats
+        return self.available_count
+    
+    @classmethod
+    def refresh_available_counts(cls, shows):
+        """
+        Recompute available_count and is_housefull of the shows from their
+        screens' total_seats and their booked_count, in one UPDATE
+        """
+        total_seats = models.Subquery(
+            Screen.objects.filter(id=models.OuterRef('screen_id')).values('total_seats')[:1]
+        )
+        show_ids = list(shows.values_list('id', flat=True))
+        if not show_ids:
+            return 0
+        
+        with transaction.atomic():
+            # Compared before subtracting: the columns are unsigned on MySQL
+            updated = cls.objects.filter(id__in=show_ids).update(
+                available_count=models.Case(
+                    models.When(booked_count__gte=total_seats, then=models.Value(0)),
+                    default=total_seats - models.F('booked_count')
+                ),
+                is_housefull=models.Case(
+                    models.When(booked_count__gte=total_seats, then=models.Value(True)),
+                    default=models.Value(False)
+                )
+            )
+            
+            from .showtimes import invalidate_shows
+            invalidate_shows(show_ids)
+        return updated
+    
+    @classmethod
+    def adjust_booked_count(cls, show_id, seats):
+        """
+        Atomically add (or with a negative count, remove) booked seats.
+        
+        Returns False when the counters can't absorb the change (they have
+        drifted from the inventory) and nothing was updated.
+        """
+        if not seats:
+            return True
+        
+        shows = cls.objects.filter(id=show_id)
+        if seats > 0:
+            shows = shows.filter(available_count__gte=seats)
+        else:
+            shows = shows.filter(booked_count__gte=-seats)
+        
+        with transaction.atomic():
+            updated = shows.update(
+                booked_count=models.F('booked_count') + seats,
+                available_count=models.F('available_count') - seats
+            )
+            cls.objects.filter(id=show_id).update(
+                is_housefull=models.Case(
+                    models.When(available_count__lte=0, then=models.Value(True)),
+                    default=models.Value(False)
+                )
+            )
+            
+            from .showtimes import invalidate_shows
+            invalidate_shows([show_id])
+        return bool(updated)
     
     @property
     def is_past(self):
@@ -0,0 +1,188 @@
+"""
+Live seat-map push over WebSocket.
+
+Clients connect to ws/shows/<show_id>/seats/, receive one snapshot of the
+show's booked and held seats, then small deltas whenever seats are held,
+booked, released or expired. Deltas are published after commit by the
+booking code and fanned out by a broker chosen with SEAT_STREAM_BROKER.
+The default broker fans out inside the ASGI worker process.
+"""
+import asyncio
+import json
+import re
+import threading
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+DEFAULT_BROKER = 'theaters.realtime.InProcessBroker'
+
+DELTA_HELD = 'held'
+DELTA_BOOKED = 'booked'
+DELTA_AVAILABLE = 'available'
+
+# Deltas buffered per watcher before it is told to resync
+QUEUE_SIZE = 64
+
+SNAPSHOT_TTL = 1.0
+
+STREAM_PATH = re.compile(r'^/ws/shows/(?P<show_id>\d+)/seats/$')
+
+class BaseBroker:
+    """
+    Interface for fanning seat deltas out to watchers of a show
+    """
+    def subscribe(self, show_id):
+        """Register a watcher and return the asyncio.Queue it reads from"""
+        raise NotImplementedError
+    
+    def unsubscribe(self, show_id, queue):
+        raise NotImplementedError
+    
+    def publish(self, show_id, message):
+        """Deliver a message to every watcher of the show; safe from any thread"""
+        raise NotImplementedError
+
+class InProcessBroker(BaseBroker):
+    """
+    Broker that fans deltas out to watchers in this process
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._loop = None
+    
+    def subscribe(self, show_id):
+        queue = asyncio.Queue(QUEUE_SIZE)
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._subscribers.setdefault(show_id, set()).add(queue)
+        return queue
+    
+    def unsubscribe(self, show_id, queue):
+        with self._lock:
+            watchers = self._subscribers.get(show_id)
+            if watchers is not None:
+                watchers.discard(queue)
+                if not watchers:
+                    del self._subscribers[show_id]
+    
+    def watcher_count(self, show_id):
+        with self._lock:
+            return len(self._subscribers.get(show_id, ()))
+    
+    def publish(self, show_id, message):
+        with self._lock:
+            loop = self._loop
+            if loop is None or show_id not in self._subscribers:
+                return
+        if loop.is_closed():
+            return
+        # The message is encoded once and shared by every watcher
+        loop.call_soon_threadsafe(self._fan_out, show_id, json.dumps(message))
+    
+    def _fan_out(self, show_id, text):
+        with self._lock:
+            watchers = list(self._subscribers.get(show_id, ()))
+        for queue in watchers:
+            try:
+                queue.put_nowait(text)
+            except asyncio.QueueFull:
+                # Slow watcher: drop its backlog and make it refetch the layout
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(json.dumps({'type': 'resync'}))
+
+_broker = None
+_broker_lock = threading.Lock()
+
+def get_broker():
+    """Return the configured seat stream broker instance"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, 'SEAT_STREAM_BROKER', DEFAULT_BROKER)
+                _broker = import_string(path)()
+    return _broker
+
+def publish_seat_delta(show_id, seat_ids, state):
+    """Send a seat state change to the show's watchers once the transaction commits"""
+    seat_ids = list(seat_ids)
+    if not seat_ids:
+        return
+    message = {'type': 'delta', 'show': show_id, 'state': state, 'seats': seat_ids}
+    transaction.on_commit(lambda: get_broker().publish(show_id, message))
+
+_snapshots = {}
+
+def _build_snapshot(show_id):
+    from bookings.holds import held_seat_ids
+    from .availability import SEAT_BOOKED, get_seat_map
+    from .models import Show
+    
+    show = Show.objects.filter(id=show_id, is_active=True).only('id', 'screen_id').first()
+    if show is None:
+        return None
+    return json.dumps({
+        'type': 'snapshot',
+        'show': show_id,
+        'booked': get_seat_map(show).seat_ids_in_state(SEAT_BOOKED),
+        'held': sorted(held_seat_ids(show_id))
+    })
+
+def get_snapshot(show_id):
+    """Snapshot of the show's seats, shared by watchers connecting within a second"""
+    cached = _snapshots.get(show_id)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+    snapshot = _build_snapshot(show_id)
+    _snapshots[show_id] = (time.monotonic() + SNAPSHOT_TTL, snapshot)
+    return snapshot
+
+async def seat_stream(scope, receive, send):
+    """ASGI application for ws/shows/<show_id>/seats/"""
+    match = STREAM_PATH.match(scope['path'])
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    if match is None:
+        await send({'type': 'websocket.close', 'code': 4404})
+        return
+    
+    show_id = int(match.group('show_id'))
+    broker = get_broker()
+    # Subscribe before taking the snapshot so no delta falls in between
+    queue = broker.subscribe(show_id)
+    try:
+        snapshot = await sync_to_async(get_snapshot)(show_id)
+        if snapshot is None:
+            await send({'type': 'websocket.close', 'code': 4404})
+            return
+        
+        await send({'type': 'websocket.accept'})
+        await send({'type': 'websocket.send', 'text': snapshot})
+        
+        disconnected = asyncio.ensure_future(wait_for_disconnect(receive, queue))
+        try:
+            while True:
+                text = await queue.get()
+                if text is None:
+                    break
+                await send({'type': 'websocket.send', 'text': text})
+        finally:
+            disconnected.cancel()
+    finally:
+        broker.unsubscribe(show_id, queue)
+
+async def wait_for_disconnect(receive, queue):
+    while True:
+        message = await receive()
+        if message['type'] == 'websocket.disconnect':
+            break
+    # Wake the sender loop with a sentinel, dropping anything still queued
+    while not queue.empty():
+        queue.get_nowait()
+    queue.put_nowait(None)
\ No newline at end of file
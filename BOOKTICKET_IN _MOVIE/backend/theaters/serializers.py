@@ -108,6 +108,15 @@ class ShowDetailSerializer(serializers.ModelSerializer):
             'base_price', 'seat_pricing', 'available_seats', 'is_housefull', 'is_past'
         ]
 
+class ShowSeatLayoutSerializer(ShowDetailSerializer):
+    """
+    Serializer for Show details in the seat layout, reusing a cached screen payload
+    """
+    screen = serializers.SerializerMethodField()
+    
+    def get_screen(self, obj):
+        return self.context['screen_layout']
+
 class ShowCreateSerializer(serializers.ModelSerializer):
     """
     Serializer for creating shows
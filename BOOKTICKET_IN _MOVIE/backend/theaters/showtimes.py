@@ -0,0 +1,150 @@
+"""
+Precomputed showtime index.
+
+The index is kept in the cache in two directions:
+
+* movie buckets, keyed by (movie, date), group that day's shows by city
+  and theater for shows_by_movie_and_city;
+* theater buckets, keyed by theater, group upcoming shows by date and
+  movie for movie_by_theater.
+
+Each bucket carries theater and screen metadata, show times, seat prices
+and availability, and is built with a fixed number of queries. Buckets
+touched by a Show, ShowSeatPricing, Theater, Screen or seat counter change
+are dropped after commit and rebuilt on the next read.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+INDEX_TIMEOUT = 60 * 5
+
+def _movie_key(movie_id, show_date):
+    return f'showtimes:movie:{movie_id}:{show_date}'
+
+def _theater_key(theater_id):
+    return f'showtimes:theater:{theater_id}'
+
+def _show_entries(shows):
+    """Serialize shows with their seat prices using one extra query"""
+    from .models import ShowSeatPricing
+    
+    shows = list(shows)
+    prices = {}
+    for show_id, category, price in ShowSeatPricing.objects.filter(
+        show__in=shows
+    ).values_list('show_id', 'seat_category__name', 'price'):
+        prices.setdefault(show_id, {})[category] = price
+    
+    entries = []
+    for show in shows:
+        theater = show.screen.theater
+        entries.append((show, theater, {
+            'id': show.id,
+            'screen_name': show.screen.name,
+            'screen_type': show.screen.screen_type,
+            'show_time': show.show_time,
+            'base_price': show.base_price,
+            'seat_prices': prices.get(show.id, {}),
+            'available_seats': show.available_count,
+            'is_housefull': show.is_housefull
+        }))
+    return entries
+
+def _theater_entry(theater):
+    return {
+        'id': theater.id,
+        'name': theater.name,
+        'address': theater.full_address,
+        'facilities': theater.facilities,
+        'shows': []
+    }
+
+def build_movie_bucket(movie_id, show_date):
+    """Shows of a movie on a date, grouped by city then theater"""
+    from .models import Show
+    
+    shows = Show.objects.filter(
+        movie_id=movie_id,
+        show_date=show_date,
+        is_active=True
+    ).select_related('screen', 'screen__theater').order_by('show_time')
+    
+    cities = {}
+    for show, theater, entry in _show_entries(shows):
+        theaters = cities.setdefault(theater.city.casefold(), {})
+        if theater.id not in theaters:
+            theaters[theater.id] = _theater_entry(theater)
+        theaters[theater.id]['shows'].append(entry)
+    
+    return {city: list(theaters.values()) for city, theaters in cities.items()}
+
+def build_theater_bucket(theater_id):
+    """Upcoming shows of a theater, grouped by date then movie"""
+    from .models import Show
+    
+    shows = Show.objects.filter(
+        screen__theater_id=theater_id,
+        show_date__gte=timezone.now().date(),
+        is_active=True
+    ).select_related('screen', 'screen__theater').order_by('show_date', 'show_time')
+    
+    dates = {}
+    for show, theater, entry in _show_entries(shows):
+        movies = dates.setdefault(show.show_date, {})
+        movies.setdefault(show.movie_id, []).append(entry)
+    return dates
+
+def shows_for_movie(movie_id, show_date, city=''):
+    """Theaters (with their shows) playing the movie on the date, optionally in a city"""
+    key = _movie_key(movie_id, show_date)
+    bucket = cache.get(key)
+    if bucket is None:
+        bucket = build_movie_bucket(movie_id, show_date)
+        cache.set(key, bucket, INDEX_TIMEOUT)
+    
+    city = city.casefold()
+    if city in bucket:
+        return bucket[city]
+    return [
+        theater
+        for bucket_city, theaters in bucket.items() if city in bucket_city
+        for theater in theaters
+    ]
+
+def shows_for_theater(theater_id):
+    """Upcoming shows of the theater as {date: {movie_id: [shows]}}"""
+    key = _theater_key(theater_id)
+    bucket = cache.get(key)
+    if bucket is None:
+        bucket = build_theater_bucket(theater_id)
+        cache.set(key, bucket, INDEX_TIMEOUT)
+    
+    today = timezone.now().date()
+    return {show_date: movies for show_date, movies in bucket.items() if show_date >= today}
+
+def movie_ids_for_theater(theater_id):
+    """Ids of movies with upcoming shows in the theater"""
+    movie_ids = set()
+    for movies in shows_for_theater(theater_id).values():
+        movie_ids.update(movies)
+    return movie_ids
+
+def invalidate_buckets(pairs=(), theater_ids=()):
+    """Drop movie buckets for (movie_id, date) pairs and theater buckets after commit"""
+    keys = [_movie_key(movie_id, show_date) for movie_id, show_date in pairs]
+    keys += [_theater_key(theater_id) for theater_id in theater_ids]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+def invalidate_shows(show_ids):
+    """Drop every bucket that contains one of the shows"""
+    from .models import Show
+    
+    rows = list(Show.objects.filter(id__in=show_ids).values_list(
+        'movie_id', 'show_date', 'screen__theater_id'
+    ))
+    invalidate_buckets(
+        pairs={(movie_id, show_date) for movie_id, show_date, _ in rows},
+        theater_ids={theater_id for _, _, theater_id in rows}
+    )
\ No newline at end of file
@@ -0,0 +1,85 @@
+from django.core.management import call_command
+from django.db.models.signals import pre_save, post_save, post_delete, post_migrate
+from django.dispatch import receiver
+from django.utils import timezone
+from .availability import invalidate_seat_maps
+from .layout import invalidate_screen_layout, invalidate_seat_category
+from .models import Theater, Screen, Seat, SeatCategory, Show, ShowSeatPricing
+from .showtimes import invalidate_buckets, invalidate_shows
+
+@receiver(post_save, sender=Seat)
+@receiver(post_delete, sender=Seat)
+def invalidate_seat_maps_on_seat_change(sender, instance, **kwargs):
+    """Seat positions changed, so every show on the screen needs a new map"""
+    invalidate_screen_layout(instance.screen_id)
+    invalidate_seat_maps(
+        Show.objects.filter(screen_id=instance.screen_id).values_list('id', flat=True)
+    )
+
+@receiver(post_save, sender=Screen)
+@receiver(post_delete, sender=Screen)
+def invalidate_layout_on_screen_change(sender, instance, **kwargs):
+    invalidate_screen_layout(instance.id)
+
+@receiver(post_save, sender=Screen)
+def refresh_show_counts_on_screen_change(sender, instance, created, **kwargs):
+    """The screen's capacity may have changed, so its shows' free seats did too"""
+    if not created:
+        Show.refresh_available_counts(Show.objects.filter(screen=instance))
+
+@receiver(post_migrate)
+def backfill_show_counts(sender, **kwargs):
+    """
+    Fill in the seat counters of shows created before they existed, which
+    would otherwise read as sold out
+    """
+    if sender.name != 'theaters':
+        return
+    show_ids = list(Show.objects.filter(booked_count=0, available_count=0).values_list('id', flat=True))
+    if show_ids:
+        call_command('reconcile_show_counts', show_ids=show_ids, verbosity=kwargs.get('verbosity', 1))
+
+@receiver(post_save, sender=SeatCategory)
+@receiver(post_delete, sender=SeatCategory)
+def invalidate_layouts_on_category_change(sender, instance, **kwargs):
+    """
+    Deleting a category deletes its seats first, whose own receiver drops
+    their screens' layouts
+    """
+    invalidate_seat_category(instance.id)
+
+@receiver(pre_save, sender=Show)
+def remember_show_placement(sender, instance, **kwargs):
+    """Keep the buckets a show is leaving so they can be dropped too"""
+    instance._previous_buckets = None
+    if instance.pk:
+        instance._previous_buckets = Show.objects.filter(pk=instance.pk).values_list(
+            'movie_id', 'show_date', 'screen__theater_id'
+        ).first()
+
+@receiver(post_save, sender=Show)
+@receiver(post_delete, sender=Show)
+def invalidate_showtimes_on_show_change(sender, instance, **kwargs):
+    pairs = {(instance.movie_id, instance.show_date)}
+    theater_ids = {instance.screen.theater_id}
+    previous = getattr(instance, '_previous_buckets', None)
+    if previous:
+        pairs.add(previous[:2])
+        theater_ids.add(previous[2])
+    invalidate_buckets(pairs, theater_ids)
+
+@receiver(post_save, sender=ShowSeatPricing)
+@receiver(post_delete, sender=ShowSeatPricing)
+def invalidate_showtimes_on_pricing_change(sender, instance, **kwargs):
+    invalidate_shows([instance.show_id])
+
+@receiver(post_save, sender=Theater)
+@receiver(post_save, sender=Screen)
+def invalidate_showtimes_on_venue_change(sender, instance, **kwargs):
+    """Theater or screen details are copied into every upcoming show's buckets"""
+    shows = Show.objects.filter(show_date__gte=timezone.now().date())
+    if sender is Theater:
+        shows = shows.filter(screen__theater=instance)
+    else:
+        shows = shows.filter(screen=instance)
+    invalidate_shows(shows.values_list('id', flat=True))
\ No newline at end of file
@@ -12,6 +12,7 @@ urlpatterns = [
     path('shows/<int:pk>/', views.ShowDetailView.as_view(), name='show_detail'),
     path('shows/movie/<int:movie_id>/', views.shows_by_movie_and_city, name='shows_by_movie'),
     path('shows/<int:show_id>/seats/', views.seat_layout, name='seat_layout'),
+    path('shows/<int:show_id>/seats/best/', views.best_available_seats, name='best_available_seats'),
     
     # Admin endpoints
     path('shows/create/', views.ShowCreateView.as_view(), name='create_show'),
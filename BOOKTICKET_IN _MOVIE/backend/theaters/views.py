@@ -2,13 +2,21 @@ from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
+from django.db.models import Prefetch, Q
 from django.utils import timezone
-from .models import Theater, Screen, Show, Seat, SeatCategory
+from django.utils.dateparse import parse_date
+from .models import Theater, Screen, Show, Seat, SeatCategory, ShowSeatPricing
+from .allocation import MAX_QUANTITY, best_blocks
+from .availability import get_seat_map
+from .layout import get_screen_layout, get_seat_categories, merge_show_state
+from .showtimes import shows_for_movie
+from bookings.holds import get_hold_backend, holder_for_user, held_seat_ids as get_held_seat_ids
+from bookings.models import Booking
+from bookings.pricing import ShowPricing
 from .serializers import (
     TheaterListSerializer, TheaterDetailSerializer, ScreenSerializer,
-    ShowListSerializer, ShowDetailSerializer, ShowCreateSerializer,
-    SeatSerializer, SeatCategorySerializer
+    ShowListSerializer, ShowDetailSerializer, ShowSeatLayoutSerializer,
+    ShowCreateSerializer, SeatSerializer, SeatCategorySerializer
 )
 
 class TheaterListView(generics.ListAPIView):
@@ -98,43 +106,14 @@ def shows_by_movie_and_city(request, movie_id):
     API view to get shows for a movie in a specific city
     """
     city = request.query_params.get('city', '')
-    date = request.query_params.get('date', timezone.now().date())
+    date = request.query_params.get('date')
     
-    shows = Show.objects.filter(
-        movie_id=movie_id,
-        is_active=True,
-        show_date=date
-    )
-    
-    if city:
-        shows = shows.filter(screen__theater__city__icontains=city)
+    show_date = parse_date(date) if date else timezone.now().date()
+    if show_date is None:
+        return Response({'error': 'Invalid date'}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Group shows by theater
-    theaters_data = {}
-    for show in shows:
-        theater_id = show.screen.theater.id
-        theater_name = show.screen.theater.name
-        
-        if theater_id not in theaters_data:
-            theaters_data[theater_id] = {
-                'id': theater_id,
-                'name': theater_name,
-                'address': show.screen.theater.full_address,
-                'facilities': show.screen.theater.facilities,
-                'shows': []
-            }
-        
-        theaters_data[theater_id]['shows'].append({
-            'id': show.id,
-            'screen_name': show.screen.name,
-            'screen_type': show.screen.screen_type,
-            'show_time': show.show_time,
-            'base_price': show.base_price,
-            'available_seats': show.available_seats,
-            'is_housefull': show.is_housefull
-        })
-    
-    return Response(list(theaters_data.values()))
+    # Theaters and their shows come grouped from the showtime index
+    return Response(shows_for_movie(movie_id, show_date, city))
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
@@ -143,51 +122,118 @@ def seat_layout(request, show_id):
     API view to get seat layout for a show
     """
     try:
-        show = Show.objects.get(id=show_id, is_active=True)
+        show = Show.objects.select_related(
+            'movie', 'screen', 'screen__theater'
+        ).prefetch_related(
+            Prefetch('seat_pricing', queryset=ShowSeatPricing.objects.select_related('seat_category'))
+        ).get(id=show_id, is_active=True)
     except Show.DoesNotExist:
         return Response({'error': 'Show not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    # Get all seats for the screen
-    seats = show.screen.seats.filter(is_active=True).order_by('row', 'column')
+    # Static seat grid of the screen, serialized once per screen
+    layout = get_screen_layout(show.screen)
     
-    # Get booked seats for this show
-    from bookings.models import BookedSeat
-    booked_seats = BookedSeat.objects.filter(
-        booking__show=show,
-        booking__status='confirmed'
-    ).values_list('seat__seat_number', flat=True)
+    # Get seat availability for this show
+    seat_map = get_seat_map(show)
+    held_seat_ids = get_held_seat_ids(show.id)
     
     # Get seat pricing for this show
-    seat_pricing = {
-        pricing.seat_category.id: pricing.price 
-        for pricing in show.seat_pricing.all()
-    }
-    
-    # Organize seats by row
-    seat_layout = {}
-    for seat in seats:
-        if seat.row not in seat_layout:
-            seat_layout[seat.row] = []
-        
-        seat_data = {
-            'id': seat.id,
-            'seat_number': seat.seat_number,
-            'column': seat.column,
-            'category': {
-                'id': seat.category.id,
-                'name': seat.category.name,
-                'color_code': seat.category.color_code
-            },
-            'price': seat_pricing.get(seat.category.id, show.base_price),
-            'is_booked': seat.seat_number in booked_seats,
-            'is_accessible': seat.is_accessible
+    pricing = ShowPricing(show, {
+        show_pricing.seat_category_id: show_pricing.price
+        for show_pricing in show.seat_pricing.all()
+    })
+    
+    return Response({
+        'show': ShowSeatLayoutSerializer(
+            show, context={'request': request, 'screen_layout': layout['screen']}
+        ).data,
+        'seat_layout': merge_show_state(layout, pricing, seat_map, held_seat_ids),
+        'seat_categories': get_seat_categories()
+    })
+
+@api_view(['GET', 'POST'])
+@permission_classes([permissions.AllowAny])
+def best_available_seats(request, show_id):
+    """
+    API view to find the best block of adjacent seats for a show.
+    
+    GET only suggests the block; POST also holds it for the user.
+    """
+    params = request.query_params if request.method == 'GET' else request.data
+    
+    try:
+        quantity = int(params.get('quantity', 0))
+        category_id = int(params['category']) if params.get('category') else None
+    except (TypeError, ValueError):
+        return Response({'error': 'Invalid quantity or category'}, status=status.HTTP_400_BAD_REQUEST)
+    if not 1 <= quantity <= MAX_QUANTITY:
+        return Response(
+            {'error': f'Quantity must be between 1 and {MAX_QUANTITY}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    accessible = str(params.get('accessible', '')).lower() in ('1', 'true', 'yes')
+    
+    hold = request.method == 'POST'
+    if hold and not request.user.is_authenticated:
+        return Response({'error': 'Login required to hold seats'}, status=status.HTTP_401_UNAUTHORIZED)
+    
+    try:
+        show = Show.objects.select_related('screen').prefetch_related('seat_pricing').get(id=show_id, is_active=True)
+    except Show.DoesNotExist:
+        return Response({'error': 'Show not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    # The user's own holds count as free so they can be re-allocated
+    holder = holder_for_user(request.user) if request.user.is_authenticated else None
+    blocks = best_blocks(
+        get_screen_layout(show.screen),
+        get_seat_map(show),
+        get_held_seat_ids(show.id, exclude_holder=holder),
+        quantity,
+        category_id=category_id,
+        accessible=accessible
+    )
+    
+    held_until = None
+    if hold:
+        held_until = timezone.now() + Booking.HOLD_DURATION
+        backend = get_hold_backend()
+        # Fall back to the next best block if another user takes this one first
+        for block in blocks:
+            if backend.hold(show.id, block.seat_ids, holder, held_until):
+                blocks = [block]
+                break
+        else:
+            blocks = []
+    
+    if not blocks:
+        return Response(
+            {'error': f'No block of {quantity} adjacent seats is available'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    block = blocks[0]
+    pricing = ShowPricing(show, {
+        show_pricing.seat_category_id: show_pricing.price
+        for show_pricing in show.seat_pricing.all()
+    })
+    seats = [
+        {
+            'id': seat['id'],
+            'seat_number': seat['seat_number'],
+            'row': block.row,
+            'column': seat['column'],
+            'category': seat['category'],
+            'price': pricing.price_for(seat['category_id'])
         }
-        seat_layout[seat.row].append(seat_data)
+        for seat in block.seats
+    ]
     
     return Response({
-        'show': ShowDetailSerializer(show, context={'request': request}).data,
-        'seat_layout': seat_layout,
-        'seat_categories': SeatCategorySerializer(SeatCategory.objects.all(), many=True).data
+        'show': show.id,
+        'seats': seats,
+        'total_amount': sum(seat['price'] for seat in seats),
+        'is_held': hold,
+        'held_until': held_until
     })
 
 @api_view(['GET'])